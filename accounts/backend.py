@@ -1,13 +1,6 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
-from .models import StudentProfile, LecturerProfile
-from django.contrib.auth.backends import ModelBackend
-from django.contrib.auth import get_user_model
-from django.db.models import Q
-from .models import StudentProfile
-from .models import StudentProfile, LecturerProfile
-# from attachments.models import LecturerProfile, SupervisorProfile
-from attachments.models import Lecturer
+from .login_identifiers import resolve_login
 
 User = get_user_model()
 
@@ -17,32 +10,16 @@ class IDBackend(ModelBackend):
     Authenticate using student_id, staff_id, or email.
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
-        user = None
-        
-        # Try student ID
-        try:
-            student_profile = StudentProfile.objects.get(student_id=username)
-            user = student_profile.user
-        except StudentProfile.DoesNotExist:
-            pass
-        
-        # Try lecturer staff ID
-        if not user:
-            try:
-                lecturer = Lecturer.objects.get(staff_id=username)
-                user = lecturer.user
-            except Lecturer.DoesNotExist:
-                pass
+        # One indexed lookup whichever identifier was typed
+        user, _ = resolve_login(username)
         
-        # Try email as fallback
-        if not user:
-            try:
-                user = User.objects.get(email=username)
-            except User.DoesNotExist:
-                return None
+        if user is None:
+            # Run the hasher anyway so unknown logins take as long as wrong passwords
+            User().set_password(password)
+            return None
         
         # Check password and user status
-        if user and user.check_password(password) and self.user_can_authenticate(user):
+        if user.check_password(password) and self.user_can_authenticate(user):
             return user
         
         return None
@@ -66,37 +43,18 @@ class RoleBasedAuthBackend(ModelBackend):
                 role = request.POST.get('role', 'student')
             role = role or kwargs.get('role', 'student')
             
-            if role == 'student':
-                # Student login: Find by Student ID in StudentProfile
-                student_profile = StudentProfile.objects.select_related('user').filter(
-                    student_id__iexact=username
-                ).first()
-                
-                if student_profile and student_profile.user.check_password(password):
-                    return student_profile.user
-            
-            elif role == 'lecturer':
-                # Lecturer login: Find by Staff ID in LecturerProfile
-                lecturer_profile = LecturerProfile.objects.select_related('user').filter(
-                    staff_id__iexact=username
-                ).first()
-                
-                if lecturer_profile and lecturer_profile.user.check_password(password):
-                    return lecturer_profile.user
+            # Students log in with their Student ID, lecturers with their Staff ID
+            # and supervisors with their email; any email works as a fallback
+            # (admins and others)
+            allowed_kinds = {'student': 'student_id', 'lecturer': 'staff_id'}.get(role), 'email'
+            user, kind = resolve_login(username)
             
-            elif role == 'supervisor':
-                # Supervisor login: Find by Email in User model
-                user = User.objects.filter(
-                    email__iexact=username, 
-                    user_type=2  # Supervisor type
-                ).first()
-                
-                if user and user.check_password(password):
-                    return user
+            if user is None or kind not in allowed_kinds:
+                # Hash anyway: a login name of the wrong kind must not answer faster than a wrong password
+                User().set_password(password)
+                return None
             
-            # Fallback: Try default email authentication for admins and others
-            user = User.objects.filter(email__iexact=username).first()
-            if user and user.check_password(password):
+            if user.check_password(password):
                 return user
                 
         except Exception as e:
@@ -1,6 +1,10 @@
 # accounts/context_processors.py
+from .principal import get_principal
+
 def user_type(request):
+    principal = get_principal(request.user)
     return {
-        'user_type': request.user.user_type if request.user.is_authenticated else None,
-        'user_type_display': request.user.get_user_type_display() if request.user.is_authenticated else None,
-    }
\ No newline at end of file
+        'principal': principal,
+        'user_type': principal.role if principal else None,
+        'user_type_display': principal.role_display if principal else None,
+    }
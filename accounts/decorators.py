@@ -3,6 +3,8 @@ from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
 from django.conf import settings
 
+from .principal import get_principal
+
 def role_required(allowed_roles):
     """
     Restrict view access to users with specific roles.
@@ -11,18 +13,11 @@ def role_required(allowed_roles):
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
-            if not request.user.is_authenticated:
+            principal = get_principal(request.user)
+            if principal is None:
                 return redirect(settings.LOGIN_URL)
 
-            # pick whichever field you actually use (role or user_type)
-            user_role = getattr(request.user, "role", None) or getattr(request.user, "user_type", None)
-
-            try:
-                user_role = int(user_role)
-            except (ValueError, TypeError):
-                raise PermissionDenied("Invalid role")
-
-            if user_role not in allowed_roles:
+            if principal.role not in allowed_roles:
                 raise PermissionDenied("You do not have permission to view this page.")
 
             return view_func(request, *args, **kwargs)
@@ -1,44 +1,56 @@
-from django.core.mail import send_mail
+from django.core.mail import send_mail, EmailMultiAlternatives, get_connection
+from attachments.outbox import enqueue_email
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.template.loader import get_template, render_to_string
 from django.utils.html import strip_tags
+from dataclasses import dataclass, field
+from itertools import islice
 import logging
+import time
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+WELCOME_TEMPLATES = {
+    1: ('Welcome to PractiCheck - Student Account Created', 'accounts/emails/welcome_student.html'),
+    2: ('Welcome to PractiCheck - Supervisor Account Created', 'accounts/emails/welcome_supervisor.html'),
+}
+
+def _welcome_context(user, user_type):
+    """Per-user template variables of the welcome email"""
+    if user_type == 1:  # Student
+        return {
+            'first_name': user.first_name,
+            'student_id': user.student_id,
+            'university': user.university,
+            'department': user.department.name if user.department else 'Not specified',
+            'course': user.course.name if user.course else 'Not specified',
+            'year_of_study': user.year_of_study,
+        }
+    # Supervisor
+    return {
+        'first_name': user.first_name,
+        'organization': user.organization,
+        'position': user.position,
+        'department': user.supervisor_department or 'Not specified',
+    }
+
+def _site_context():
+    return {
+        'site_url': getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000'),
+        'support_email': getattr(settings, 'SUPPORT_EMAIL', 'practicheck@gmail.com'),
+    }
+
 def send_welcome_email(user, user_type):
     """
     Send welcome email to newly registered users
     """
     try:
-        if user_type == 1:  # Student
-            subject = 'Welcome to PractiCheck - Student Account Created'
-            template = 'accounts/emails/welcome_student.html'
-            context = {
-                'first_name': user.first_name,
-                'student_id': user.student_id,
-                'university': user.university,
-                'department': user.department.name if user.department else 'Not specified',
-                'course': user.course.name if user.course else 'Not specified',
-                'year_of_study': user.year_of_study,
-                'site_url': getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000'),
-                'support_email': getattr(settings, 'SUPPORT_EMAIL', 'practicheck@gmail.com'),
-            }
-        elif user_type == 2:  # Supervisor
-            subject = 'Welcome to PractiCheck - Supervisor Account Created'
-            template = 'accounts/emails/welcome_supervisor.html'
-            context = {
-                'first_name': user.first_name,
-                'organization': user.organization,
-                'position': user.position,
-                'department': user.supervisor_department or 'Not specified',
-                'site_url': getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000'),
-                'support_email': getattr(settings, 'SUPPORT_EMAIL', 'practicheck@gmail.com'),
-            }
-        else:
+        if user_type not in WELCOME_TEMPLATES:
             logger.warning(f"Invalid user type for welcome email: {user_type}")
             return False
+        subject, template = WELCOME_TEMPLATES[user_type]
+        context = {**_welcome_context(user, user_type), **_site_context()}
         
         # Check if email backend is configured
         if not hasattr(settings, 'EMAIL_BACKEND'):
@@ -49,17 +61,16 @@ def send_welcome_email(user, user_type):
         html_message = render_to_string(template, context)
         plain_message = strip_tags(html_message)
         
-        # Send email
-        send_mail(
+        # Queue email (delivered by the send_queued_email worker)
+        enqueue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[user.email],
             html_message=html_message,
-            fail_silently=True,  # Don't raise errors if email fails
         )
         
-        logger.info(f"Welcome email sent successfully to {user.email} (User Type: {user_type})")
+        logger.info(f"Welcome email queued for {user.email} (User Type: {user_type})")
         return True
         
     except Exception as e:
@@ -124,41 +135,108 @@ This is an automated notification from PractiCheck System.
             logger.info("Email backend not configured. Skipping admin notification.")
             return False
         
-        # Send email
-        send_mail(
+        # Queue email (delivered by the send_queued_email worker)
+        enqueue_email(
             subject=subject,
             message=message.strip(),
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=admin_emails,
-            fail_silently=True,  # Don't raise errors for admin notifications
         )
         
-        logger.info(f"Admin notification sent for new {user_type_name.lower()} registration: {user.email}")
+        logger.info(f"Admin notification queued for new {user_type_name.lower()} registration: {user.email}")
         return True
         
     except Exception as e:
         logger.error(f"Error sending admin notification email: {str(e)}")
         return False
 
-def send_bulk_welcome_emails(users):
+class _WelcomeTemplate:
     """
-    Send welcome emails to multiple users (for batch processing)
+    Welcome email of one user type: the template is loaded (and compiled)
+    once and rendered for each recipient, so filters, defaults and
+    autoescaping apply exactly as in send_welcome_email().
     """
-    success_count = 0
-    failure_count = 0
-    
-    for user in users:
-        if send_welcome_email(user, user.user_type):
-            success_count += 1
-        else:
-            failure_count += 1
-    
-    logger.info(f"Bulk email sending completed: {success_count} successful, {failure_count} failed")
-    return success_count, failure_count
+    def __init__(self, user_type):
+        self.user_type = user_type
+        self.subject, template = WELCOME_TEMPLATES[user_type]
+        self.template = get_template(template)
+        self.site_context = _site_context()
+
+    def build(self, user, connection):
+        html = self.template.render({**_welcome_context(user, self.user_type), **self.site_context})
+        message = EmailMultiAlternatives(
+            self.subject, strip_tags(html), settings.DEFAULT_FROM_EMAIL, [user.email], connection=connection,
+        )
+        message.attach_alternative(html, 'text/html')
+        return message
+
+@dataclass
+class BulkEmailResult:
+    """Per-recipient outcome of send_bulk_welcome_emails()"""
+    sent: list = field(default_factory=list)     # email addresses delivered to the SMTP server
+    failed: dict = field(default_factory=dict)   # email address (or user id) -> error message
+
+    @property
+    def success_count(self):
+        return len(self.sent)
+
+    @property
+    def failure_count(self):
+        return len(self.failed)
+
+def send_bulk_welcome_emails(users, batch_size=None, rate_limit=None, connection=None):
+    """
+    Send welcome emails to multiple users (for batch processing, e.g. a
+    cohort import). Templates are loaded once per user type, messages are
+    built in chunks of ``batch_size`` and all of them go over one SMTP
+    connection, throttled to ``rate_limit`` messages per second (0 = no limit).
+    These are sent directly, not through the outbox.
+    """
+    batch_size = batch_size or getattr(settings, 'BULK_EMAIL_BATCH_SIZE', 100)
+    rate_limit = getattr(settings, 'BULK_EMAIL_RATE_LIMIT', 0) if rate_limit is None else rate_limit
+    if hasattr(users, 'select_related'):
+        users = users.select_related('department', 'course')
+
+    result = BulkEmailResult()
+    templates = {}
+    connection = connection or get_connection(fail_silently=False)
+    users = iter(users)
+    try:
+        while True:
+            chunk = list(islice(users, batch_size))
+            if not chunk:
+                break
+            started = time.monotonic()
+            for user in chunk:
+                recipient = user.email or f'user {user.pk}'
+                if user.user_type not in WELCOME_TEMPLATES or not user.email:
+                    result.failed[recipient] = 'No welcome email for this user type' if user.email else 'No email address'
+                    continue
+                try:
+                    if user.user_type not in templates:
+                        templates[user.user_type] = _WelcomeTemplate(user.user_type)
+                    connection.open()  # no-op while the connection is still open
+                    templates[user.user_type].build(user, connection).send()
+                except Exception as e:
+                    result.failed[recipient] = str(e)
+                    # Carry on with a fresh connection
+                    connection.close()
+                else:
+                    result.sent.append(recipient)
+            if rate_limit:
+                remaining = len(chunk) / rate_limit - (time.monotonic() - started)
+                if remaining > 0:
+                    time.sleep(remaining)
+    finally:
+        connection.close()
+
+    logger.info(f"Bulk email sending completed: {result.success_count} successful, {result.failure_count} failed")
+    return result
 
 def test_email_configuration():
     """
     Test function to verify email configuration is working
+    (sends directly, bypassing the outbox, so SMTP errors surface here)
     """
     try:
         send_mail(
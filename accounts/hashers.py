@@ -0,0 +1,38 @@
+"""
+Password hashers with their cost taken from settings.
+
+Django's built-in hashers hard-code their work factors, so the cost of a
+login can only change with a Django upgrade. These subclasses read theirs
+from settings (PASSWORD_ARGON2_TIME_COST, PASSWORD_ARGON2_MEMORY_COST,
+PASSWORD_ARGON2_PARALLELISM, PASSWORD_PBKDF2_ITERATIONS); run
+``manage.py benchmark_password_hashers`` to see what a login costs with them.
+
+Nothing needs a migration when the preferred hasher or its parameters change:
+check_password() rehashes with PASSWORD_HASHERS[0] whenever a stored hash
+came from another hasher or ``must_update()`` reports different parameters,
+so users move over one successful login at a time.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    # Same algorithm name as Django's, so existing argon2 hashes verify and are
+    # only rehashed when the parameters differ
+    @property
+    def time_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
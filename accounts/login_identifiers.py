@@ -0,0 +1,115 @@
+"""
+LoginIdentifier table: every name a user can log in with, normalized.
+
+Users log in with an email, a student ID (CustomUser.student_id or
+StudentProfile.student_id) or a staff ID (attachments.Lecturer or
+LecturerProfile). Looking those up one after another with iexact meant up to
+three unindexed UPPER() scans per login. The backends now resolve any of them
+with one unique-index lookup on LoginIdentifier.identifier.
+
+Rows are rebuilt per user by the signals in accounts/signals.py whenever one
+of the source models is saved; deleting a user cascades. Identifiers are
+first come, first served: a value already held by another user is not taken
+over (and is logged), so nobody can claim someone else's login name.
+"""
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .models import LoginIdentifier
+
+logger = logging.getLogger(__name__)
+
+# (values() path on the user model, LoginIdentifier.kind)
+IDENTIFIER_SOURCES = [
+    ('email', 'email'),
+    ('student_id', 'student_id'),
+    ('student_profile__student_id', 'student_id'),
+    ('attachment_lecturer__staff_id', 'staff_id'),
+    ('lecturer_profile__staff_id', 'staff_id'),
+]
+
+
+def normalize_identifier(value):
+    return (value or '').strip().lower()
+
+
+def _identifiers_from_row(row):
+    identifiers = {}
+    for path, kind in IDENTIFIER_SOURCES:
+        identifier = normalize_identifier(row[path])
+        if identifier:
+            identifiers.setdefault(identifier, kind)
+    return identifiers
+
+
+def user_identifiers(user_ids=None):
+    """``{user_id: {identifier: kind}}`` read from the source models in one query"""
+    users = get_user_model().objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    rows = users.values('pk', *[path for path, _ in IDENTIFIER_SOURCES])
+    return {row['pk']: _identifiers_from_row(row) for row in rows}
+
+
+def sync_login_identifiers(user_id, create=True):
+    """
+    Make the user's LoginIdentifier rows match their current email / student
+    ID / staff ID. With ``create=False`` stale rows are only removed (used on
+    deletes, which may be part of deleting the user itself).
+    """
+    wanted = user_identifiers([user_id]).get(user_id, {})
+    with transaction.atomic():
+        existing = {
+            row.identifier: row
+            for row in LoginIdentifier.objects.select_for_update().filter(identifier__in=wanted)
+        }
+        LoginIdentifier.objects.filter(user_id=user_id).exclude(identifier__in=wanted).delete()
+        if not create:
+            return
+        for identifier, kind in wanted.items():
+            row = existing.get(identifier)
+            if row is None:
+                LoginIdentifier.objects.create(identifier=identifier, kind=kind, user_id=user_id)
+            elif row.user_id != user_id:
+                logger.warning(f"Login identifier {identifier!r} of user {user_id} is already used by user {row.user_id}")
+            elif row.kind != kind:
+                row.kind = kind
+                row.save(update_fields=['kind'])
+
+
+def rebuild_login_identifiers(batch_size=1000):
+    """
+    Recreate the whole table from the source models (e.g. after bulk imports);
+    returns the row count. Contested identifiers stay with their current
+    owner, otherwise go to the oldest user.
+    """
+    with transaction.atomic():
+        owners = dict(LoginIdentifier.objects.values_list('identifier', 'user_id'))
+        claims = {}
+        for user_id, identifiers in sorted(user_identifiers().items()):
+            for identifier, kind in identifiers.items():
+                claimed = claims.get(identifier)
+                if claimed is None or (owners.get(identifier) == user_id and claimed[0] != user_id):
+                    claims[identifier] = (user_id, kind)
+        LoginIdentifier.objects.all().delete()
+        LoginIdentifier.objects.bulk_create(
+            [
+                LoginIdentifier(identifier=identifier, kind=kind, user_id=user_id)
+                for identifier, (user_id, kind) in claims.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(claims)
+
+
+def resolve_login(username):
+    """``(user, kind)`` for a login name in one query, or ``(None, None)``"""
+    identifier = normalize_identifier(username)
+    if not identifier:
+        return None, None
+    row = LoginIdentifier.objects.select_related('user').filter(identifier=identifier).first()
+    if row is None:
+        return None, None
+    return row.user, row.kind
@@ -0,0 +1,204 @@
+"""
+Login rate limiting.
+
+Every failed login used to cost a full password hash with nothing in the way of
+retrying, so a guessing script could both try passwords forever and keep the
+workers busy hashing. Failures are now counted in the cache with a sliding
+window in three scopes:
+
+- a login name from one client IP (LOGIN_RATE_LIMIT_IDENTIFIER, low);
+- a login name from any IP (LOGIN_RATE_LIMIT_IDENTIFIER_ANY_IP, much higher,
+  against guessing spread over many addresses);
+- a client IP, counting only login names that belong to nobody
+  (LOGIN_RATE_LIMIT_IP).
+
+Once a scope goes over its limit that key is locked out, and each lockout that
+follows within LOGIN_LOCKOUT_RESET doubles (up to LOGIN_LOCKOUT_MAX). A
+locked-out attempt is turned away before authenticate() runs, so it costs no
+hashing at all. Someone typing a student's ID with wrong passwords only locks
+that ID out for their own address until the far higher any-IP limit is hit.
+
+The IP scope never locks out a real login name. Many users can share one
+address (a campus NAT, or every client behind a proxy when
+LOGIN_RATE_TRUST_FORWARDED_FOR is off), so a hard lockout per IP would let
+one client lock out everybody behind it. The IP scope only slows down
+scripts that try made-up names; real names are covered by the two
+identifier scopes. Checking whether a name is real costs one indexed
+LoginIdentifier lookup. It only happens after a failure or while the IP is
+locked.
+
+The sliding window is the usual two-bucket approximation: the count is the
+current fixed window plus the previous one weighted by how much of it still
+overlaps the last LOGIN_RATE_WINDOW seconds. That is two cache keys per scope
+instead of a list of timestamps.
+
+Redis increments atomically. FileBasedCache implements incr() as a read and a
+write, so concurrent failures could overwrite each other's count; there the
+increments are serialized with a lock file in the cache directory.
+"""
+import hashlib
+import math
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock
+    fcntl = None
+
+from .login_identifiers import normalize_identifier
+from .models import LoginIdentifier
+
+CACHE_PREFIX = 'login-throttle'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _limits():
+    """``{scope: max failures per window}``"""
+    return {
+        'identifier_ip': _setting('LOGIN_RATE_LIMIT_IDENTIFIER', 5),
+        'identifier': _setting('LOGIN_RATE_LIMIT_IDENTIFIER_ANY_IP', 100),
+        'ip': _setting('LOGIN_RATE_LIMIT_IP', 20),
+    }
+
+
+def client_ip(request):
+    """The client address; X-Forwarded-For is only trusted behind a configured proxy"""
+    if _setting('LOGIN_RATE_TRUST_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '') or 'unknown'
+
+
+def _digest(*parts):
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+def throttle_keys(request, username):
+    """``{scope: key}`` for an attempt; login names are hashed so they never sit in the cache in clear"""
+    ip = client_ip(request)
+    keys = {'ip': ip}
+    identifier = normalize_identifier(username)
+    if identifier:
+        keys['identifier_ip'] = _digest(identifier, ip)
+        keys['identifier'] = _digest(identifier)
+    return keys
+
+
+def is_known_identifier(username):
+    """Whether ``username`` is someone's login name (the IP scope does not apply to those)"""
+    identifier = normalize_identifier(username)
+    return bool(identifier) and LoginIdentifier.objects.filter(identifier=identifier).exists()
+
+
+def _key(kind, scope, key, *parts):
+    return ':'.join([CACHE_PREFIX, kind, scope, key, *map(str, parts)])
+
+
+@contextmanager
+def _increment_lock():
+    """Serializes increments where the cache backend does them as a read and a write"""
+    backend = caches['default']
+    if fcntl is None or not isinstance(backend, FileBasedCache):
+        yield
+        return
+    os.makedirs(backend._dir, exist_ok=True)
+    # Not a .djcache file, so culling and clear() leave it alone
+    with open(os.path.join(backend._dir, f'{CACHE_PREFIX}.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _increment(key, timeout):
+    """Add one to ``key``, creating it with ``timeout``; returns the new value"""
+    with _increment_lock():
+        cache.add(key, 0, timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:  # expired in between
+            cache.set(key, 1, timeout)
+            return 1
+
+
+def failure_count(scope, key, now=None):
+    """Failures in the last window, weighting the previous bucket by its overlap"""
+    window = _setting('LOGIN_RATE_WINDOW', 900)
+    now = time.time() if now is None else now
+    bucket = int(now // window)
+    counts = cache.get_many([_key('count', scope, key, bucket), _key('count', scope, key, bucket - 1)])
+    current = counts.get(_key('count', scope, key, bucket), 0)
+    previous = counts.get(_key('count', scope, key, bucket - 1), 0)
+    overlap = 1 - (now - bucket * window) / window
+    return current + previous * overlap
+
+
+def lockout_remaining(request, username, now=None):
+    """Seconds until this attempt may go ahead, 0 if it is not locked out"""
+    now = time.time() if now is None else now
+    keys = throttle_keys(request, username)
+    locks = cache.get_many([_key('lock', scope, key) for scope, key in keys.items()])
+    if _key('lock', 'ip', keys['ip']) in locks and is_known_identifier(username):
+        del locks[_key('lock', 'ip', keys['ip'])]
+    remaining = max([until - now for until in locks.values()], default=0)
+    return max(0, math.ceil(remaining))
+
+
+def _lock(scope, key, now):
+    """Lock ``key`` out, twice as long as its previous lockout; returns the duration"""
+    base = _setting('LOGIN_LOCKOUT_BASE', 60)
+    strikes = _increment(_key('strikes', scope, key), _setting('LOGIN_LOCKOUT_RESET', 86400))
+    duration = min(base * 2 ** (strikes - 1), _setting('LOGIN_LOCKOUT_MAX', 3600))
+    cache.set(_key('lock', scope, key), now + duration, duration)
+    # Start the next window clean, otherwise one more failure re-locks immediately
+    cache.delete_many([_key('count', scope, key, bucket) for bucket in _buckets(now)])
+    return duration
+
+
+def _buckets(now):
+    bucket = int(now // _setting('LOGIN_RATE_WINDOW', 900))
+    return bucket, bucket - 1
+
+
+def record_login_failure(request, username, now=None):
+    """Count a failed attempt; returns the lockout in seconds it triggered, or 0"""
+    window = _setting('LOGIN_RATE_WINDOW', 900)
+    now = time.time() if now is None else now
+    bucket = int(now // window)
+    limits = _limits()
+    locked_for = 0
+    keys = throttle_keys(request, username)
+    if is_known_identifier(username):
+        del keys['ip']
+    for scope, key in keys.items():
+        # Kept for two windows: the next window still reads it as the previous bucket
+        _increment(_key('count', scope, key, bucket), window * 2)
+        if failure_count(scope, key, now) >= limits[scope]:
+            locked_for = max(locked_for, _lock(scope, key, now))
+    return locked_for
+
+
+def record_login_success(request, username):
+    """
+    Forget the failures of this login name from this IP. The any-IP count
+    is left to expire (others may still be guessing) and so is the IP's
+    (it may be trying many names).
+    """
+    key = throttle_keys(request, username).get('identifier_ip')
+    if key is None:
+        return
+    cache.delete_many(
+        [_key('count', 'identifier_ip', key, bucket) for bucket in _buckets(time.time())]
+        + [_key('strikes', 'identifier_ip', key)]
+    )
@@ -0,0 +1,108 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from accounts.login_identifiers import rebuild_login_identifiers, resolve_login
+from accounts.models import StudentProfile
+from attachments.models import Department, Lecturer
+
+User = get_user_model()
+
+# Password hashing would dominate; the benchmark is about resolving the login name
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+PASSWORD = 'bench-pass'
+
+
+def legacy_resolve(username):
+    """The previous lookup chain: student ID, then staff ID, then email, each with iexact"""
+    profile = StudentProfile.objects.select_related('user').filter(student_id__iexact=username).first()
+    if profile:
+        return profile.user
+    lecturer = Lecturer.objects.select_related('user').filter(staff_id__iexact=username).first()
+    if lecturer:
+        return lecturer.user
+    return User.objects.filter(email__iexact=username).first()
+
+
+def indexed_resolve(username):
+    return resolve_login(username)[0]
+
+
+def measure(resolve, logins):
+    """(logins per second, queries per login) for resolving and checking each login"""
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for username in logins:
+            user = resolve(username)
+            if user is None or not user.check_password(PASSWORD):
+                raise CommandError(f"Login {username!r} did not resolve")
+        elapsed = time.perf_counter() - started
+    return len(logins) / elapsed, len(queries) / len(logins)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark login name resolution: legacy iexact lookup chain vs the LoginIdentifier table (synthetic users, rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--logins', type=int, default=2000)
+        parser.add_argument('--max-queries', type=float, default=1.0, help='Fail if a login needs more queries than this')
+
+    def handle(self, *args, **options):
+        count = options['users']
+        rng = random.Random(42)
+        with override_settings(PASSWORD_HASHERS=FAST_HASHERS), transaction.atomic():
+            password = make_password(PASSWORD)
+            department = Department.objects.create(name='Benchmark Department', code='BENCH-LOGIN')
+            users = User.objects.bulk_create(
+                [
+                    User(
+                        email=f'login-bench-{i}@example.com', password=password,
+                        user_type=3 if i % 3 == 1 else 1,
+                        student_id=f'LB/{i:06d}/25' if i % 3 != 1 else None,
+                    )
+                    for i in range(count)
+                ],
+                batch_size=2000,
+            )
+            StudentProfile.objects.bulk_create(
+                [
+                    StudentProfile(user=user, student_id=user.student_id, course='-', university='-', department='-')
+                    for user in users if user.student_id
+                ],
+                batch_size=2000,
+            )
+            Lecturer.objects.bulk_create(
+                [
+                    Lecturer(user=user, staff_id=f'LB-STAFF-{i:06d}', department=department)
+                    for i, user in enumerate(users) if user.user_type == 3
+                ],
+                batch_size=2000,
+            )
+            rebuild_login_identifiers()
+
+            # A third each of student IDs, staff IDs and emails, typed in random case
+            logins = []
+            for _ in range(options['logins']):
+                i = rng.randrange(count)
+                name = f'LB-STAFF-{i:06d}' if i % 3 == 1 else (f'LB/{i:06d}/25' if i % 2 else f'login-bench-{i}@example.com')
+                logins.append(name.upper() if rng.random() < 0.5 else name.lower())
+
+            results = {name: measure(resolve, logins) for name, resolve in (
+                ('legacy', legacy_resolve),
+                ('indexed', indexed_resolve),
+            )}
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{count} users, {len(logins)} logins")
+        for name, (rate, queries) in results.items():
+            self.stdout.write(f"{name:>8}: {rate:9.0f} logins/s, {queries:.2f} queries per login")
+
+        queries = results['indexed'][1]
+        if queries > options['max_queries']:
+            raise CommandError(f"Login resolution took {queries:.2f} queries per login, over {options['max_queries']:.2f}")
+        self.stdout.write(self.style.SUCCESS(f"Login resolution within {options['max_queries']:.2f} queries per login"))
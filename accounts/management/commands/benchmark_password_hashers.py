@@ -0,0 +1,57 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+from accounts.login_throttle import lockout_remaining
+
+PASSWORD = 'bench-pass'
+
+
+def measure(fn, rounds):
+    """(wall ms, CPU ms) per call"""
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(rounds):
+        fn()
+    return (
+        (time.perf_counter() - wall) * 1000 / rounds,
+        (time.process_time() - cpu) * 1000 / rounds,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Measure the CPU cost of one password check per configured hasher, and of a throttled attempt'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--max-cpu-ms', type=float, default=None,
+                            help='Fail if checking a password with the preferred hasher takes more CPU than this')
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        preferred = get_hasher('default').algorithm
+        self.stdout.write(f"{'hasher':>26} {'wall ms':>9} {'cpu ms':>9}  (per password check, {rounds} rounds)")
+
+        results = {}
+        # The preferred hasher and the first fallback, i.e. the two hashes users actually have
+        for path in settings.PASSWORD_HASHERS[:2]:
+            hasher = import_string(path)()
+            encoded = make_password(PASSWORD, hasher=hasher)
+            wall, cpu = results[path] = measure(
+                lambda: check_password(PASSWORD, encoded, setter=lambda raw: None), rounds,
+            )
+            marker = ' *' if hasher.algorithm == preferred else ''
+            self.stdout.write(f"{path.rsplit('.', 1)[-1]:>26} {wall:9.1f} {cpu:9.1f}{marker}")
+
+        request = RequestFactory().post('/accounts/login/', REMOTE_ADDR='203.0.113.1')
+        wall, cpu = measure(lambda: lockout_remaining(request, 'someone@example.com'), rounds)
+        self.stdout.write(f"{'throttle check':>26} {wall:9.1f} {cpu:9.1f}")
+
+        preferred_cpu = results[settings.PASSWORD_HASHERS[0]][1]
+        limit = options['max_cpu_ms']
+        if limit is not None:
+            if preferred_cpu > limit:
+                raise CommandError(f"A password check costs {preferred_cpu:.1f} ms CPU, over {limit:.1f} ms")
+            self.stdout.write(self.style.SUCCESS(f"Password check within {limit:.1f} ms CPU"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from accounts.login_identifiers import rebuild_login_identifiers
+
+class Command(BaseCommand):
+    help = 'Recreate the LoginIdentifier table from the users and their profiles (e.g. after a bulk import)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        count = rebuild_login_identifiers(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Login identifiers rebuilt: {count} row(s)"))
@@ -1,7 +1,34 @@
 # accounts/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import HttpResponseForbidden
 from django.urls import reverse
 from django.shortcuts import redirect
+from django.utils.functional import SimpleLazyObject
+
+from .principal import get_principal
+
+
+class PrincipalMiddleware:
+    """Expose the current user's cached Principal as request.principal (resolved on first use)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.principal = SimpleLazyObject(lambda: get_principal(request.user))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Lazy as well; async views should not touch it (it may query)
+        request.principal = SimpleLazyObject(lambda: get_principal(request.user))
+        return await self.get_response(request)
+
 
 class RoleAccessMiddleware:
     def __init__(self, get_response):
@@ -17,7 +44,8 @@ class RoleAccessMiddleware:
             return None
             
         # Check if user is authenticated
-        if not request.user.is_authenticated:
+        principal = get_principal(request.user)
+        if principal is None:
             return None
             
         # Define allowed URLs for each user type
@@ -35,13 +63,13 @@ class RoleAccessMiddleware:
         current_view = request.resolver_match.url_name if request.resolver_match else None
         
         # Check access based on user type
-        if request.user.user_type == 1 and current_view not in student_urls:
+        if principal.role == 1 and current_view not in student_urls:
             return HttpResponseForbidden("You don't have permission to access this page.")
             
-        elif request.user.user_type == 2 and current_view not in supervisor_urls:
+        elif principal.role == 2 and current_view not in supervisor_urls:
             return HttpResponseForbidden("You don't have permission to access this page.")
             
-        elif request.user.user_type == 3 and current_view not in lecturer_urls:
+        elif principal.role == 3 and current_view not in lecturer_urls:
             return HttpResponseForbidden("You don't have permission to access this page.")
             
         return None
\ No newline at end of file
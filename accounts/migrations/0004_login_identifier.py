@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_login_identifiers(apps, schema_editor):
+    """Same rules as accounts.login_identifiers.rebuild_login_identifiers(), on the historical models"""
+    User = apps.get_model('accounts', 'CustomUser')
+    LoginIdentifier = apps.get_model('accounts', 'LoginIdentifier')
+    sources = [
+        ('email', 'email'),
+        ('student_id', 'student_id'),
+        ('student_profile__student_id', 'student_id'),
+        ('attachment_lecturer__staff_id', 'staff_id'),
+        ('lecturer_profile__staff_id', 'staff_id'),
+    ]
+    rows, taken = [], set()
+    for row in User.objects.order_by('pk').values('pk', *[path for path, _ in sources]):
+        for path, kind in sources:
+            identifier = (row[path] or '').strip().lower()
+            if identifier and identifier not in taken:
+                taken.add(identifier)
+                rows.append(LoginIdentifier(identifier=identifier, kind=kind, user_id=row['pk']))
+    LoginIdentifier.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_query_indexes'),
+        ('attachments', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginIdentifier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(max_length=254, unique=True)),
+                ('kind', models.CharField(choices=[('email', 'Email'), ('student_id', 'Student ID'), ('staff_id', 'Staff ID')], max_length=20)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='login_identifiers', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_login_identifiers, migrations.RunPython.noop),
+    ]
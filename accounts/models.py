@@ -89,6 +89,14 @@ class CustomUser(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Role listings filtered by department (students per department, dashboards)
+            models.Index(fields=['user_type', 'department'], name='user_type_department_idx'),
+            # admin_students keyset pagination
+            models.Index(fields=['user_type', 'first_name', 'last_name', 'id'], name='user_type_name_idx'),
+        ]
+
     def __str__(self):
         if self.user_type == 1 and self.student_id:
             return self.student_id
@@ -105,7 +113,8 @@ class CustomUser(AbstractUser):
                 'email_notifications': True,
                 'logbook_reminders': True,
                 'evaluation_alerts': True,
-                'newsletter': True
+                'newsletter': True,
+                'logbook_digest': 'immediate',
             }
         super().save(*args, **kwargs)
 
@@ -143,4 +152,21 @@ class LecturerProfile(models.Model):
     email = models.EmailField(null=True, blank=True)
 
     def __str__(self):
-        return f"{self.user.get_full_name()} - {self.staff_id}"
\ No newline at end of file
+        return f"{self.user.get_full_name()} - {self.staff_id}"
+
+class LoginIdentifier(models.Model):
+    """
+    Normalized login name (email, student ID or staff ID) -> user, so a login
+    resolves with one indexed equality lookup (see login_identifiers.py).
+    """
+    KIND_CHOICES = (
+        ('email', 'Email'),
+        ('student_id', 'Student ID'),
+        ('staff_id', 'Staff ID'),
+    )
+    identifier = models.CharField(max_length=254, unique=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='login_identifiers')
+
+    def __str__(self):
+        return f"{self.identifier} ({self.kind}) -> user {self.user_id}"
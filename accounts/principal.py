@@ -0,0 +1,107 @@
+"""
+Cached identity facts ("principal") of a user.
+
+Views, decorators and the context processor keep asking the same questions
+about the current user: which role, which department, does a student /
+supervisor / lecturer profile exist, what is the attachments.Lecturer id.
+Every hasattr(user, 'lecturer_profile') on a missing relation is a query.
+
+get_principal() answers all of them from one query, keeps the result on the
+user object for the rest of the request and in the cache across requests.
+The signals in accounts/signals.py drop the cached entry whenever the user or
+one of its profiles is saved or deleted. Entries live in the shared default
+cache (CACHES), so that reaches every worker; PRINCIPAL_CACHE_TIMEOUT is kept
+short because changes that skip the signals (queryset.update(), raw SQL) are
+only picked up when the entry expires.
+"""
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+DEFAULT_TIMEOUT = 300  # seconds
+
+
+@dataclass(frozen=True)
+class Principal:
+    user_id: int
+    role: int
+    is_superuser: bool = False
+    department_id: int = None
+    course_id: int = None
+    student_profile_id: int = None
+    supervisor_profile_id: int = None
+    lecturer_profile_id: int = None
+    lecturer_id: int = None
+
+    @property
+    def is_student(self):
+        return self.role == 1
+
+    @property
+    def is_supervisor(self):
+        return self.role == 2
+
+    @property
+    def is_lecturer(self):
+        return self.role == 3
+
+    @property
+    def is_admin(self):
+        return self.is_superuser or self.role == 4
+
+    @property
+    def role_display(self):
+        return dict(get_user_model().USER_TYPE_CHOICES).get(self.role)
+
+
+def cache_key(user_id):
+    return f'principal:{user_id}'
+
+
+def load_principal(user_id):
+    """Build the Principal from the database (one query), or None for an unknown user"""
+    row = get_user_model().objects.filter(pk=user_id).values(
+        'user_type', 'is_superuser', 'department_id', 'course_id',
+        'student_profile__id', 'supervisor_profile__id', 'lecturer_profile__id', 'attachment_lecturer__id',
+    ).first()
+    if row is None:
+        return None
+    return Principal(
+        user_id=user_id,
+        role=row['user_type'],
+        is_superuser=row['is_superuser'],
+        department_id=row['department_id'],
+        course_id=row['course_id'],
+        student_profile_id=row['student_profile__id'],
+        supervisor_profile_id=row['supervisor_profile__id'],
+        lecturer_profile_id=row['lecturer_profile__id'],
+        lecturer_id=row['attachment_lecturer__id'],
+    )
+
+
+def get_principal(user):
+    """The Principal of ``user``, or None for anonymous users"""
+    if not getattr(user, 'is_authenticated', False):
+        return None
+    principal = getattr(user, '_principal', None)
+    if principal is not None:
+        return principal
+
+    key = cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is not None:
+        principal = Principal(**cached)
+    else:
+        principal = load_principal(user.pk)
+        if principal is None:
+            return None
+        cache.set(key, asdict(principal), getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+    user._principal = principal
+    return principal
+
+
+def invalidate_principal(user_id):
+    if user_id is not None:
+        cache.delete(cache_key(user_id))
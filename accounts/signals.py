@@ -0,0 +1,64 @@
+# accounts/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from attachments.models import Lecturer
+from .models import LecturerProfile, StudentProfile, SupervisorProfile
+from .login_identifiers import sync_login_identifiers
+from .principal import invalidate_principal
+
+User = get_user_model()
+
+# CustomUser fields held by the Principal; saves touching only other fields
+# (e.g. last_login on every login) keep the cached entry.
+PRINCIPAL_USER_FIELDS = {'user_type', 'is_superuser', 'department', 'course'}
+# CustomUser fields users log in with (see login_identifiers.py)
+LOGIN_USER_FIELDS = {'email', 'student_id'}
+
+
+# ---------------- Principal cache (see principal.py) ---------------- #
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_principal_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not PRINCIPAL_USER_FIELDS.intersection(update_fields):
+        return
+    invalidate_principal(instance.pk)
+    instance._principal = None
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_save, sender=SupervisorProfile)
+@receiver(post_delete, sender=SupervisorProfile)
+@receiver(post_save, sender=LecturerProfile)
+@receiver(post_delete, sender=LecturerProfile)
+@receiver(post_save, sender=Lecturer)
+@receiver(post_delete, sender=Lecturer)
+def profile_principal_changed(sender, instance, **kwargs):
+    invalidate_principal(instance.user_id)
+    # Drop the per-request copy too when the user object is at hand
+    user = sender._meta.get_field('user').get_cached_value(instance, None)
+    if user is not None:
+        user._principal = None
+
+
+# ---------------- Login identifiers (see login_identifiers.py) ---------------- #
+
+@receiver(post_save, sender=User)
+def user_login_identifiers_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not LOGIN_USER_FIELDS.intersection(update_fields):
+        return
+    sync_login_identifiers(instance.pk)
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_save, sender=LecturerProfile)
+@receiver(post_save, sender=Lecturer)
+def profile_login_identifiers_changed(sender, instance, **kwargs):
+    sync_login_identifiers(instance.user_id)
+
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_delete, sender=LecturerProfile)
+@receiver(post_delete, sender=Lecturer)
+def profile_login_identifiers_deleted(sender, instance, **kwargs):
+    sync_login_identifiers(instance.user_id, create=False)
@@ -0,0 +1,291 @@
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from attachments.models import OutgoingEmail
+from attachments.smtp_sink import SMTPSink
+from attachments.tests import make_department, make_lecturer, make_student, smtp_settings
+from .backend import IDBackend, RoleBasedAuthBackend
+from .decorators import role_required
+from .email_utils import send_bulk_welcome_emails, send_welcome_email
+from .login_throttle import failure_count, lockout_remaining, record_login_failure, record_login_success
+from .models import LoginIdentifier, StudentProfile
+from .principal import get_principal
+
+User = get_user_model()
+
+
+def enqueue_welcome(user):
+    send_welcome_email(user, user.user_type)
+    return OutgoingEmail.objects.filter(to=[user.email]).get()
+
+
+class BulkWelcomeEmailTests(TestCase):
+    def setUp(self):
+        department = make_department(1)
+        self.students = [make_student(department, i) for i in range(5)]
+        User.objects.filter(pk=self.students[0].pk).update(first_name='Tom & Jerry')
+        # Looks like a placeholder; must come out as typed
+        User.objects.filter(pk=self.students[1].pk).update(first_name='@@student_id@@')
+        for student in self.students[:2]:
+            student.refresh_from_db()
+
+    def test_bulk_send_matches_single_render_over_one_connection(self):
+        with SMTPSink() as sink, smtp_settings(sink.port):
+            result = send_bulk_welcome_emails(User.objects.filter(user_type=1).order_by('id'), batch_size=2)
+        self.assertEqual(result.success_count, 5)
+        self.assertEqual(result.failed, {})
+        self.assertEqual(sink.sessions, 1)
+
+        # Same body as rendering the template for that user
+        for student, name in zip(self.students, ['Tom &amp; Jerry', '@@student_id@@']):
+            queued = enqueue_welcome(student)
+            delivered = next(m for m in sink.messages if m.recipients == [student.email])
+            plain, html = [part.get_payload(decode=True).decode() for part in delivered.message.get_payload()]
+            self.assertEqual(html.replace('\r\n', '\n'), queued.html_body)
+            self.assertIn(f'Hello {name},', html)
+
+    def test_failures_are_reported_per_recipient(self):
+        lecturer = make_lecturer(make_department(2), 1).user
+        with SMTPSink() as sink, smtp_settings(sink.port):
+            result = send_bulk_welcome_emails([*self.students, lecturer])
+        self.assertEqual(result.success_count, 5)
+        self.assertEqual(result.failed, {lecturer.email: 'No welcome email for this user type'})
+
+
+class PrincipalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.department = make_department(1)
+        self.lecturer = make_lecturer(self.department, 1)
+
+    def test_resolved_once_then_served_from_request_and_cache(self):
+        user = User.objects.get(pk=self.lecturer.user_id)
+        with self.assertNumQueries(1):
+            principal = get_principal(user)
+            self.assertIs(get_principal(user), principal)
+        self.assertTrue(principal.is_lecturer)
+        self.assertEqual(principal.lecturer_id, self.lecturer.id)
+        self.assertIsNone(principal.student_profile_id)
+
+        # Next request: a fresh user object, answered by the cache
+        with self.assertNumQueries(0):
+            self.assertEqual(get_principal(User(pk=user.pk)), principal)
+        self.assertIsNone(get_principal(AnonymousUser()))
+
+    def test_profile_and_role_changes_invalidate(self):
+        student = make_student(self.department, 1)
+        self.assertIsNone(get_principal(student).student_profile_id)
+
+        profile = StudentProfile.objects.create(
+            user=student, student_id='SP-1', course='CS', university='MU', department='IT',
+        )
+        self.assertEqual(get_principal(User.objects.get(pk=student.pk)).student_profile_id, profile.id)
+
+        student.last_login = timezone.now()
+        student.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            get_principal(User(pk=student.pk))
+
+        student.user_type = 2
+        student.save()
+        self.assertTrue(get_principal(student).is_supervisor)
+
+    def test_role_required_uses_the_principal(self):
+        view = role_required([3])(lambda request: 'ok')
+        request = RequestFactory().get('/')
+
+        request.user = make_student(self.department, 1)
+        with self.assertRaises(PermissionDenied):
+            view(request)
+        request.user = self.lecturer.user
+        self.assertEqual(view(request), 'ok')
+
+
+class LoginIdentifierTests(TestCase):
+    def setUp(self):
+        self.department = make_department(1)
+        self.student = make_student(self.department, 1)
+        self.lecturer = make_lecturer(self.department, 1)
+
+    def identifiers(self, user):
+        return dict(LoginIdentifier.objects.filter(user=user).values_list('identifier', 'kind'))
+
+    def test_identifiers_follow_the_source_models(self):
+        self.assertEqual(self.identifiers(self.student), {
+            'student1_1@example.com': 'email', 's1-1': 'student_id',
+        })
+        self.assertEqual(self.identifiers(self.lecturer.user), {
+            'lecturer1_1@example.com': 'email', 'l1-1': 'staff_id',
+        })
+
+        self.student.email = 'New.Address@Example.com'
+        self.student.save()
+        profile = StudentProfile.objects.create(
+            user=self.student, student_id='SP/001', course='CS', university='MU', department='IT',
+        )
+        self.assertEqual(self.identifiers(self.student), {
+            'new.address@example.com': 'email', 's1-1': 'student_id', 'sp/001': 'student_id',
+        })
+        profile.delete()
+        self.assertNotIn('sp/001', self.identifiers(self.student))
+
+        # A taken identifier stays with its owner
+        with self.assertLogs('accounts.login_identifiers', 'WARNING'):
+            StudentProfile.objects.create(
+                user=self.student, student_id='L1-1', course='CS', university='MU', department='IT',
+            )
+        self.assertEqual(LoginIdentifier.objects.get(identifier='l1-1').user_id, self.lecturer.user_id)
+
+        before = set(LoginIdentifier.objects.values_list('identifier', 'user_id'))
+        out = StringIO()
+        call_command('rebuild_login_identifiers', stdout=out)
+        self.assertIn(f'{len(before)} row(s)', out.getvalue())
+        self.assertEqual(set(LoginIdentifier.objects.values_list('identifier', 'user_id')), before)
+
+    def test_any_identifier_logs_in_with_one_query(self):
+        backend = IDBackend()
+        for username in ('S1-1', 's1-1', ' STUDENT1_1@example.com'):
+            with self.assertNumQueries(1):
+                self.assertEqual(backend.authenticate(None, username=username, password='testpass123'), self.student)
+        self.assertEqual(backend.authenticate(None, username='l1-1', password='testpass123'), self.lecturer.user)
+        self.assertIsNone(backend.authenticate(None, username='s1-1', password='wrong'))
+        with self.assertNumQueries(1):
+            self.assertIsNone(backend.authenticate(None, username='nobody', password='testpass123'))
+
+    def test_role_backend_only_accepts_the_roles_identifier_or_email(self):
+        backend = RoleBasedAuthBackend()
+        self.assertEqual(backend.authenticate(None, 'S1-1', 'testpass123', role='student'), self.student)
+        self.assertIsNone(backend.authenticate(None, 'S1-1', 'testpass123', role='lecturer'))
+        self.assertEqual(backend.authenticate(None, 'L1-1', 'testpass123', role='lecturer'), self.lecturer.user)
+        self.assertEqual(backend.authenticate(None, 'lecturer1_1@example.com', 'testpass123', role='supervisor'), self.lecturer.user)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_login', users=30, logins=20, stdout=out)
+        self.assertIn('indexed', out.getvalue())
+        self.assertFalse(User.objects.filter(email__startswith='login-bench-').exists())
+
+
+@override_settings(
+    LOGIN_RATE_WINDOW=100, LOGIN_RATE_LIMIT_IDENTIFIER=3, LOGIN_RATE_LIMIT_IP=50,
+    LOGIN_LOCKOUT_BASE=60, LOGIN_LOCKOUT_MAX=200,
+)
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().post('/accounts/login/', REMOTE_ADDR='198.51.100.7')
+
+    def fail_login(self, username, times, now):
+        return [record_login_failure(self.request, username, now=now) for _ in range(times)]
+
+    def test_lockout_doubles_per_repeat(self):
+        self.assertEqual(self.fail_login('S1-1', 3, now=1000), [0, 0, 60])
+        self.assertEqual(lockout_remaining(self.request, ' s1-1 ', now=1010), 50)
+        self.assertEqual(lockout_remaining(self.request, 'other', now=1010), 0)
+        self.assertEqual(lockout_remaining(self.request, 's1-1', now=1061), 0)
+
+        # Twice as long the next time, capped at LOGIN_LOCKOUT_MAX
+        self.assertEqual(self.fail_login('s1-1', 3, now=1070), [0, 0, 120])
+        self.assertEqual(self.fail_login('s1-1', 3, now=1200), [0, 0, 200])
+
+    def test_sliding_window_weights_the_previous_bucket(self):
+        self.fail_login('s1-1', 2, now=150)
+        self.assertEqual(failure_count('ip', '198.51.100.7', now=175), 2)
+        # A quarter into the next window, three quarters of the old bucket still count
+        self.assertEqual(failure_count('ip', '198.51.100.7', now=225), 1.5)
+        self.assertEqual(failure_count('ip', '198.51.100.7', now=300), 0)
+
+    @override_settings(LOGIN_RATE_LIMIT_IP=5)
+    def test_ip_limit_spans_login_names(self):
+        results = [record_login_failure(self.request, f'user{i}', now=1000) for i in range(5)]
+        self.assertEqual(results, [0, 0, 0, 0, 60])
+        self.assertEqual(lockout_remaining(self.request, 'someone-else', now=1000), 60)
+
+    @override_settings(LOGIN_RATE_LIMIT_IP=5)
+    def test_ip_limit_never_locks_out_real_login_names(self):
+        student = make_student(make_department(1), 1)
+        now = time.time()  # the login view checks against the clock
+        # Wrong passwords for a real name do not count against the shared address
+        self.fail_login(student.student_id, 2, now=now)
+        self.assertEqual(failure_count('ip', '198.51.100.7', now=now), 0)
+
+        for i in range(5):
+            record_login_failure(self.request, f'user{i}', now=now)
+        self.assertEqual(lockout_remaining(self.request, 'user9', now=now), 60)
+        self.assertEqual(lockout_remaining(self.request, student.student_id, now=now), 0)
+
+        # The same address as the request above, e.g. a campus NAT or a proxy
+        response = self.client.post(
+            '/accounts/login/', {'role': 'student', 'username': student.student_id, 'password': 'testpass123'},
+            REMOTE_ADDR='198.51.100.7',
+        )
+        self.assertRedirects(response, '/attachments/dashboard/', fetch_redirect_response=False)
+
+    def test_success_clears_the_login_name(self):
+        self.fail_login('s1-1', 2, now=time.time())
+        record_login_success(self.request, 's1-1')
+        self.assertEqual(self.fail_login('s1-1', 2, now=time.time()), [0, 0])
+
+    def test_lockout_of_a_login_name_is_per_address(self):
+        self.assertEqual(self.fail_login('s1-1', 3, now=1000), [0, 0, 60])
+        elsewhere = RequestFactory().post('/accounts/login/', REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(lockout_remaining(elsewhere, 's1-1', now=1010), 0)
+
+    @override_settings(LOGIN_RATE_LIMIT_IDENTIFIER_ANY_IP=4)
+    def test_login_name_limit_across_addresses(self):
+        requests = [RequestFactory().post('/accounts/login/', REMOTE_ADDR=f'203.0.113.{i}') for i in range(5)]
+        results = [record_login_failure(request, 's1-1', now=1000) for request in requests[:4]]
+        self.assertEqual(results, [0, 0, 0, 60])
+        self.assertEqual(lockout_remaining(requests[4], 's1-1', now=1000), 60)
+
+    def test_file_cache_counts_concurrent_failures(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            def fail(index):
+                request = RequestFactory().post('/accounts/login/', REMOTE_ADDR='198.51.100.7')
+                record_login_failure(request, f'user{index}', now=1000)
+
+            with ThreadPoolExecutor(8) as pool:
+                list(pool.map(fail, range(40)))
+            self.assertEqual(failure_count('ip', '198.51.100.7', now=1000), 40)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['accounts.hashers.TunedArgon2PasswordHasher', 'accounts.hashers.TunedPBKDF2PasswordHasher'],
+    PASSWORD_ARGON2_TIME_COST=1, PASSWORD_ARGON2_MEMORY_COST=1024, PASSWORD_ARGON2_PARALLELISM=1,
+    PASSWORD_PBKDF2_ITERATIONS=1000,
+)
+class PasswordHasherTests(SimpleTestCase):
+    def check(self, encoded):
+        rehashed = []
+        self.assertTrue(check_password('secret', encoded, setter=rehashed.append))
+        return rehashed
+
+    def test_old_hashes_are_upgraded_on_login(self):
+        self.assertEqual(self.check(make_password('secret', hasher='pbkdf2_sha256')), ['secret'])
+        self.assertEqual(self.check(make_password('secret')), [])
+
+    def test_changed_parameters_trigger_a_rehash(self):
+        encoded = make_password('secret')
+        self.assertIn('m=1024,t=1,p=1', encoded)
+        with self.settings(PASSWORD_ARGON2_TIME_COST=2):
+            self.assertEqual(self.check(encoded), ['secret'])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_password_hashers', rounds=1, max_cpu_ms=10000, stdout=out)
+        self.assertIn('TunedArgon2PasswordHasher', out.getvalue())
+        self.assertIn('throttle check', out.getvalue())
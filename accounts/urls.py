@@ -1,4 +1,5 @@
 # accounts/urls.py
+from django.conf import settings
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
@@ -21,7 +22,7 @@ urlpatterns = [
     path("lecturer/dashboard/", views.lecturer_dashboard, name="lecturer_dashboard"),
 
     # Extras
-    path("check-username/", views.check_username, name="check_username"),
+    path("check-username/", views.check_username_async if settings.ASYNC_VIEWS else views.check_username, name="check_username"),
     path("about/", views.about, name="about"),
     # Password reset
     path(
@@ -49,7 +50,7 @@ urlpatterns = [
     path('admin/login/', views.admin_login, name='admin_login'),
     path('admin/portal/', views.admin_portal, name='admin_portal'),
     path('admin/profile/', views.admin_profile, name='admin_profile'),
-    path('check-student-id/', views.check_student_id, name='check_student_id'),
+    path('check-student-id/', views.check_student_id_async if settings.ASYNC_VIEWS else views.check_student_id, name='check_student_id'),
 
     
 ]
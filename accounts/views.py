@@ -5,11 +5,17 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from .forms import UserRegistrationForm, UserLoginForm
-from .models import StudentProfile, SupervisorProfile, LecturerProfile, CustomUser
+from .models import StudentProfile, SupervisorProfile, LecturerProfile, CustomUser, LoginIdentifier
+from .login_identifiers import normalize_identifier
 from django.contrib.auth import get_user_model
 from attachments.models import Attachment, LogbookEntry, PlacementFormSubmission, Lecturer
 from attachments.models import Department, Course
+from attachments.reference_registry import get_reference_data
+from attachments.dashboard_stats import get_snapshot_stats
+from attachments.notifications import DIGEST_CHOICES, DIGEST_PREFERENCE, digest_frequency
 from .email_utils import send_welcome_email, send_admin_notification_email
+from .principal import get_principal
+from .login_throttle import lockout_remaining, record_login_failure, record_login_success
 from django.conf import settings
 from django.contrib.auth.forms import PasswordChangeForm
 from django.core.files.storage import default_storage
@@ -45,7 +51,7 @@ def user_register(request):
         if not all([first_name, last_name, email, password1, password2, user_type]):
             messages.error(request, "Please fill in all required fields.")
             return render(request, 'accounts/register.html', {
-                'departments': Department.objects.filter(university="Machakos University"),
+                **get_reference_data().context(),
                 'public_roles': PUBLIC_ROLES
             })
         
@@ -53,7 +59,7 @@ def user_register(request):
         if password1 != password2:
             messages.error(request, "Passwords do not match.")
             return render(request, 'accounts/register.html', {
-                'departments': Department.objects.filter(university="Machakos University"),
+                **get_reference_data().context(),
                 'public_roles': PUBLIC_ROLES
             })
         
@@ -61,7 +67,7 @@ def user_register(request):
         if len(password1) < 8:
             messages.error(request, "Password must be at least 8 characters long.")
             return render(request, 'accounts/register.html', {
-                'departments': Department.objects.filter(university="Machakos University"),
+                **get_reference_data().context(),
                 'public_roles': PUBLIC_ROLES
             })
         
@@ -69,7 +75,7 @@ def user_register(request):
         if User.objects.filter(email=email).exists():
             messages.error(request, "A user with this email already exists.")
             return render(request, 'accounts/register.html', {
-                'departments': Department.objects.filter(university="Machakos University"),
+                **get_reference_data().context(),
                 'public_roles': PUBLIC_ROLES
             })
         
@@ -85,7 +91,7 @@ def user_register(request):
                 if not all([student_id, year_of_study, department_id, course_id]):
                     messages.error(request, "Please fill in all student information.")
                     return render(request, 'accounts/register.html', {
-                        'departments': Department.objects.filter(university="Machakos University"),
+                        **get_reference_data().context(),
                         'public_roles': PUBLIC_ROLES
                     })
                 
@@ -93,14 +99,14 @@ def user_register(request):
                 if User.objects.filter(student_id=student_id).exists():
                     messages.error(request, f"A student with ID '{student_id}' already exists. Please use a different Student ID.")
                     return render(request, 'accounts/register.html', {
-                        'departments': Department.objects.filter(university="Machakos University"),
+                        **get_reference_data().context(),
                         'public_roles': PUBLIC_ROLES
                     })
                 
                 if StudentProfile.objects.filter(student_id=student_id).exists():
                     messages.error(request, f"A student with ID '{student_id}' already exists. Please use a different Student ID.")
                     return render(request, 'accounts/register.html', {
-                        'departments': Department.objects.filter(university="Machakos University"),
+                        **get_reference_data().context(),
                         'public_roles': PUBLIC_ROLES
                     })
                 
@@ -110,13 +116,13 @@ def user_register(request):
                     if year_of_study_int < 1 or year_of_study_int > 6:
                         messages.error(request, "Year of study must be between 1 and 6.")
                         return render(request, 'accounts/register.html', {
-                            'departments': Department.objects.filter(university="Machakos University"),
+                            **get_reference_data().context(),
                             'public_roles': PUBLIC_ROLES
                         })
                 except ValueError:
                     messages.error(request, "Year of study must be a valid number.")
                     return render(request, 'accounts/register.html', {
-                        'departments': Department.objects.filter(university="Machakos University"),
+                        **get_reference_data().context(),
                         'public_roles': PUBLIC_ROLES
                     })
                 
@@ -126,7 +132,7 @@ def user_register(request):
                 except (Department.DoesNotExist, Course.DoesNotExist):
                     messages.error(request, "Invalid department or course selected.")
                     return render(request, 'accounts/register.html', {
-                        'departments': Department.objects.filter(university="Machakos University"),
+                        **get_reference_data().context(),
                         'public_roles': PUBLIC_ROLES
                     })
             
@@ -171,7 +177,7 @@ def user_register(request):
                     else:
                         messages.error(request, f"Error creating student profile: {str(e)}")
                     return render(request, 'accounts/register.html', {
-                        'departments': Department.objects.filter(university="Machakos University"),
+                        **get_reference_data().context(),
                         'public_roles': PUBLIC_ROLES
                     })
                 
@@ -199,7 +205,7 @@ def user_register(request):
                     user.delete()
                     messages.error(request, "Please fill in all supervisor information.")
                     return render(request, 'accounts/register.html', {
-                        'departments': Department.objects.filter(university="Machakos University"),
+                        **get_reference_data().context(),
                         'public_roles': PUBLIC_ROLES
                     })
                 
@@ -221,7 +227,7 @@ def user_register(request):
                     user.delete()
                     messages.error(request, f"Error creating supervisor profile: {str(e)}")
                     return render(request, 'accounts/register.html', {
-                        'departments': Department.objects.filter(university="Machakos University"),
+                        **get_reference_data().context(),
                         'public_roles': PUBLIC_ROLES
                     })
                 
@@ -255,25 +261,37 @@ def user_register(request):
             # Handle any unexpected errors
             messages.error(request, f"An error occurred during registration: {str(e)}")
             return render(request, 'accounts/register.html', {
-                'departments': Department.objects.filter(university="Machakos University"),
+                **get_reference_data().context(),
                 'public_roles': PUBLIC_ROLES
             })
     
     else:
         # GET request - provide departments for the form
-        departments = Department.objects.filter(university="Machakos University")
         return render(request, 'accounts/register.html', {
-            'departments': departments,
+            **get_reference_data().context(),
             'public_roles': PUBLIC_ROLES
         })
 
+
+def lockout_message(seconds):
+    minutes = max(1, -(-seconds // 60))
+    return f"Too many failed login attempts. Please try again in {minutes} minute{'s' if minutes != 1 else ''}."
+
+
 def user_login(request):
     if request.method == 'POST':
         selected_role = request.POST.get("role", "student")
         username = request.POST.get('username')
         password = request.POST.get('password')
         
-        if username and password:
+        status = 200
+        locked_for = lockout_remaining(request, username) if username and password else 0
+
+        if locked_for:
+            # Turned away before authenticate(), so a locked-out attempt costs no hashing
+            messages.error(request, lockout_message(locked_for))
+            status = 429
+        elif username and password:
             try:
                 # Use Django's authenticate function with your custom backend
                 user = authenticate(
@@ -283,6 +301,7 @@ def user_login(request):
                 )
                 
                 if user is not None:
+                    record_login_success(request, username)
                     # Verify the role matches the selected role
                     role_matches = False
                     if selected_role == "student" and user.user_type == 1:
@@ -313,7 +332,12 @@ def user_login(request):
                     else:
                         messages.error(request, f"Role mismatch! Please select '{user.get_user_type_display()}' role to login.")
                 else:
-                    messages.error(request, "Invalid credentials. Please try again.")
+                    locked_for = record_login_failure(request, username)
+                    if locked_for:
+                        messages.error(request, lockout_message(locked_for))
+                        status = 429
+                    else:
+                        messages.error(request, "Invalid credentials. Please try again.")
                 
             except Exception as e:
                 messages.error(request, "An error occurred during authentication.")
@@ -328,7 +352,7 @@ def user_login(request):
         return render(request, 'accounts/login.html', {
             'form': form,
             'role_map': ROLE_MAP
-        })
+        }, status=status)
     
     else:
         # GET request
@@ -347,7 +371,12 @@ def admin_login(request):
     
     if request.method == 'POST':
         form = UserLoginForm(request, data=request.POST)
-        
+        locked_for = lockout_remaining(request, request.POST.get('username'))
+
+        if locked_for:
+            messages.error(request, lockout_message(locked_for))
+            return render(request, 'accounts/admin_login.html', {'form': UserLoginForm()}, status=429)
+
         if form.is_valid():
             username = form.cleaned_data.get('username')
             password = form.cleaned_data.get('password')
@@ -360,6 +389,7 @@ def admin_login(request):
                     return redirect('accounts:admin_login')
                 
                 # Login success
+                record_login_success(request, username)
                 user.backend = 'accounts.backend.IDBackend'
                 login(request, user)
                 messages.success(request, f"Welcome to Admin Portal, {user.first_name}!")
@@ -369,6 +399,12 @@ def admin_login(request):
             else:
                 messages.error(request, "Invalid email or password.")
         else:
+            if form.non_field_errors():
+                # AuthenticationForm already tried (and failed) to authenticate
+                locked_for = record_login_failure(request, request.POST.get('username'))
+                if locked_for:
+                    messages.error(request, lockout_message(locked_for))
+                    return render(request, 'accounts/admin_login.html', {'form': UserLoginForm()}, status=429)
             for field, errors in form.errors.items():
                 for error in errors:
                     messages.error(request, f"{field}: {error}")
@@ -384,17 +420,14 @@ def admin_portal(request):
     if not request.user.is_authenticated or not (request.user.is_superuser or request.user.user_type == 4):
         return redirect('accounts:admin_login')
     
-    # Quick stats for the portal
-    total_students = User.objects.filter(user_type=1).count()
-    total_lecturers = Lecturer.objects.filter(is_active=True).count()
-    total_placements = PlacementFormSubmission.objects.count()
-    pending_placements = PlacementFormSubmission.objects.filter(status='pending').count()
+    # Quick stats for the portal (materialized dashboard counters)
+    stats = get_snapshot_stats()
     
     context = {
-        'total_students': total_students,
-        'total_lecturers': total_lecturers,
-        'total_placements': total_placements,
-        'pending_placements': pending_placements,
+        'total_students': stats['total_students'],
+        'total_lecturers': stats['total_lecturers'],
+        'total_placements': stats['total_placements'],
+        'pending_placements': stats['pending_placements'],
     }
     
     return render(request, 'accounts/admin_portal.html', context)
@@ -416,7 +449,8 @@ def profile(request):
     profile_updated = False
     password_updated = False
 
-    if hasattr(user, 'student_profile'):
+    principal = get_principal(user)
+    if principal.student_profile_id:
         profile = user.student_profile
         logbook_entries = LogbookEntry.objects.filter(attachment__student=user).order_by('-entry_date')[:5]
         total_entries = LogbookEntry.objects.filter(attachment__student=user).count()
@@ -425,9 +459,9 @@ def profile(request):
         if attachments.exists():
             completion_rate = round(sum(a.progress_percentage for a in attachments) / attachments.count())
 
-    elif hasattr(user, 'supervisor_profile'):
+    elif principal.supervisor_profile_id:
         profile = user.supervisor_profile
-    elif hasattr(user, 'lecturer_profile'):
+    elif principal.lecturer_profile_id:
         profile = user.lecturer_profile
 
     # Handle profile information update
@@ -441,7 +475,7 @@ def profile(request):
             user.save()
 
             # Update profile-specific information
-            if user.user_type == 1 and hasattr(user, 'student_profile'):
+            if user.user_type == 1 and principal.student_profile_id:
                 user.student_profile.student_id = request.POST.get('student_id', user.student_profile.student_id)
                 user.student_profile.course = request.POST.get('course', user.student_profile.course)
                 user.student_profile.year_of_study = request.POST.get('year_of_study', user.student_profile.year_of_study)
@@ -449,13 +483,13 @@ def profile(request):
                 user.student_profile.university = request.POST.get('university', user.student_profile.university)
                 user.student_profile.save()
             
-            elif user.user_type == 2 and hasattr(user, 'supervisor_profile'):
+            elif user.user_type == 2 and principal.supervisor_profile_id:
                 user.supervisor_profile.organization = request.POST.get('organization', user.supervisor_profile.organization)
                 user.supervisor_profile.position = request.POST.get('position', user.supervisor_profile.position)
                 user.supervisor_profile.department = request.POST.get('department', user.supervisor_profile.department)
                 user.supervisor_profile.save()
             
-            elif user.user_type == 3 and hasattr(user, 'lecturer_profile'):
+            elif user.user_type == 3 and principal.lecturer_profile_id:
                 user.lecturer_profile.staff_id = request.POST.get('staff_id', user.lecturer_profile.staff_id)
                 user.lecturer_profile.department = request.POST.get('department', user.lecturer_profile.department)
                 user.lecturer_profile.faculty = request.POST.get('faculty', user.lecturer_profile.faculty)
@@ -488,8 +522,11 @@ def profile(request):
                 'email_notifications': email_notifications,
                 'logbook_reminders': logbook_reminders,
                 'evaluation_alerts': evaluation_alerts,
-                'newsletter': newsletter
+                'newsletter': newsletter,
+                DIGEST_PREFERENCE: digest_frequency(user),
             }
+            if request.POST.get(DIGEST_PREFERENCE) in dict(DIGEST_CHOICES):
+                user.notification_preferences[DIGEST_PREFERENCE] = request.POST[DIGEST_PREFERENCE]
             user.save()
             messages.success(request, "Notification preferences updated!")
 
@@ -518,16 +555,26 @@ def profile(request):
         'profile_updated': profile_updated,
         'password_updated': password_updated,
         'notification_prefs': notification_prefs,
+        'logbook_digest': digest_frequency(user),
+        'digest_choices': DIGEST_CHOICES,
         'dark_theme_enabled': getattr(user, 'dark_theme_enabled', False)
     })
 
+def _taken_login_names(value, kinds):
+    identifier = normalize_identifier(value)
+    return LoginIdentifier.objects.filter(identifier=identifier, kind__in=kinds) if identifier else None
+
 def check_username(request):
-    username = request.GET.get('username')
-    exists = User.objects.filter(student_id__iexact=username).exists() or User.objects.filter(staff_id__iexact=username).exists()
-    return JsonResponse({'is_taken': exists})
+    taken = _taken_login_names(request.GET.get('username'), ['student_id', 'staff_id'])
+    return JsonResponse({'is_taken': taken is not None and taken.exists()})
+
+async def check_username_async(request):
+    taken = _taken_login_names(request.GET.get('username'), ['student_id', 'staff_id'])
+    return JsonResponse({'is_taken': taken is not None and await taken.aexists()})
 
 def about(request):
-    return render(request, 'about.html')
+    # The page body is a cached template fragment; only the base layout is rendered per request
+    return render(request, 'about.html', {'page_cache_timeout': getattr(settings, 'PAGE_CACHE_TIMEOUT', 3600)})
 
 @login_required
 def upload_profile_picture(request):
@@ -538,15 +585,14 @@ def upload_profile_picture(request):
     return redirect("accounts:profile")
 
 def check_student_id(request):
-    """Check if student ID is already taken in BOTH User and StudentProfile"""
-    student_id = request.GET.get('student_id', '')
-    if student_id:
-        # Check both User model and StudentProfile model
-        is_taken_user = User.objects.filter(student_id__iexact=student_id).exists()
-        is_taken_profile = StudentProfile.objects.filter(student_id__iexact=student_id).exists()
-        is_taken = is_taken_user or is_taken_profile
-        return JsonResponse({'is_taken': is_taken})
-    return JsonResponse({'is_taken': False})
+    """Check if student ID is already taken (by a user or a student profile)"""
+    # LoginIdentifier holds both CustomUser.student_id and StudentProfile.student_id
+    taken = _taken_login_names(request.GET.get('student_id', ''), ['student_id'])
+    return JsonResponse({'is_taken': taken is not None and taken.exists()})
+
+async def check_student_id_async(request):
+    taken = _taken_login_names(request.GET.get('student_id', ''), ['student_id'])
+    return JsonResponse({'is_taken': taken is not None and await taken.aexists()})
     
 @login_required
 def student_dashboard(request):
@@ -571,7 +617,8 @@ def admin_profile(request):
     profile_updated = False
     password_updated = False
 
-    if hasattr(user, 'student_profile'):
+    principal = get_principal(user)
+    if principal.student_profile_id:
         profile = user.student_profile
         logbook_entries = LogbookEntry.objects.filter(attachment__student=user).order_by('-entry_date')[:5]
         total_entries = LogbookEntry.objects.filter(attachment__student=user).count()
@@ -580,9 +627,9 @@ def admin_profile(request):
         if attachments.exists():
             completion_rate = round(sum(a.progress_percentage for a in attachments) / attachments.count())
 
-    elif hasattr(user, 'supervisor_profile'):
+    elif principal.supervisor_profile_id:
         profile = user.supervisor_profile
-    elif hasattr(user, 'lecturer_profile'):
+    elif principal.lecturer_profile_id:
         profile = user.lecturer_profile
 
     # Handle profile information update for admin profile
@@ -0,0 +1,203 @@
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .dashboard_stats import record_assignment_changes
+from .matching import solve_assignment
+from .models import Lecturer, PlacementFormSubmission, StudentAssignment
+
+User = get_user_model()
+
+
+def current_academic_year():
+    """Academic year label used for new assignments (matches the existing views)"""
+    return str(timezone.now().year)
+
+
+@dataclass
+class AssignmentResult:
+    """Outcome of an assignment run, shared by the admin views and the management command"""
+    assigned: list = field(default_factory=list)   # StudentAssignment instances written
+    skipped: list = field(default_factory=list)    # (student, reason) pairs that were left unassigned
+    errors: list = field(default_factory=list)     # human readable error messages
+    unmatched: list = field(default_factory=list)  # students no lecturer had room for (also in skipped)
+
+    @property
+    def assigned_count(self):
+        return len(self.assigned)
+
+    def summary(self, limit=5):
+        """Short comma separated list of skip reasons and errors for flash messages"""
+        problems = [reason for _, reason in self.skipped] + self.errors
+        text = ", ".join(problems[:limit])
+        return text + ("..." if len(problems) > limit else "")
+
+
+def _student_label(student):
+    return student.get_full_name() or student.email
+
+
+def _lecturer_label(lecturer):
+    return lecturer.user.get_full_name() or lecturer.user.email
+
+
+def _unmatched_reason(student):
+    department_name = student.department.name if student.department else 'None'
+    return f"No available lecturer for {_student_label(student)} (Department: {department_name})"
+
+
+def available_lecturers(department=None):
+    """Active lecturers annotated with their current load, least loaded first"""
+    lecturers = Lecturer.objects.filter(is_active=True)
+    if department is not None:
+        lecturers = lecturers.filter(department=department)
+    return lecturers.annotate(
+        assigned_count=Count('assigned_students'),
+        available_slots=models.F('max_students') - Count('assigned_students'),
+    ).select_related('user', 'department').order_by('assigned_count', 'id')
+
+
+def unassigned_students(department=None):
+    students = User.objects.filter(user_type=1, student_assignments__isnull=True)
+    if department is not None:
+        students = students.filter(department=department)
+    return students.select_related('department', 'course').order_by('id')
+
+
+def placement_forms_by_student(student_ids):
+    """First placement form (lowest id) per student, fetched in a single query"""
+    forms = {}
+    for placement in PlacementFormSubmission.objects.filter(student_id__in=student_ids).order_by('id'):
+        forms.setdefault(placement.student_id, placement)
+    return forms
+
+
+def write_plan(plan, academic_year=None, forms=None):
+    """
+    Persist a plan with one bulk INSERT inside a single transaction. Students
+    that got an assignment for the academic year in the meantime are skipped.
+    ``forms`` is the placement_forms_by_student() mapping when already loaded.
+
+    The INSERT ignores conflicts on (student, academic_year): an assignment
+    made by hand or by another run after the check must not roll the whole
+    batch back. Which rows went in is then read back, and only those are
+    counted into the dashboard.
+    """
+    academic_year = academic_year or current_academic_year()
+    result = AssignmentResult()
+    if not plan:
+        return result
+
+    student_ids = [student.id for student, _ in plan]
+    with transaction.atomic():
+        already_assigned = set(
+            StudentAssignment.objects.filter(
+                student_id__in=student_ids, academic_year=academic_year
+            ).values_list('student_id', flat=True)
+        )
+        if forms is None:
+            forms = placement_forms_by_student(student_ids)
+
+        rows = []
+        for student, lecturer in plan:
+            if student.id in already_assigned:
+                result.skipped.append((student, f"{_student_label(student)} is already assigned"))
+                continue
+            already_assigned.add(student.id)
+            rows.append(StudentAssignment(
+                student=student,
+                lecturer=lecturer,
+                placement_form=forms.get(student.id),
+                academic_year=academic_year,
+            ))
+
+        StudentAssignment.objects.bulk_create(rows, ignore_conflicts=True)
+        # Conflicting rows get no error and no primary key; keep the rows that are ours
+        written = {
+            (student_id, lecturer_id): pk
+            for pk, student_id, lecturer_id in StudentAssignment.objects.filter(
+                student_id__in=[row.student_id for row in rows], academic_year=academic_year,
+            ).values_list('pk', 'student_id', 'lecturer_id')
+        }
+        for row in rows:
+            row.pk = written.get((row.student_id, row.lecturer_id))
+            if row.pk is None:
+                result.skipped.append((row.student, f"{_student_label(row.student)} is already assigned"))
+            else:
+                row._state.adding = False
+                result.assigned.append(row)
+        # bulk_create bypasses post_save, so count the rows into the dashboard explicitly
+        record_assignment_changes(result.assigned, 1)
+    return result
+
+
+def auto_assign(department=None, academic_year=None, allow_cross_department=True, dry_run=False, students=None,
+                group_by_town=True):
+    """
+    Assign every unassigned student (optionally of one department) to a
+    lecturer, respecting capacity, department and placement town (matching.py).
+    Pass ``students`` to assign only that batch (used by assignment jobs).
+    """
+    if students is None:
+        students = unassigned_students(department)
+    students = list(students)
+    lecturers = [lecturer for lecturer in available_lecturers(department) if lecturer.available_slots > 0]
+
+    if not students:
+        return AssignmentResult()
+    if not lecturers:
+        result = AssignmentResult(unmatched=students)
+        result.errors.append('No lecturers with available slots.')
+        return result
+
+    forms = placement_forms_by_student([student.id for student in students])
+    towns = {student_id: form.town_city for student_id, form in forms.items()}
+    plan, unmatched = solve_assignment(
+        students, lecturers, towns=towns, allow_cross_department=allow_cross_department, group_by_town=group_by_town,
+    )
+    if dry_run:
+        result = AssignmentResult(assigned=[
+            StudentAssignment(student=student, lecturer=lecturer, academic_year=academic_year or current_academic_year())
+            for student, lecturer in plan
+        ])
+    else:
+        result = write_plan(plan, academic_year, forms=forms)
+    result.skipped = [(student, _unmatched_reason(student)) for student in unmatched] + result.skipped
+    result.unmatched = unmatched
+    return result
+
+
+def assign_pairs(pairs, academic_year=None):
+    """
+    Assign explicit (student_id, lecturer_id) pairs, e.g. from the bulk assign
+    form. Students, lecturers and loads are loaded with one query each.
+    """
+    result = AssignmentResult()
+    student_ids = {student_id for student_id, _ in pairs}
+    lecturer_ids = {lecturer_id for _, lecturer_id in pairs}
+    students = User.objects.filter(id__in=student_ids, user_type=1).in_bulk()
+    lecturers = Lecturer.objects.filter(id__in=lecturer_ids).annotate(
+        assigned_count=Count('assigned_students'),
+    ).select_related('user').in_bulk()
+
+    load = {lecturer.id: lecturer.assigned_count for lecturer in lecturers.values()}
+    plan = []
+    for student_id, lecturer_id in pairs:
+        student = students.get(student_id)
+        lecturer = lecturers.get(lecturer_id)
+        if student is None or lecturer is None:
+            result.errors.append("Invalid assignment data")
+            continue
+        if load[lecturer.id] >= lecturer.max_students:
+            result.skipped.append((student, f"{_lecturer_label(lecturer)} has no available slots for {_student_label(student)}"))
+            continue
+        load[lecturer.id] += 1
+        plan.append((student, lecturer))
+
+    written = write_plan(plan, academic_year)
+    result.assigned = written.assigned
+    result.skipped += written.skipped
+    return result
@@ -0,0 +1,234 @@
+"""
+Background student assignment jobs.
+
+The admin views only enqueue an AssignmentJob row; the run_assignment_worker
+management command claims queued jobs and processes them in chunks. Every
+chunk writes its assignments and advances the job cursor in one transaction,
+so a worker that dies mid-run loses at most the chunk in flight and the next
+worker to claim the job (once its heartbeat is stale) resumes from the cursor.
+Re-running a chunk is harmless because write_plan() skips students that are
+already assigned for the academic year.
+
+An 'auto' job runs in two passes: the chunks only match students within
+their own department, and the students left without a lecturer are spread
+across departments once at the end, so an early chunk's spill-over never
+takes the slots of students of that department in later chunks.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .assignment_engine import assign_pairs, auto_assign, current_academic_year, unassigned_students
+from .models import AssignmentJob, Department
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+# A running job whose heartbeat is older than this is considered abandoned
+STALE_AFTER = timedelta(minutes=5)
+MAX_STORED_ERRORS = 100
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def job_fingerprint(kind, payload):
+    raw = json.dumps([kind, payload], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _active_job(fingerprint):
+    return AssignmentJob.objects.filter(fingerprint=fingerprint, status__in=('queued', 'running')).first()
+
+
+def enqueue_job(kind, payload=None, user=None):
+    """
+    Queue an assignment job and return ``(job, created)``. Submitting the same
+    kind + payload while an identical job is still queued or running returns
+    that job instead of creating a duplicate.
+    """
+    payload = dict(payload or {})
+    payload.setdefault('academic_year', current_academic_year())
+    fingerprint = job_fingerprint(kind, payload)
+
+    job = _active_job(fingerprint)
+    if job is not None:
+        return job, False
+    try:
+        with transaction.atomic():
+            job = AssignmentJob.objects.create(kind=kind, payload=payload, fingerprint=fingerprint, created_by=user)
+    except IntegrityError:
+        # Lost the race against an identical submission (unique_active_assignment_job)
+        return _active_job(fingerprint), False
+
+    if getattr(settings, 'ASSIGNMENT_JOBS_INLINE', False):
+        job = claim_job(job.pk) or job
+        if job.status == 'running':
+            run_job(job)
+    return job, True
+
+
+def _claim(job, worker, now):
+    """Optimistic claim: only succeeds if nobody changed the job since it was read"""
+    claimed = AssignmentJob.objects.filter(
+        pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at
+    ).update(status='running', worker=worker, heartbeat_at=now, started_at=job.started_at or now)
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def _claimable(now):
+    return AssignmentJob.objects.filter(
+        Q(status='queued') | Q(status='running', heartbeat_at__lt=now - STALE_AFTER)
+    )
+
+
+def claim_job(job_id, worker=None):
+    now = timezone.now()
+    job = _claimable(now).filter(pk=job_id).first()
+    return _claim(job, worker or worker_name(), now) if job else None
+
+
+def claim_next_job(worker=None):
+    """Claim the oldest queued (or abandoned) job, or return None"""
+    now = timezone.now()
+    worker = worker or worker_name()
+    for job in _claimable(now).order_by('created_at', 'id')[:10]:
+        claimed = _claim(job, worker, now)
+        if claimed is not None:
+            return claimed
+    return None
+
+
+def _record_chunk(job, size, result, cursor, defer_unmatched=False):
+    """Add a chunk's outcome to the job; deferred unmatched students are counted by the spill-over pass"""
+    skipped = result.skipped
+    if defer_unmatched:
+        unmatched = {student.id for student in result.unmatched}
+        skipped = [(student, reason) for student, reason in skipped if student.id not in unmatched]
+        size -= len(unmatched)
+    job.processed += size
+    job.assigned += result.assigned_count
+    job.failed += len(skipped) + len(result.errors)
+    problems = [reason for _, reason in skipped] + result.errors
+    job.errors = (job.errors + problems)[:MAX_STORED_ERRORS]
+    job.cursor = cursor
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=['processed', 'assigned', 'failed', 'errors', 'cursor', 'heartbeat_at'])
+
+
+def _job_department(job):
+    department_id = job.payload.get('department_id')
+    if department_id is None:
+        return None
+    department = Department.objects.filter(pk=department_id).first()
+    if department is None:
+        raise ValueError(f"Department {department_id} no longer exists")
+    return department
+
+
+def _count_remaining(job):
+    if job.kind == 'bulk':
+        return len(job.payload.get('pairs', [])) + job.payload.get('invalid', 0)
+    if job.kind == 'auto':
+        # Students deferred to the spill-over are not processed yet
+        return job.processed + unassigned_students().count()
+    return job.processed + unassigned_students(_job_department(job)).filter(id__gt=job.cursor).count()
+
+
+def _process_chunk(job, chunk_size):
+    """Process the next chunk; returns False once there is nothing left"""
+    academic_year = job.payload.get('academic_year')
+    if job.kind == 'bulk':
+        pairs = job.payload.get('pairs', [])
+        chunk = [tuple(pair) for pair in pairs[job.cursor:job.cursor + chunk_size]]
+        if not chunk:
+            return False
+        with transaction.atomic():
+            result = assign_pairs(chunk, academic_year)
+            _record_chunk(job, len(chunk), result, job.cursor + len(chunk))
+        return True
+
+    department = _job_department(job)
+    students = list(unassigned_students(department).filter(id__gt=job.cursor)[:chunk_size])
+    if not students:
+        return False
+    with transaction.atomic():
+        result = auto_assign(
+            department=department,
+            academic_year=academic_year,
+            allow_cross_department=False,
+            students=students,
+        )
+        _record_chunk(job, len(students), result, students[-1].id, defer_unmatched=job.kind == 'auto')
+    return True
+
+
+def _spill_over(job):
+    """Second pass of an 'auto' job: place the students of every chunk that found no lecturer in their department"""
+    students = list(unassigned_students().filter(id__lte=job.cursor))
+    if students:
+        result = auto_assign(
+            academic_year=job.payload.get('academic_year'), allow_cross_department=True, students=students,
+        )
+        _record_chunk(job, len(students), result, job.cursor)
+
+
+def run_job(job, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Run a claimed job to completion, persisting progress after every chunk"""
+    try:
+        job.total = _count_remaining(job)
+        job.save(update_fields=['total'])
+        while _process_chunk(job, chunk_size):
+            pass
+        # Committed with the completion, so a worker dying here leaves the spill-over to the next one
+        with transaction.atomic():
+            if job.kind == 'auto':
+                _spill_over(job)
+            if job.kind == 'bulk' and job.payload.get('invalid'):
+                job.failed += job.payload['invalid']
+                job.errors = (job.errors + ["Invalid assignment data"] * job.payload['invalid'])[:MAX_STORED_ERRORS]
+                job.processed += job.payload['invalid']
+            job.status = 'completed'
+            _finish(job)
+    except Exception as e:
+        logger.exception("Assignment job %s failed", job.pk)
+        job.status = 'failed'
+        job.errors = (job.errors + [str(e)])[:MAX_STORED_ERRORS]
+        _finish(job)
+    return job
+
+
+def _finish(job):
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'errors', 'processed', 'assigned', 'failed', 'finished_at'])
+
+
+def job_progress(job):
+    """JSON-serialisable progress snapshot for the polling endpoint"""
+    percent = 100 if job.status == 'completed' else (round(job.processed / job.total * 100) if job.total else 0)
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'assigned': job.assigned,
+        'failed': job.failed,
+        'percent': min(100, percent),
+        'errors': job.errors[:10],
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,12 @@
+# attachments/context_processors.py
+from django.utils.functional import SimpleLazyObject
+
+from .inbox import unread_count
+
+
+def inbox(request):
+    """``unread_messages`` for the header badge: one primary-key lookup, only on pages that show it"""
+    user = request.user
+    if not user.is_authenticated:
+        return {}
+    return {'unread_messages': SimpleLazyObject(lambda: unread_count(user.pk))}
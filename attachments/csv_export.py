@@ -0,0 +1,99 @@
+"""
+Streaming CSV exports.
+
+Rows come from ``values_list(...)`` projections read with
+``iterator(chunk_size=...)`` and are written through a pseudo-buffer into a
+StreamingHttpResponse, so memory stays flat however many rows are exported
+and the first bytes go out before the query has been read to the end.
+"""
+import csv
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+
+from .models import LogbookEntry, PlacementFormSubmission, ReportUpload
+
+User = get_user_model()
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+class Echo:
+    """File-like object whose write() hands the line back instead of storing it"""
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_csv_response(filename, header, rows, content_type='text/csv'):
+    response = StreamingHttpResponse(csv_lines(header, rows), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _full_name(first_name, last_name):
+    # Same as AbstractUser.get_full_name()
+    return f"{first_name} {last_name}".strip()
+
+
+STUDENT_HEADER = ['Student ID', 'Full Name', 'Email', 'Department', 'Course', 'Year of Study', 'Registration Date']
+
+def student_rows(students=None):
+    if students is None:
+        students = User.objects.filter(user_type=1)
+    rows = students.order_by('id').values_list(
+        'student_id', 'first_name', 'last_name', 'email', 'department__name', 'course__name',
+        'year_of_study', 'date_joined',
+    )
+    for student_id, first_name, last_name, email, department, course, year, joined in rows.iterator(chunk_size=chunk_size()):
+        yield [
+            student_id, _full_name(first_name, last_name), email,
+            department or '', course or '', year, joined.strftime('%Y-%m-%d'),
+        ]
+
+
+PLACEMENT_HEADER = ['Student', 'Department', 'Firm', 'Supervisor', 'Start Date', 'End Date', 'Status']
+
+def placement_rows():
+    rows = PlacementFormSubmission.objects.order_by('id').values_list(
+        'student__first_name', 'student__last_name', 'department__name', 'firm_name',
+        'supervisor_name', 'start_date', 'end_date', 'status',
+    )
+    for first_name, last_name, department, *rest in rows.iterator(chunk_size=chunk_size()):
+        yield [_full_name(first_name, last_name), department or '', *rest]
+
+
+REPORT_HEADER = ['Student', 'Attachment', 'File Name', 'Uploaded At']
+
+def report_rows():
+    rows = ReportUpload.objects.order_by('id').values_list(
+        'attachment__student__first_name', 'attachment__student__last_name',
+        'attachment__organization', 'file', 'uploaded_at',
+    )
+    for first_name, last_name, *rest in rows.iterator(chunk_size=chunk_size()):
+        yield [_full_name(first_name, last_name), *rest]
+
+
+LOGBOOK_HEADER = [
+    'University', 'Department', 'Student Name', 'Registration Number', 'Entry #', 'Date',
+    'Department/Section', 'Tasks', 'Skills Learned', 'Achievements', 'Challenges',
+    'Hours Worked', 'Supervisor Comments', 'Has Comments',
+]
+
+def logbook_rows(attachment, university_name, department_name, student):
+    rows = LogbookEntry.objects.filter(attachment=attachment).order_by('-entry_date').values_list(
+        'entry_date', 'department_section', 'tasks', 'skills_learned', 'achievements', 'challenges',
+        'hours_worked', 'supervisor_comments',
+    )
+    prefix = [university_name, department_name or '', student.get_full_name(), student.student_id or '']
+    for number, (*fields, comments) in enumerate(rows.iterator(chunk_size=chunk_size()), 1):
+        yield [*prefix, number, *fields, comments, 'Yes' if comments else 'No']
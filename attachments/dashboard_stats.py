@@ -0,0 +1,459 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import (
+    Attachment, DashboardSnapshot, Department, DepartmentStats, Lecturer,
+    PlacementFormSubmission, ReportUpload, StudentAssignment,
+)
+
+User = get_user_model()
+
+RECENT_REPORTS_DAYS = 7
+GROWTH_WINDOW_DAYS = 30
+MONTH_REPORTS_DAYS = 30
+
+# Time-windowed counters (growth, recent reports) drift as rows age out of the
+# window, so snapshots older than this are rebuilt on read.
+DEFAULT_SNAPSHOT_MAX_AGE = timedelta(hours=1)
+
+SNAPSHOT_PK = 1
+DEPARTMENT_COUNTERS = ['total_students', 'assigned_students', 'recent_reports', 'refreshed_at']
+
+
+def _count_subquery(queryset, group_field):
+    """Correlated COUNT(*) for one outer row, 0 when there are no matches"""
+    counted = queryset.order_by().values(group_field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def _distinct_count_subquery(queryset, group_field, distinct_field):
+    """Correlated COUNT(DISTINCT ...) for one outer row, 0 when there are no matches"""
+    counted = queryset.order_by().values(group_field).annotate(
+        total=Count(distinct_field, distinct=True)
+    ).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def _rate(part, whole):
+    return round((part / whole * 100), 1) if whole > 0 else 0
+
+
+# ---------------- Computing counters from the core tables ---------------- #
+
+def compute_department_counters(now=None, department_ids=None):
+    """
+    Raw per-department counters in a single query, keyed by department id.
+    Limit the computation to ``department_ids`` when given.
+    """
+    now = now or timezone.now()
+    recent_since = now - timedelta(days=RECENT_REPORTS_DAYS)
+
+    departments = Department.objects.all()
+    if department_ids is not None:
+        departments = departments.filter(pk__in=department_ids)
+
+    departments = departments.annotate(
+        student_total=_count_subquery(
+            User.objects.filter(user_type=1, department=OuterRef('pk')),
+            'department',
+        ),
+        assigned_total=_distinct_count_subquery(
+            StudentAssignment.objects.filter(student__department=OuterRef('pk')),
+            'student__department',
+            'student',
+        ),
+        recent_reports_total=_count_subquery(
+            ReportUpload.objects.filter(
+                attachment__student__department=OuterRef('pk'),
+                uploaded_at__gte=recent_since,
+            ),
+            'attachment__student__department',
+        ),
+    ).order_by('pk')
+
+    return {
+        dept.id: {
+            'name': dept.name,
+            'code': dept.code,
+            'total_students': dept.student_total,
+            'assigned_students': dept.assigned_total,
+            'recent_reports': dept.recent_reports_total,
+        }
+        for dept in departments
+    }
+
+
+def compute_global_counters(now=None):
+    """Raw global counters (the DashboardSnapshot fields) from a fixed number of aggregate queries"""
+    now = now or timezone.now()
+    last_month = now - timedelta(days=GROWTH_WINDOW_DAYS)
+    week_since = now - timedelta(days=RECENT_REPORTS_DAYS)
+    month_since = now - timedelta(days=MONTH_REPORTS_DAYS)
+
+    students = User.objects.aggregate(
+        total=Count('pk', filter=Q(user_type=1)),
+        last_month=Count('pk', filter=Q(user_type=1, date_joined__lt=last_month)),
+    )
+    lecturers = Lecturer.objects.filter(is_active=True).aggregate(
+        total=Count('pk'),
+        total_slots=Sum('max_students'),
+    )
+    assignments = StudentAssignment.objects.aggregate(
+        assigned_students=Count('student', distinct=True),
+        used_slots=Count('pk', filter=Q(lecturer__is_active=True)),
+    )
+    placements = PlacementFormSubmission.objects.aggregate(
+        total=Count('pk'),
+        pending=Count('pk', filter=Q(status='pending')),
+    )
+    pending_attachments = Attachment.objects.filter(status='pending').count()
+    reports = ReportUpload.objects.aggregate(
+        total=Count('pk'),
+        week=Count('pk', filter=Q(uploaded_at__gte=week_since)),
+        month=Count('pk', filter=Q(uploaded_at__gte=month_since)),
+    )
+
+    return {
+        'total_students': students['total'],
+        'students_last_month': students['last_month'],
+        'total_lecturers': lecturers['total'],
+        'total_slots': lecturers['total_slots'] or 0,
+        'used_slots': assignments['used_slots'],
+        'assigned_students': assignments['assigned_students'],
+        'total_placements': placements['total'],
+        'pending_placements': placements['pending'],
+        'pending_attachments': pending_attachments,
+        'total_reports': reports['total'],
+        'reports_this_week': reports['week'],
+        'reports_this_month': reports['month'],
+    }
+
+
+# ---------------- Shaping counters for the templates ---------------- #
+
+def _department_row(department_id, counters):
+    total = counters['total_students']
+    assigned = counters['assigned_students']
+    return {
+        'id': department_id,
+        'name': counters['name'],
+        'code': counters['code'],
+        'total_placements': total,
+        'assigned_placements': assigned,
+        'unassigned_placements': total - assigned,
+        'recent_reports': counters['recent_reports'],
+        'assignment_rate': _rate(assigned, total),
+    }
+
+
+def _dashboard_context(counters, department_stats):
+    total_students = counters['total_students']
+    assigned = counters['assigned_students']
+    return {
+        'total_students': total_students,
+        'total_lecturers': counters['total_lecturers'],
+        'total_placements': counters['total_placements'],
+        'pending_placements': counters['pending_placements'],
+        'assigned_students_count': assigned,
+        'unassigned_students_count': total_students - assigned,
+        'pending_approvals_count': counters['pending_placements'] + counters['pending_attachments'],
+        'new_reports_count': counters['reports_this_week'],
+        'total_reports': counters['total_reports'],
+        'reports_this_week': counters['reports_this_week'],
+        'reports_this_month': counters['reports_this_month'],
+        'student_growth': _rate(total_students - counters['students_last_month'], counters['students_last_month']),
+        'available_slots': counters['total_slots'] - counters['used_slots'],
+        'assignment_rate': _rate(assigned, total_students),
+        'department_stats': department_stats,
+    }
+
+
+def get_department_stats(now=None):
+    """
+    Per-department student / assignment / report figures in a single query.
+    Returns the list of dicts consumed by the admin dashboard template.
+    """
+    return [
+        _department_row(dept_id, counters)
+        for dept_id, counters in compute_department_counters(now=now).items()
+    ]
+
+
+def get_dashboard_stats(now=None):
+    """
+    Global admin KPIs plus the department breakdown, computed live with a fixed
+    number of aggregate queries regardless of how many departments exist.
+    """
+    return _dashboard_context(compute_global_counters(now=now), get_department_stats(now=now))
+
+
+# ---------------- Materialized DashboardSnapshot / DepartmentStats ---------------- #
+
+def _save_department_counters(department_counters, now):
+    DepartmentStats.objects.bulk_create(
+        [
+            DepartmentStats(
+                department_id=dept_id,
+                total_students=counters['total_students'],
+                assigned_students=counters['assigned_students'],
+                recent_reports=counters['recent_reports'],
+                refreshed_at=now,
+            )
+            for dept_id, counters in department_counters.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['department'],
+        update_fields=DEPARTMENT_COUNTERS,
+    )
+
+
+def _save_global_counters(counters, now):
+    snapshot, _ = DashboardSnapshot.objects.update_or_create(
+        pk=SNAPSHOT_PK, defaults={**counters, 'refreshed_at': now}
+    )
+    return snapshot
+
+
+def rebuild_dashboard_stats(now=None):
+    """Recompute the snapshot and every department row from the core tables"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        department_counters = compute_department_counters(now=now)
+        _save_department_counters(department_counters, now)
+        DepartmentStats.objects.exclude(department_id__in=department_counters.keys()).delete()
+        snapshot = _save_global_counters(compute_global_counters(now=now), now)
+    return snapshot, len(department_counters)
+
+
+def refresh_dashboard_stats(department_ids=(), student_ids=(), attachment_ids=()):
+    """
+    Recount the global snapshot and only the departments touched by a change.
+    Students and attachments are resolved to their department here so that
+    signal handlers never have to query.
+    """
+    now = timezone.now()
+    department_ids = set(department_ids)
+    if student_ids:
+        department_ids.update(
+            User.objects.filter(pk__in=student_ids).values_list('department_id', flat=True)
+        )
+    if attachment_ids:
+        department_ids.update(
+            Attachment.objects.filter(pk__in=attachment_ids).values_list('student__department_id', flat=True)
+        )
+    department_ids.discard(None)
+
+    with transaction.atomic():
+        if department_ids:
+            _save_department_counters(compute_department_counters(now=now, department_ids=department_ids), now)
+        _save_global_counters(compute_global_counters(now=now), now)
+
+
+def _moved(field, delta):
+    # Clamped at 0: a delta racing a rebuild must not break the unsigned column
+    return Greatest(F(field) + delta, Value(0))
+
+
+def apply_stats_changes(counters, department_counters):
+    """
+    Move the materialized counters by the given differences: one UPDATE of
+    the snapshot and one per department. Departments without a row yet are
+    counted from the core tables instead. A missing snapshot is left to the
+    next read, which rebuilds everything.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        counters = {field: delta for field, delta in counters.items() if delta}
+        if counters:
+            DashboardSnapshot.objects.filter(pk=SNAPSHOT_PK).update(
+                **{field: _moved(field, delta) for field, delta in counters.items()}
+            )
+        missing = set()
+        for department_id, deltas in department_counters.items():
+            rows = DepartmentStats.objects.filter(department_id=department_id)
+            deltas = {field: delta for field, delta in deltas.items() if delta}
+            if deltas:
+                found = rows.update(**{field: _moved(field, delta) for field, delta in deltas.items()})
+            else:
+                found = rows.exists()
+            if not found:
+                missing.add(department_id)
+        if missing:
+            _save_department_counters(compute_department_counters(now=now, department_ids=missing), now)
+
+
+class _PendingRefresh:
+    """Changes collected during one transaction, applied once on commit"""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.department_counters = defaultdict(Counter)
+        self.assignment_flips = {1: set(), -1: set()}
+        self.recount = False
+        self.department_ids = set()
+        self.student_ids = set()
+        self.attachment_ids = set()
+        self.executed = False
+
+    def __call__(self):
+        self.executed = True
+        apply_stats_changes(self.counters, self.department_counters)
+        if self.recount:
+            refresh_dashboard_stats(self.department_ids, self.student_ids, self.attachment_ids)
+
+
+def _pending():
+    """The current transaction's _PendingRefresh, registered with on_commit on first use"""
+    connection = transaction.get_connection()
+    pending = getattr(connection, '_dashboard_stats_pending', None)
+    scheduled = (
+        pending is not None
+        and not pending.executed
+        and any(entry[1] is pending for entry in connection.run_on_commit)
+    )
+    if not scheduled:
+        pending = _PendingRefresh()
+        connection._dashboard_stats_pending = pending
+    return pending, scheduled
+
+
+def _schedule(pending, scheduled):
+    if not scheduled:
+        # Runs immediately in autocommit mode, so register after recording changes
+        transaction.on_commit(pending)
+
+
+def record_stats_change(department_id=None, department=None, **counters):
+    """
+    Move the DashboardSnapshot fields in ``counters`` (field name ->
+    difference) and the DepartmentStats fields in ``department`` for
+    ``department_id`` once the current transaction commits. Changes made
+    inside one transaction are summed into a single UPDATE per row.
+    """
+    pending, scheduled = _pending()
+    pending.counters.update(counters)
+    if department_id and department:
+        pending.department_counters[department_id].update(department)
+    _schedule(pending, scheduled)
+
+
+def mark_stats_dirty(department_ids=(), student_ids=(), attachment_ids=()):
+    """
+    Schedule a recount of the global snapshot and the given departments
+    after the current transaction commits, for changes whose effect on the
+    counters is not known up front. Repeated calls inside one transaction
+    are coalesced into a single recount.
+    """
+    pending, scheduled = _pending()
+    pending.recount = True
+    pending.department_ids.update(i for i in department_ids if i)
+    pending.student_ids.update(i for i in student_ids if i)
+    pending.attachment_ids.update(i for i in attachment_ids if i)
+    _schedule(pending, scheduled)
+
+
+# ---------------- Deltas of the individual changes (called from signals.py) ---------------- #
+
+def joined_before_growth_window(date_joined, now=None):
+    """Whether a student counts towards students_last_month"""
+    now = now or timezone.now()
+    return date_joined is not None and date_joined < now - timedelta(days=GROWTH_WINDOW_DAYS)
+
+
+def report_windows(uploaded_at, now=None):
+    """The report counters an upload from ``uploaded_at`` belongs to (1) or not (0)"""
+    now = now or timezone.now()
+    return {
+        'total_reports': 1,
+        'reports_this_week': int(uploaded_at >= now - timedelta(days=RECENT_REPORTS_DAYS)),
+        'reports_this_month': int(uploaded_at >= now - timedelta(days=MONTH_REPORTS_DAYS)),
+    }
+
+
+def record_report_change(attachment_id, uploaded_at, sign):
+    """Count an upload in (``sign`` 1) or out (-1) of the report counters"""
+    windows = report_windows(uploaded_at)
+    department_id = Attachment.objects.filter(pk=attachment_id).values_list(
+        'student__department_id', flat=True
+    ).first()
+    record_stats_change(
+        department_id=department_id, department={'recent_reports': sign * windows['reports_this_week']},
+        **{field: sign * counted for field, counted in windows.items()},
+    )
+
+
+def record_assignment_changes(assignments, sign):
+    """
+    Count created (``sign`` 1) or deleted (-1) StudentAssignments, which
+    must already be saved or deleted: used slots follow the lecturers that
+    are active, and a student only turns (un)assigned when the change left
+    them with no other assignment. Three queries for any number of rows.
+    """
+    assignments = list(assignments)
+    if not assignments:
+        return
+    active = set(
+        Lecturer.objects.filter(pk__in={row.lecturer_id for row in assignments}, is_active=True)
+        .values_list('pk', flat=True)
+    )
+    student_ids = {row.student_id for row in assignments}
+    still_assigned = set(
+        StudentAssignment.objects.filter(student_id__in=student_ids)
+        .exclude(pk__in=[row.pk for row in assignments if row.pk])
+        .values_list('student_id', flat=True)
+    )
+    student_departments = dict(
+        User.objects.filter(pk__in=student_ids - still_assigned).values_list('pk', 'department_id')
+    )
+    # A cascade deletes all of a student's assignments before any post_delete
+    # runs, so each student is counted once per transaction and direction
+    pending, scheduled = _pending()
+    flipped = set(student_departments) - pending.assignment_flips[sign]
+    pending.assignment_flips[sign].update(flipped)
+    pending.counters.update(
+        used_slots=sign * sum(row.lecturer_id in active for row in assignments),
+        assigned_students=sign * len(flipped),
+    )
+    for student_id in flipped:
+        if student_departments[student_id]:
+            pending.department_counters[student_departments[student_id]]['assigned_students'] += sign
+    _schedule(pending, scheduled)
+
+
+def get_snapshot_stats(max_age=None):
+    """
+    Dashboard context read from the materialized tables (two queries).
+    The tables are rebuilt first when missing or older than ``max_age``.
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'DASHBOARD_STATS_MAX_AGE', DEFAULT_SNAPSHOT_MAX_AGE)
+
+    snapshot = DashboardSnapshot.objects.filter(pk=SNAPSHOT_PK).first()
+    if snapshot is None or snapshot.refreshed_at < timezone.now() - max_age:
+        snapshot, _ = rebuild_dashboard_stats()
+
+    counters = {
+        field.name: getattr(snapshot, field.name)
+        for field in DashboardSnapshot._meta.concrete_fields
+        if field.name not in ('id', 'refreshed_at')
+    }
+    department_stats = [
+        _department_row(row.department_id, {
+            'name': row.department.name,
+            'code': row.department.code,
+            'total_students': row.total_students,
+            'assigned_students': row.assigned_students,
+            'recent_reports': row.recent_reports,
+        })
+        for row in DepartmentStats.objects.select_related('department').order_by('department_id')
+    ]
+    context = _dashboard_context(counters, department_stats)
+    context['stats_refreshed_at'] = snapshot.refreshed_at
+    return context
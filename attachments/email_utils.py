@@ -1,4 +1,4 @@
-from django.core.mail import send_mail
+from .outbox import enqueue_email
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
@@ -24,20 +24,19 @@ def send_lecturer_credentials(email, first_name, staff_id, password):
         
         subject = 'Your PractiCheck Lecturer Account Credentials'
         
-        send_mail(
+        enqueue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[email],
             html_message=html_message,
-            fail_silently=False,
         )
         
-        logger.info(f"Lecturer credentials email sent successfully to {email}")
+        logger.info(f"Lecturer credentials email queued for {email}")
         return True
         
     except Exception as e:
-        logger.error(f"Failed to send lecturer credentials email to {email}: {str(e)}")
+        logger.error(f"Failed to queue lecturer credentials email to {email}: {str(e)}")
         return False
 
 def send_lecturer_password_reset(email, first_name, staff_id, new_password):
@@ -57,18 +56,17 @@ def send_lecturer_password_reset(email, first_name, staff_id, new_password):
         
         subject = 'PractiCheck - Password Reset'
         
-        send_mail(
+        enqueue_email(
             subject=subject,
             message=plain_message,
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[email],
             html_message=html_message,
-            fail_silently=False,
         )
         
-        logger.info(f"Password reset email sent successfully to {email}")
+        logger.info(f"Password reset email queued for {email}")
         return True
         
     except Exception as e:
-        logger.error(f"Failed to send password reset email to {email}: {str(e)}")
+        logger.error(f"Failed to queue password reset email to {email}: {str(e)}")
         return False
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+File downloads that do not read the file into the worker.
+
+serve_file() answers a download once the view has done its permission
+check:
+
+- ETag / Last-Modified from the file's size and mtime, with If-None-Match /
+  If-Modified-Since (304) and If-Match / If-Unmodified-Since (412) handled
+  by django.utils.cache.get_conditional_response.
+- A single ``Range: bytes=...`` (honouring If-Range) is answered with 206 and
+  only those bytes; an unsatisfiable one with 416. Several ranges at once
+  get the whole file, which the RFC allows.
+- In the default mode the body is a FileResponse over the open file, so
+  gunicorn hands it to os.sendfile() (wsgi.file_wrapper) and other servers
+  stream it in blocks. For ranges the file is positioned at the first byte
+  and capped at the range length, which gunicorn's sendfile honours through
+  Content-Length.
+- With FILE_SERVING_MODE = 'x-accel-redirect' (nginx) or 'x-sendfile'
+  (Apache mod_xsendfile, lighttpd) Django only sends headers and the front
+  proxy serves the bytes, ranges included. X-Accel-Redirect needs the
+  file's directory in FILE_SERVING_ACCEL_LOCATIONS mapped to an
+  ``internal`` nginx location; files outside them are served by Django.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    Read-only view of ``length`` bytes of an open file, starting at ``start``.
+    Positions (seek/tell) are those of the underlying file, the same ones
+    gunicorn reads from fileno() before it calls socket.sendfile(); reads
+    stop at the end of the range wherever the file was positioned.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.end = start + length
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # gevent's socket.sendfile() seeks to the offset it was given and past what it sent
+        position = self.file.seek(offset, whence)
+        self.remaining = max(self.end - position, 0)
+        return position
+
+    def tell(self):
+        return self.file.tell()
+
+    def fileno(self):
+        # Lets gunicorn sendfile() from the current offset
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) of a single byte range, ``None`` to send the
+    whole file, or ``False`` when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match((header or '').replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None  # Invalid, so ignored
+    if start >= size:
+        return False
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def if_range_matches(request, etag, last_modified):
+    """Whether a Range request may be honoured given its If-Range validator (absent = yes)"""
+    validator = request.headers.get('If-Range')
+    if not validator:
+        return True
+    if validator.startswith('"') or validator.startswith('W/'):
+        return validator == etag
+    return parse_http_date_safe(validator) == last_modified
+
+
+def accel_location(path):
+    """X-Accel-Redirect URL for ``path``, or None if it is under no configured location"""
+    path = os.path.realpath(path)
+    for root, prefix in getattr(settings, 'FILE_SERVING_ACCEL_LOCATIONS', {}).items():
+        root = os.path.realpath(root)
+        if path.startswith(root + os.sep):
+            return prefix.rstrip('/') + '/' + quote(os.path.relpath(path, root).replace(os.sep, '/'))
+    return None
+
+
+def serve_file(request, path, filename=None, content_type=None, as_attachment=True):
+    """Response for downloading the local file at ``path`` (see the module docstring)"""
+    filename = filename or os.path.basename(path)
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    mode = getattr(settings, 'FILE_SERVING_MODE', 'django')
+    location = accel_location(path) if mode == 'x-accel-redirect' else None
+    if location or mode == 'x-sendfile':
+        # Headers only; the proxy sends the body (and handles Range itself)
+        response = HttpResponse(content_type=content_type)
+        if location:
+            response['X-Accel-Redirect'] = location
+        else:
+            response['X-Sendfile'] = os.path.realpath(path)
+    else:
+        byte_range = None
+        if request.method in ('GET', 'HEAD') and if_range_matches(request, etag, last_modified):
+            byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+        file = open(path, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+            response['Content-Length'] = stat.st_size
+        else:
+            start, end = byte_range
+            response = FileResponse(FileRange(file, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def serve_field_file(request, field_file, filename=None, **kwargs):
+    """serve_file() for a FileField value; storages without local paths are streamed as is"""
+    filename = filename or os.path.basename(field_file.name)
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        return FileResponse(field_file.open('rb'), as_attachment=kwargs.get('as_attachment', True), filename=filename)
+    return serve_file(request, path, filename=filename, **kwargs)
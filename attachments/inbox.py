@@ -0,0 +1,135 @@
+"""
+Message threads and unread counters.
+
+Messages used to be loose rows, so an inbox meant grouping all of a user's
+messages and an unread badge meant a COUNT over received_messages. Now:
+
+- every pair of users shares one MessageThread;
+- each side of a thread has a ThreadParticipant row with its own
+  unread_count;
+- InboxSummary holds each user's total, so the badge on every page is one
+  primary-key lookup (unread_count()).
+
+post_message() and mark_threads_read() keep the three in step inside one
+transaction. Counters only move through F() updates, so concurrent senders
+never lose an increment. Marking read first locks the participant rows
+(select_for_update) and subtracts exactly what they held, with the same
+number of queries for one thread or all of them. Messages must be sent
+through post_message(); a bare Message.objects.create() bypasses the
+counters.
+
+Inboxes list threads newest first with keyset pagination over
+(user, -last_message_at, -id), served by thread_participant_inbox_idx.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, PositiveIntegerField, When
+from django.utils import timezone
+
+from .keyset import keyset_page
+from .models import InboxSummary, Message, MessageThread, ThreadParticipant
+
+THREAD_ORDERING = ['-last_message_at', '-id']
+MESSAGE_ORDERING = ['-timestamp', '-id']
+
+
+def pair_key(user_id, other_id):
+    low, high = sorted((user_id, other_id))
+    return f'{low}:{high}'
+
+
+def get_thread(user_id, other_id):
+    """The thread of two users, created with both participants on first use"""
+    key = pair_key(user_id, other_id)
+    thread = MessageThread.objects.filter(pair_key=key).first()
+    if thread is not None:
+        return thread
+    try:
+        with transaction.atomic():
+            thread = MessageThread.objects.create(pair_key=key)
+            ThreadParticipant.objects.bulk_create(
+                [ThreadParticipant(thread=thread, user_id=participant) for participant in sorted({user_id, other_id})]
+            )
+    except IntegrityError:  # started concurrently by the other side
+        thread = MessageThread.objects.get(pair_key=key)
+    return thread
+
+
+def _add_unread(user_id, count):
+    if not InboxSummary.objects.filter(pk=user_id).update(unread_count=F('unread_count') + count):
+        # First message to this user
+        InboxSummary.objects.get_or_create(user_id=user_id)
+        InboxSummary.objects.filter(pk=user_id).update(unread_count=F('unread_count') + count)
+
+
+def post_message(sender, recipient, body, subject='', attachment=None):
+    """Add a message to the thread of ``sender`` and ``recipient`` and count it as unread for the recipient"""
+    with transaction.atomic():
+        thread = get_thread(sender.pk, recipient.pk)
+        message = Message.objects.create(
+            thread=thread, sender=sender, recipient=recipient, subject=subject, body=body, attachment=attachment,
+        )
+        # The thread row is locked first, so concurrent sends to one thread queue up here
+        MessageThread.objects.filter(pk=thread.pk).update(
+            last_message=message, last_message_at=message.timestamp, message_count=F('message_count') + 1,
+        )
+        ThreadParticipant.objects.filter(thread=thread).update(
+            last_message_at=message.timestamp,
+            unread_count=Case(
+                When(user_id=recipient.pk, then=F('unread_count') + 1),
+                default=F('unread_count'), output_field=PositiveIntegerField(),
+            ),
+        )
+        _add_unread(recipient.pk, 1)
+    return message
+
+
+def mark_threads_read(user, thread_ids=None):
+    """
+    Mark the user's messages in ``thread_ids`` (all threads by default) read.
+    Returns how many unread messages that cleared.
+    """
+    with transaction.atomic():
+        participants = ThreadParticipant.objects.select_for_update().filter(user=user, unread_count__gt=0)
+        if thread_ids is not None:
+            participants = participants.filter(thread_id__in=thread_ids)
+        unread = dict(participants.values_list('thread_id', 'unread_count'))
+        if not unread:
+            return 0
+        ThreadParticipant.objects.filter(user=user, thread_id__in=unread).update(
+            unread_count=0, last_read_at=timezone.now(),
+        )
+        Message.objects.filter(recipient=user, thread_id__in=unread, is_read=False).update(is_read=True)
+        cleared = sum(unread.values())
+        InboxSummary.objects.filter(pk=user.pk).update(unread_count=F('unread_count') - cleared)
+    return cleared
+
+
+def unread_count(user_id):
+    """Unread messages of a user: one primary-key lookup"""
+    return next(iter(InboxSummary.objects.filter(pk=user_id).values_list('unread_count', flat=True)), 0)
+
+
+def thread_page(user, cursor=None, page_size=20):
+    """
+    One page of the user's threads, newest first. Each item is the user's
+    ThreadParticipant with ``thread.last_message`` loaded and ``other_user``
+    set to the other side (the user itself for notes to self).
+    """
+    page = keyset_page(
+        ThreadParticipant.objects.filter(user=user, last_message_at__isnull=False)
+        .select_related('thread__last_message'),
+        THREAD_ORDERING, cursor, page_size,
+    )
+    others = {
+        participant.thread_id: participant.user
+        for participant in ThreadParticipant.objects.filter(thread_id__in=[item.thread_id for item in page.items])
+        .exclude(user=user).select_related('user')
+    }
+    for item in page.items:
+        item.other_user = others.get(item.thread_id, user)
+    return page
+
+
+def message_page(thread, cursor=None, page_size=50):
+    """One page of a thread's messages, newest first"""
+    return keyset_page(Message.objects.filter(thread=thread).select_related('sender'), MESSAGE_ORDERING, cursor, page_size)
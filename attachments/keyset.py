@@ -0,0 +1,96 @@
+"""
+Keyset (seek) pagination.
+
+Instead of OFFSET, every page continues from the ordering values of the last
+row of the previous page, so page N costs the same as page 1 and rows
+inserted meanwhile do not shift the pages. The ordering must end with a
+unique field (usually ``id``) and the cursor is an opaque token for the
+``?after=`` query parameter. Cursors come from the client, so each value is
+converted with its field's to_python(); a cursor that does not fit the
+ordering is ignored like a malformed one (first page).
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+@dataclass
+class KeysetPage:
+    items: list = field(default_factory=list)
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Cursor values, or None for a missing or malformed token"""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _field(model, path):
+    """Model field at the end of ``path`` (e.g. 'thread__last_message_at')"""
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def cursor_values(model, ordering, values):
+    """``values`` converted to the ordering fields' types, or None if they do not fit"""
+    if values is None or len(values) != len(ordering):
+        return None
+    converted = []
+    for name, value in zip(ordering, values):
+        try:
+            value = _field(model, name.lstrip('-')).to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            return None
+        if value is None:
+            return None
+        converted.append(value)
+    return converted
+
+
+def seek_filter(ordering, values):
+    """Rows strictly after ``values`` in ``ordering`` (e.g. ['-entry_date', '-id'])"""
+    condition = Q()
+    for index, name in enumerate(ordering):
+        column = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        step = Q(**{f'{column}__{lookup}': values[index]})
+        for previous, value in zip(ordering[:index], values[:index]):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=50):
+    """One page of ``queryset`` ordered by ``ordering``, starting after ``cursor``"""
+    queryset = queryset.order_by(*ordering)
+    values = cursor_values(queryset.model, ordering, decode_cursor(cursor))
+    if values is not None:
+        queryset = queryset.filter(seek_filter(ordering, values))
+
+    items = list(queryset[:page_size + 1])
+    page = KeysetPage(items=items[:page_size])
+    if len(items) > page_size:
+        last = page.items[-1]
+        page.next_cursor = encode_cursor([getattr(last, name.lstrip('-')) for name in ordering])
+    return page
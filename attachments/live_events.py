@@ -0,0 +1,302 @@
+"""
+Live notifications for supervisors, lecturers and admins (Server-Sent Events).
+
+Dashboards stay open for hours and were reloaded (or polled) to find out
+about new logbook entries, report uploads, placement forms, messages and
+lecturer assignments. Pages now open one EventSource on the live_events view
+and update themselves from small events instead:
+
+    event: logbook_entry
+    data: {"id":41,"attachment_id":7,"entry_date":"2025-03-04"}
+
+Publishing: the receivers in signals.py call publish() with the event type,
+a payload of ids (never rendered HTML) and the audience: user ids and/or
+roles. Nothing is sent before the transaction commits, so a client never
+asks for a row it cannot see yet, and the audience query (usually a lazy
+values_list) runs only then. With LIVE_EVENTS_ENABLED off (the default
+outside the ASGI profile, where nobody can be listening) publish() and
+send_event() do nothing at all.
+
+Fan-out: each worker process has one Broker with a bounded asyncio.Queue
+per open stream. With PostgreSQL, publish() runs pg_notify() and every
+worker keeps one connection of its own LISTENing on LIVE_EVENTS_CHANNEL
+(started with its first stream), so events reach streams on all workers and
+instances. On other databases (development, tests) events only reach the
+streams of the process that published them.
+
+Streams are served by a small ASGI app in front of Django (see
+with_live_events and practicheck/asgi.py), so only in the ASGI profile.
+Django's own ASGI handler keeps a thread for every request until its
+response ends (the sync middleware runs there), which for a stream means one
+idle OS thread per open page. Here the session is only looked up in a pool
+thread; after that an open stream is a parked coroutine and its queue, with
+no thread, greenlet or database connection. A client that falls behind loses
+events rather than growing the queue, and events sent while a page was
+reconnecting are lost too; on reconnect static/js/live_events.js reloads the
+page's data-live-count counters.
+"""
+import asyncio
+import json
+import logging
+import threading
+from contextlib import suppress
+from dataclasses import dataclass
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user, get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+from django.urls import reverse
+
+from accounts.principal import get_principal
+from .models import Attachment
+
+logger = logging.getLogger(__name__)
+
+ADMIN_ROLE = 4
+STAFF_ROLES = (2, 3, 4)  # supervisor, lecturer, admin
+RETRY_MS = 5000  # EventSource reconnect delay
+
+
+def enabled():
+    return getattr(settings, 'LIVE_EVENTS_ENABLED', False)
+
+
+def _channel():
+    return getattr(settings, 'LIVE_EVENTS_CHANNEL', 'practicheck_events')
+
+
+@dataclass(eq=False)
+class Subscription:
+    """One open stream: who is listening and the queue its events go to"""
+    user_id: int
+    role: int
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+    dropped: int = 0
+
+    def wants(self, event):
+        return self.user_id in event['users'] or self.role in event['roles']
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
+class Broker:
+    """The streams of this process; dispatch() may be called from any thread"""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, user_id, role):
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(
+            user_id, role, loop, asyncio.Queue(getattr(settings, 'LIVE_EVENTS_QUEUE_SIZE', 100)),
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+        if connection.vendor == 'postgresql':
+            self._ensure_listener(loop)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def dispatch(self, event):
+        """Queue ``event`` for every matching stream; returns how many matched"""
+        with self._lock:
+            targets = [subscription for subscription in self._subscriptions if subscription.wants(event)]
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for subscription in targets:
+            if subscription.loop is current:
+                subscription.put(event)
+            else:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.put, event)
+                except RuntimeError:  # loop closed: the stream is gone
+                    self.unsubscribe(subscription)
+        return len(targets)
+
+    def _ensure_listener(self, loop):
+        with self._lock:
+            if self._listener is None or self._listener.done() or self._listener.get_loop() is not loop:
+                self._listener = loop.create_task(self._listen())
+
+    async def _listen(self):
+        """LISTEN on the channel for the life of the worker, reconnecting with backoff"""
+        import psycopg
+        from psycopg import sql
+
+        delay = 1
+        while True:
+            try:
+                conn = await psycopg.AsyncConnection.connect(**listen_connection_kwargs(), autocommit=True)
+                async with conn:
+                    await conn.execute(sql.SQL('LISTEN {}').format(sql.Identifier(_channel())))
+                    delay = 1
+                    async for notify in conn.notifies():
+                        try:
+                            event = json.loads(notify.payload)
+                        except ValueError:
+                            continue
+                        self.dispatch(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Live events listener lost its connection; retrying in %ss", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+broker = Broker()
+
+
+def listen_connection_kwargs():
+    """A connection outside Django's pool: LISTEN keeps its session for good"""
+    settings_dict = connection.settings_dict
+    options = {key: value for key, value in settings_dict.get('OPTIONS', {}).items() if key == 'sslmode'}
+    return dict(
+        dbname=settings_dict['NAME'], user=settings_dict['USER'], password=settings_dict['PASSWORD'],
+        host=settings_dict['HOST'] or None, port=settings_dict['PORT'] or None, **options,
+    )
+
+
+def publish(event_type, data, users=(), roles=()):
+    """
+    Send ``data`` as an ``event_type`` event to ``users`` (ids, or a lazy
+    values_list queryset) and to everyone with one of ``roles`` once the
+    current transaction commits.
+    """
+    if enabled():
+        transaction.on_commit(lambda: send_event(event_type, data, users, roles), robust=True)
+
+
+def send_event(event_type, data, users=(), roles=()):
+    """Send an event now (see publish()); nothing when LIVE_EVENTS_ENABLED is off"""
+    if enabled():
+        broadcast(event_type, data, users, roles)
+
+
+def broadcast(event_type, data, users=(), roles=()):
+    """send_event() regardless of LIVE_EVENTS_ENABLED, e.g. to a server started with other settings"""
+    event = {
+        'type': event_type,
+        'data': data,
+        'users': sorted({user_id for user_id in users if user_id is not None}),
+        'roles': sorted(set(roles)),
+    }
+    if not event['users'] and not event['roles']:
+        return
+    payload = json.dumps(event, cls=DjangoJSONEncoder)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [_channel(), payload])
+    else:
+        broker.dispatch(json.loads(payload))
+
+
+def attachment_staff(attachment_id):
+    """User ids (lazy) of an attachment's supervisor and of its student's assigned lecturer"""
+    supervisor_emails = Attachment.objects.filter(pk=attachment_id).exclude(supervisor_email='').values('supervisor_email')
+    return get_user_model().objects.filter(
+        Q(user_type=2, email__in=supervisor_emails)
+        | Q(attachment_lecturer__assigned_students__student__attachments__id=attachment_id)
+    ).values_list('id', flat=True).distinct()
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+
+
+async def stream(principal, heartbeat=None):
+    """The text/event-stream body for ``principal``; unsubscribes when the client goes away"""
+    heartbeat = heartbeat or getattr(settings, 'LIVE_EVENTS_HEARTBEAT', 15)
+    role = ADMIN_ROLE if principal.is_admin else principal.role
+    subscription = broker.subscribe(principal.user_id, role)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle stream; EventSource ignores comments
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _session_principal(session_key):
+    """The Principal behind a session cookie (runs in a pool thread)"""
+    request = HttpRequest()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    try:
+        return get_principal(get_user(request))
+    finally:
+        close_old_connections()
+
+
+async def serve_stream(scope, receive, send):
+    """ASGI app: the event stream of the session's user until the client disconnects"""
+    cookie = b'; '.join(value for name, value in scope['headers'] if name == b'cookie').decode('latin-1')
+    session_key = parse_cookie(cookie).get(settings.SESSION_COOKIE_NAME)
+    principal = None
+    if session_key:
+        principal = await sync_to_async(_session_principal, thread_sensitive=False)(session_key)
+    if principal is None or not (principal.is_admin or principal.role in STAFF_ROLES):
+        # Not a redirect: EventSource gives up on any status but 200 instead of retrying
+        await send({'type': 'http.response.start', 'status': 403, 'headers': [(b'content-length', b'0')]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),  # nginx must pass events through as they come
+    ]})
+
+    async def pump():
+        async for chunk in stream(principal):
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+
+    pumping = asyncio.ensure_future(pump())
+    try:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+    finally:
+        pumping.cancel()
+        with suppress(asyncio.CancelledError):
+            await pumping
+
+
+def with_live_events(application):
+    """Wrap Django's ASGI ``application`` so that GETs of the live_events URL are streamed by serve_stream"""
+    path = None
+
+    async def app(scope, receive, send):
+        nonlocal path
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            path = path or reverse('attachments:live_events')
+            if scope['path'] == path:
+                return await serve_stream(scope, receive, send)
+        return await application(scope, receive, send)
+
+    return app
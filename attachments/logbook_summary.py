@@ -0,0 +1,80 @@
+"""
+Per-attachment logbook totals (LogbookSummary).
+
+The logbook pages used to re-run SUM(hours_worked) and two COUNTs over every
+entry of an attachment on each request. Instead the totals live in one
+LogbookSummary row per attachment that the LogbookEntry signals (signals.py)
+move by the difference each create / edit / comment / delete makes, with a
+single conditional UPDATE inside the caller's transaction.
+
+An attachment without a summary row yet (entries older than the table) gets
+one computed from its entries on first read.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Subquery, Sum
+
+from .models import LogbookEntry, LogbookSummary
+
+
+def is_reviewed(comments):
+    """An entry counts as reviewed once the supervisor left a non-blank comment"""
+    return bool(comments and comments.strip())
+
+
+def reviewed_q(prefix=''):
+    """Q() matching reviewed entries, optionally through a relation (e.g. ``'logbook_entries__'``)"""
+    return ~Q(**{f'{prefix}supervisor_comments__regex': r'^\s*$'})
+
+
+def compute_logbook_summary(attachment_id):
+    """Summary fields for one attachment, aggregated from its entries"""
+    totals = LogbookEntry.objects.filter(attachment_id=attachment_id).aggregate(
+        total_hours=Sum('hours_worked'),
+        entry_count=Count('id'),
+        reviewed_count=Count('id', filter=reviewed_q()),
+        last_entry_date=Max('entry_date'),
+    )
+    totals['total_hours'] = totals['total_hours'] or Decimal('0')
+    return totals
+
+
+def rebuild_logbook_summary(attachment_id):
+    summary, _ = LogbookSummary.objects.update_or_create(
+        attachment_id=attachment_id, defaults=compute_logbook_summary(attachment_id),
+    )
+    return summary
+
+
+def get_logbook_summary(attachment):
+    """The attachment's LogbookSummary, creating it from the entries if it does not exist yet"""
+    try:
+        return LogbookSummary.objects.get(attachment=attachment)
+    except LogbookSummary.DoesNotExist:
+        with transaction.atomic():
+            return rebuild_logbook_summary(attachment.id)
+
+
+def _last_entry_date(attachment_id):
+    # Served by the (attachment, entry_date) unique index
+    return Subquery(
+        LogbookEntry.objects.filter(attachment_id=attachment_id).order_by('-entry_date').values('entry_date')[:1]
+    )
+
+
+def apply_entry_change(attachment_id, hours=0, entries=0, reviewed=0, create_missing=True):
+    """
+    Move the attachment's totals by the given differences in one UPDATE.
+    Without a summary row the totals are recomputed instead (when
+    ``create_missing``), which already includes the change.
+    """
+    with transaction.atomic():
+        updated = LogbookSummary.objects.filter(attachment_id=attachment_id).update(
+            total_hours=F('total_hours') + Decimal(str(hours)),
+            entry_count=F('entry_count') + entries,
+            reviewed_count=F('reviewed_count') + reviewed,
+            last_entry_date=_last_entry_date(attachment_id),
+        )
+        if not updated and create_missing:
+            rebuild_logbook_summary(attachment_id)
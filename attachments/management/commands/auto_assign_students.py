@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from attachments.assignment_engine import auto_assign
+from attachments.models import Department
+
+class Command(BaseCommand):
+    help = 'Assign unassigned students to lecturers with available slots (bulk, single transaction)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', type=int, help='Only assign students of this department id')
+        parser.add_argument('--academic-year', help='Academic year label (defaults to the current year)')
+        parser.add_argument('--dry-run', action='store_true', help='Compute the plan without writing it')
+        parser.add_argument(
+            '--no-town-grouping', action='store_true', help='Ignore placement towns when spreading students over lecturers'
+        )
+
+    def handle(self, *args, **options):
+        department = None
+        if options['department']:
+            try:
+                department = Department.objects.get(id=options['department'])
+            except Department.DoesNotExist:
+                raise CommandError(f"Department {options['department']} does not exist")
+
+        result = auto_assign(
+            department=department,
+            academic_year=options['academic_year'],
+            allow_cross_department=department is None,
+            dry_run=options['dry_run'],
+            group_by_town=not options['no_town_grouping'],
+        )
+
+        verb = 'Would assign' if options['dry_run'] else 'Assigned'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {result.assigned_count} student(s)"))
+        if result.skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped: {len(result.skipped)}"))
+            for _, reason in result.skipped:
+                self.stdout.write(f"  - {reason}")
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(error))
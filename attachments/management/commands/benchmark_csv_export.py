@@ -0,0 +1,90 @@
+import csv
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.http import HttpResponse
+from attachments.csv_export import STUDENT_HEADER, streaming_csv_response, student_rows
+from attachments.models import Department
+
+User = get_user_model()
+
+
+def materialized_export():
+    """The previous implementation: model instances written into an in-memory HttpResponse"""
+    response = HttpResponse(content_type='text/csv')
+    writer = csv.writer(response)
+    writer.writerow(STUDENT_HEADER)
+    for student in User.objects.filter(user_type=1).select_related('department', 'course'):
+        writer.writerow([
+            student.student_id, student.get_full_name(), student.email,
+            student.department.name if student.department else '',
+            student.course.name if student.course else '',
+            student.year_of_study, student.date_joined.strftime('%Y-%m-%d'),
+        ])
+    # HttpResponse has everything before the first byte can be sent
+    yield response.content
+
+
+def streaming_export():
+    yield from streaming_csv_response('students.csv', STUDENT_HEADER, student_rows()).streaming_content
+
+
+def measure(export):
+    """(time to first data row, total time, peak traced memory, bytes) of one export"""
+    header_size = len(','.join(STUDENT_HEADER)) + 2
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_row = None
+    size = 0
+    for chunk in export():
+        size += len(chunk)
+        if first_row is None and size > header_size:
+            first_row = time.perf_counter() - started
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_row, total, peak, size
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the streaming students CSV export against a materialized export (synthetic rows, rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--max-peak-mb', type=float, default=20.0, help='Fail if the streaming export peaks above this')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            department = Department.objects.create(name='Benchmark Department', code='BENCH-CSV')
+            User.objects.bulk_create(
+                [
+                    User(
+                        email=f'csv-bench-{i}@example.com', password='!', user_type=1,
+                        first_name='Bench', last_name=f'Student {i}', student_id=f'CSV-BENCH-{i}',
+                        year_of_study=1 + i % 4, department=department,
+                    )
+                    for i in range(options['rows'])
+                ],
+                batch_size=2000,
+            )
+
+            results = {name: measure(export) for name, export in (
+                ('materialized', materialized_export),
+                ('streaming', streaming_export),
+            )}
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{options['rows']} student rows")
+        for name, (first_row, total, peak, size) in results.items():
+            self.stdout.write(
+                f"{name:>12}: first row {first_row * 1000:8.1f} ms, total {total * 1000:8.1f} ms, "
+                f"peak memory {peak / 2 ** 20:7.1f} MiB, {size / 2 ** 20:.1f} MiB written"
+            )
+
+        peak_mb = results['streaming'][2] / 2 ** 20
+        if peak_mb > options['max_peak_mb']:
+            raise CommandError(f"Streaming export peaked at {peak_mb:.1f} MiB, over {options['max_peak_mb']:.1f} MiB")
+        self.stdout.write(self.style.SUCCESS(f"Streaming export peak within {options['max_peak_mb']:.1f} MiB"))
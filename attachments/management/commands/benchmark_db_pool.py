@@ -0,0 +1,103 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+COUNT_CONNECTIONS = """
+    SELECT count(*) FROM pg_stat_activity
+    WHERE datname = current_database() AND backend_type = 'client backend' AND pid <> pg_backend_pid()
+"""
+
+
+def open_sampler():
+    """A connection of its own (outside Django and its pool) for watching pg_stat_activity"""
+    import psycopg
+
+    settings_dict = connection.settings_dict
+    options = {key: value for key, value in settings_dict.get('OPTIONS', {}).items() if key == 'sslmode'}
+    return psycopg.connect(
+        dbname=settings_dict['NAME'], user=settings_dict['USER'], password=settings_dict['PASSWORD'],
+        host=settings_dict['HOST'] or None, port=settings_dict['PORT'] or None, autocommit=True, **options,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test: many concurrent "requests" each holding a database connection, reporting the peak number '
+        'of Postgres connections. Run under gevent with `python -m gevent.monkey manage.py benchmark_db_pool`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=300)
+        parser.add_argument('--requests', type=int, default=3, help='Requests per concurrent client')
+        parser.add_argument('--hold', type=float, default=0.05, help='Seconds each request keeps its connection busy')
+        parser.add_argument('--max-connections', type=int, default=None,
+                            help='Fail above this many connections (default: the pool max_size)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The connection pool load test needs PostgreSQL')
+        pool = connection.settings_dict.get('OPTIONS', {}).get('pool')
+        pool_options = pool if isinstance(pool, dict) else {}
+        limit = options['max_connections']
+        if pool:
+            # psycopg_pool: max_size defaults to min_size, which defaults to 4
+            limit = limit or pool_options.get('max_size') or pool_options.get('min_size', 4)
+            self.stdout.write(f"Pool: {pool_options or 'psycopg_pool defaults'}")
+        else:
+            self.stdout.write('Pool: off (every client keeps its own connection)')
+
+        # Requests close their connection at the end, like request_finished does;
+        # the pool starts empty so its connections are not part of the baseline
+        connection.close()
+        if pool:
+            connection.close_pool()
+        sampler = open_sampler()
+        baseline = sampler.execute(COUNT_CONNECTIONS).fetchone()[0]
+        peak = baseline
+        errors = []
+        done = threading.Event()
+
+        def sample():
+            nonlocal peak
+            while not done.is_set():
+                peak = max(peak, sampler.execute(COUNT_CONNECTIONS).fetchone()[0])
+                time.sleep(0.01)
+
+        def client():
+            for _ in range(options['requests']):
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT pg_sleep(%s)', [options['hold']])
+                except OperationalError as exc:  # pool checkout timed out
+                    errors.append(exc)
+                finally:
+                    connection.close()
+
+        watcher = threading.Thread(target=sample)
+        watcher.start()
+        clients = [threading.Thread(target=client) for _ in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        watcher.join()
+        sampler.close()
+
+        total = options['concurrency'] * options['requests']
+        used = peak - baseline
+        self.stdout.write(
+            f"{options['concurrency']} concurrent clients, {total} requests in {elapsed:.2f}s "
+            f"({total / elapsed:.0f}/s), {len(errors)} failed"
+        )
+        self.stdout.write(f"Peak connections: {used} (plus {baseline} already open)")
+        if errors:
+            raise CommandError(f"{len(errors)} requests failed, e.g. {errors[0]}")
+        if limit is not None and used > limit:
+            raise CommandError(f"{used} connections opened, over the limit of {limit}")
+        if limit is not None:
+            self.stdout.write(self.style.SUCCESS(f"Connections stayed within {limit}"))
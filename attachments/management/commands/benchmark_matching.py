@@ -0,0 +1,82 @@
+import random
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from attachments.matching import solve_assignment
+
+TOWNS = ['Nairobi', 'Machakos', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Athi River', 'Kitui', 'Nyeri']
+
+
+def synthetic_instance(student_count, lecturer_count, department_count, seed):
+    rng = random.Random(seed)
+    lecturers = [
+        SimpleNamespace(
+            id=i,
+            department_id=rng.randrange(department_count),
+            max_students=rng.randint(15, 30),
+            assigned_count=rng.randint(0, 5),
+        )
+        for i in range(lecturer_count)
+    ]
+    students = [
+        SimpleNamespace(
+            id=i,
+            department_id=rng.randrange(department_count),
+            course_id=rng.randrange(department_count * 3),
+        )
+        for i in range(student_count)
+    ]
+    towns = {student.id: rng.choice(TOWNS) for student in students}
+    return students, lecturers, towns
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the student/lecturer matching solver on a synthetic instance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000)
+        parser.add_argument('--lecturers', type=int, default=500)
+        parser.add_argument('--departments', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--budget', type=float, default=1.0, help='Maximum allowed seconds per solve')
+        parser.add_argument('--no-town-grouping', action='store_true')
+
+    def handle(self, *args, **options):
+        students, lecturers, towns = synthetic_instance(
+            options['students'], options['lecturers'], options['departments'], options['seed']
+        )
+
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            plan, unmatched = solve_assignment(
+                students, lecturers, towns=towns, group_by_town=not options['no_town_grouping'],
+            )
+            timings.append(time.perf_counter() - started)
+
+        loads = Counter(lecturer.id for _, lecturer in plan)
+        over_capacity = [
+            lecturer.id for lecturer in lecturers
+            if lecturer.assigned_count + loads[lecturer.id] > lecturer.max_students
+        ]
+        in_department = sum(1 for student, lecturer in plan if student.department_id == lecturer.department_id)
+        towns_per_lecturer = {}
+        for student, lecturer in plan:
+            towns_per_lecturer.setdefault(lecturer.id, set()).add(towns[student.id])
+        average_towns = sum(len(t) for t in towns_per_lecturer.values()) / max(1, len(towns_per_lecturer))
+
+        best = min(timings)
+        self.stdout.write(f"Instance: {len(students)} students x {len(lecturers)} lecturers, {options['departments']} departments")
+        self.stdout.write(f"Solve time: best {best * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms over {len(timings)} run(s)")
+        self.stdout.write(f"Assigned: {len(plan)}, unmatched: {len(unmatched)}")
+        self.stdout.write(f"Same-department assignments: {in_department / max(1, len(plan)) * 100:.1f}%")
+        self.stdout.write(f"Average towns per lecturer: {average_towns:.2f}")
+
+        if over_capacity:
+            raise CommandError(f"{len(over_capacity)} lecturer(s) exceed max_students")
+        if best > options['budget']:
+            raise CommandError(f"Solve took {best:.3f}s, over the {options['budget']:.3f}s budget")
+        self.stdout.write(self.style.SUCCESS(f"Within budget ({options['budget']:.3f}s)"))
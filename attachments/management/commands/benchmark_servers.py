@@ -0,0 +1,133 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Anonymous, read-only endpoints that are async views in the ASGI profile
+ENDPOINTS = [
+    '/health/',
+    '/attachments/api/departments/',
+    '/attachments/api/courses/?department_id=1',
+    '/accounts/check-username/?username=nobody',
+    '/accounts/check-student-id/?student_id=nobody',
+]
+
+REQUEST_TIMEOUT = 10  # seconds
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(profile, port, workers, **extra_env):
+    """gunicorn with gunicorn.conf.py in the given SERVER_PROFILE; returns the process once it answers"""
+    env = dict(
+        os.environ, SERVER_PROFILE=profile, GUNICORN_BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY=str(workers), **extra_env,
+    )
+    env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', str(Path(settings.BASE_DIR) / 'gunicorn.conf.py'),
+         '--access-logfile', '/dev/null', '--log-level', 'warning'],
+        cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"{profile} server exited:\n{process.stderr.read().decode()[-2000:]}")
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/health/', timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise CommandError(f"{profile} server did not start within 30s")
+
+
+async def client(port, path, until, latencies, errors):
+    """One keep-alive connection sending GET ``path`` back to back until ``until``"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.encode()
+    try:
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            writer.write(request)
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), REQUEST_TIMEOUT)
+            length = None
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            if length is None:
+                # No length (e.g. an error page): the body runs to the end of the connection
+                await asyncio.wait_for(reader.read(), REQUEST_TIMEOUT)
+            else:
+                await asyncio.wait_for(reader.readexactly(length), REQUEST_TIMEOUT)
+            latencies.append(time.perf_counter() - started)
+            if not head.startswith(b'HTTP/1.1 200'):
+                errors.append(head.split(b'\r\n', 1)[0].decode())
+                return
+            if length is None or b'connection: close' in head.lower():
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    finally:
+        writer.close()
+
+
+async def load(port, path, concurrency, duration):
+    latencies, errors = [], []
+    until = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, path, until, latencies, errors) for _ in range(concurrency)))
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Side-by-side requests/s and latency of the JSON endpoints: gevent WSGI vs uvicorn ASGI (gunicorn.conf.py profiles)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', default=['wsgi', 'asgi'], choices=['wsgi', 'asgi'])
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent keep-alive connections')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per endpoint')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Path to load (repeatable)')
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'] or ENDPOINTS
+        results = {}
+        for profile in options['profiles']:
+            port = free_port()
+            process = start_server(profile, port, options['workers'])
+            try:
+                for path in endpoints:
+                    latencies, errors = asyncio.run(load(port, path, options['concurrency'], options['duration']))
+                    if errors:
+                        raise CommandError(f"{profile} {path}: {len(errors)} failed requests, e.g. {errors[0]}")
+                    results[profile, path] = (
+                        len(latencies) / options['duration'],
+                        percentile(latencies, 0.5) * 1000,
+                        percentile(latencies, 0.99) * 1000,
+                    )
+            finally:
+                process.terminate()
+                process.wait()
+
+        self.stdout.write(
+            f"{options['workers']} worker(s), {options['concurrency']} connections, {options['duration']:.0f}s per endpoint"
+        )
+        self.stdout.write(f"{'endpoint':<48} {'profile':<6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for path in endpoints:
+            for profile in options['profiles']:
+                rate, p50, p99 = results[profile, path]
+                self.stdout.write(f"{path:<48} {profile:<6} {rate:8.0f} {p50:8.1f} {p99:8.1f}")
@@ -0,0 +1,167 @@
+import asyncio
+import resource
+import time
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from attachments.live_events import ADMIN_ROLE, broadcast
+from .benchmark_servers import free_port, start_server
+
+CONNECT_BATCH = 200  # connections opened at once; stays below the listen backlog
+CONNECT_TIMEOUT = 30  # seconds
+
+
+def worker_rss_kb(master_pid):
+    """Resident memory of the gunicorn workers (children of the master), from /proc"""
+    total = 0
+    for proc in Path('/proc').iterdir():
+        if not proc.name.isdigit():
+            continue
+        try:
+            status = dict(line.split(':', 1) for line in (proc / 'status').read_text().splitlines())
+        except OSError:  # exited meanwhile
+            continue
+        if int(status['PPid']) == master_pid and 'VmRSS' in status:
+            total += int(status['VmRSS'].split()[0])
+    return total
+
+
+def raise_file_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft >= needed:
+        return
+    if hard != resource.RLIM_INFINITY and hard < needed:
+        raise CommandError(f"{needed} file descriptors needed, the hard limit is {hard} (ulimit -Hn)")
+    # Inherited by the server started afterwards
+    resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+
+
+class Stream:
+    """One idle EventSource-like client counting what the server sends"""
+
+    def __init__(self):
+        self.keepalives = 0
+        self.events = 0
+        self.first_event_at = None
+        self.closed = False
+
+    async def open(self, port, cookie):
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+        self.writer.write(
+            f'GET /attachments/events/ HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n'
+            f'Cookie: {settings.SESSION_COOKIE_NAME}={cookie}\r\n\r\n'.encode()
+        )
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        if not head.startswith(b'HTTP/1.1 200') or b'text/event-stream' not in head.lower():
+            status = head.split(b'\r\n', 1)[0].decode()
+            raise CommandError(f"Unexpected response: {status}")
+        await self.reader.readuntil(b'retry:')
+
+    async def drain(self):
+        while True:
+            chunk = await self.reader.read(4096)
+            if not chunk:
+                self.closed = True
+                return
+            self.keepalives += chunk.count(b': keep-alive')
+            if b'event: ping' in chunk:
+                self.events += 1
+                self.first_event_at = self.first_event_at or time.perf_counter()
+
+
+async def run(port, cookie, count, hold, publish):
+    streams = [Stream() for _ in range(count)]
+    started = time.perf_counter()
+    for offset in range(0, count, CONNECT_BATCH):
+        batch = streams[offset:offset + CONNECT_BATCH]
+        await asyncio.wait_for(asyncio.gather(*(stream.open(port, cookie) for stream in batch)), CONNECT_TIMEOUT)
+    opened_in = time.perf_counter() - started
+    readers = [asyncio.create_task(stream.drain()) for stream in streams]
+
+    await asyncio.sleep(hold)
+    fanout = None
+    if publish:
+        sent = time.perf_counter()
+        await asyncio.to_thread(broadcast, 'ping', {'sent': sent}, roles=[ADMIN_ROLE])
+        deadline = sent + 10
+        while time.perf_counter() < deadline and not all(stream.first_event_at for stream in streams):
+            await asyncio.sleep(0.01)
+        delays = sorted(stream.first_event_at - sent for stream in streams if stream.first_event_at)
+        fanout = (len(delays), delays[len(delays) // 2] if delays else None, delays[-1] if delays else None)
+
+    for task in readers:
+        task.cancel()
+    for stream in streams:
+        stream.writer.close()
+    return streams, opened_in, fanout
+
+
+class Command(BaseCommand):
+    help = (
+        'Open many idle live event streams (attachments/events/) against one ASGI worker, keep them for '
+        'a while and report how many survive, the worker memory and (with PostgreSQL) the fan-out time of one event'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=2000)
+        parser.add_argument('--hold', type=float, default=20.0, help='Seconds to keep the streams idle')
+        parser.add_argument('--heartbeat', type=float, default=5.0, help='LIVE_EVENTS_HEARTBEAT for the server')
+        parser.add_argument('--workers', type=int, default=1)
+
+    def handle(self, *args, **options):
+        count = options['connections']
+        raise_file_limit(count + 256)
+
+        # A throwaway admin with a stored session, shared with the server through the database/cache
+        name = f'sse-benchmark-{int(time.time())}'
+        user = get_user_model().objects.create_user(
+            f'{name}@example.invalid', password=None, user_type=ADMIN_ROLE,
+        )
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+
+        publish = connection.vendor == 'postgresql'
+        port = free_port()
+        process = start_server('asgi', port, options['workers'], LIVE_EVENTS_HEARTBEAT=str(options['heartbeat']))
+        try:
+            baseline_kb = worker_rss_kb(process.pid)
+            streams, opened_in, fanout = asyncio.run(run(port, session.session_key, count, options['hold'], publish))
+            loaded_kb = worker_rss_kb(process.pid)
+        finally:
+            process.terminate()
+            process.wait()
+            session.delete()
+            user.delete()
+
+        alive = sum(not stream.closed for stream in streams)
+        beating = sum(stream.keepalives > 0 for stream in streams)
+        self.stdout.write(f"{count} streams opened in {opened_in:.1f}s on {options['workers']} worker(s)")
+        self.stdout.write(
+            f"After {options['hold']:.0f}s idle: {alive} open, {beating} received keep-alives "
+            f"(every {options['heartbeat']:.0f}s)"
+        )
+        self.stdout.write(
+            f"Worker RSS {baseline_kb / 1024:.1f} MB -> {loaded_kb / 1024:.1f} MB "
+            f"({(loaded_kb - baseline_kb) / count:.1f} KB per stream)"
+        )
+        if fanout is None:
+            self.stdout.write('Fan-out not measured: events only cross processes through PostgreSQL LISTEN/NOTIFY')
+        else:
+            received, p50, slowest = fanout
+            if received:
+                self.stdout.write(f"One event reached {received}/{count} streams: p50 {p50 * 1000:.0f} ms, last {slowest * 1000:.0f} ms")
+            if received < count:
+                raise CommandError(f"Only {received} of {count} streams received the event")
+        if alive < count:
+            raise CommandError(f"{count - alive} streams were closed while idle")
+        if options['hold'] > options['heartbeat'] and beating < count:
+            raise CommandError(f"{count - beating} streams got no keep-alive")
+        self.stdout.write(self.style.SUCCESS(f"One {options['workers']}-worker server held {count} idle streams"))
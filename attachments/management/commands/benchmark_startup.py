@@ -0,0 +1,107 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+APPS = ('accounts', 'attachments', 'evaluations')
+
+# What a worker does before its first request: set Django up and load the
+# URLconf (which imports every app's views), then report its resident memory.
+BOOT_SCRIPT = """
+import importlib, json, resource, sys
+import django
+django.setup()
+from django.conf import settings
+importlib.import_module(settings.ROOT_URLCONF)
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+try:
+    with open('/proc/self/status') as status:
+        rss_kb = next(int(line.split()[1]) for line in status if line.startswith('VmRSS:'))
+except OSError:
+    pass
+print(json.dumps({'rss_kb': rss_kb, 'modules': sorted(sys.modules)}))
+"""
+
+
+def default_budget_path():
+    return Path(getattr(settings, 'STARTUP_BUDGET_FILE', Path(settings.BASE_DIR) / 'startup_budget.json'))
+
+
+def parse_importtime(stderr):
+    """``{module: (self us, cumulative us)}`` from ``python -X importtime`` output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def boot_worker():
+    """Import times and boot report of one fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+        capture_output=True, text=True, env=os.environ.copy(), cwd=settings.BASE_DIR,
+    )
+    if result.returncode:
+        raise CommandError(f"Worker boot failed:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['imports'] = parse_importtime(result.stderr)
+    return report
+
+
+class Command(BaseCommand):
+    help = 'Measure worker boot: per-module import time (-X importtime) and RSS after django.setup() and the URLconf'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to boot; the fastest one is reported')
+        parser.add_argument('--top', type=int, default=15, help='Slowest modules to list')
+        parser.add_argument('--budget', default=None, help='Budget JSON file (default: startup_budget.json)')
+        parser.add_argument('--no-budget', action='store_true', help='Only report, do not check the budget')
+
+    def handle(self, *args, **options):
+        runs = [boot_worker() for _ in range(max(options['runs'], 1))]
+        for run in runs:
+            run['import_ms'] = sum(self_us for self_us, _ in run['imports'].values()) / 1000
+        best = min(runs, key=lambda run: run['import_ms'])
+        import_ms = best['import_ms']
+        rss_mb = statistics.median(run['rss_kb'] for run in runs) / 1024
+
+        self.stdout.write(f"{'module':<50} {'self ms':>9} {'cumul. ms':>10}")
+        slowest = sorted(best['imports'].items(), key=lambda item: item[1][1], reverse=True)
+        for name, (self_us, cumulative_us) in slowest[:options['top']]:
+            self.stdout.write(f"{name:<50} {self_us / 1000:9.1f} {cumulative_us / 1000:10.1f}")
+
+        by_package = defaultdict(int)
+        for name, (self_us, _) in best['imports'].items():
+            by_package[name.split('.')[0]] += self_us
+        self.stdout.write('')
+        for app in APPS:
+            self.stdout.write(f"{app + ' (own modules)':<50} {by_package[app] / 1000:9.1f}")
+        heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:5]
+        self.stdout.write('Heaviest packages: ' + ', '.join(f"{name} {us / 1000:.0f} ms" for name, us in heaviest))
+        self.stdout.write(f"Total import time {import_ms:.0f} ms (best of {len(runs)}), RSS {rss_mb:.1f} MB")
+
+        if options['no_budget']:
+            return
+        path = Path(options['budget']) if options['budget'] else default_budget_path()
+        budget = json.loads(path.read_text())
+        problems = []
+        if import_ms > budget['max_import_ms']:
+            problems.append(f"import time {import_ms:.0f} ms is over {budget['max_import_ms']} ms")
+        if rss_mb > budget['max_rss_mb']:
+            problems.append(f"RSS {rss_mb:.1f} MB is over {budget['max_rss_mb']} MB")
+        loaded = set(best['modules'])
+        for module in budget.get('forbidden_modules', []):
+            if module in loaded:
+                problems.append(f"{module} is imported at boot")
+        if problems:
+            raise CommandError('Startup budget exceeded: ' + '; '.join(problems))
+        self.stdout.write(self.style.SUCCESS(f"Within the startup budget in {path.name}"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from attachments.query_shapes import QUERY_SHAPES, check_query_plans
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the registered hot query shapes and fail if any of them does not read its table through its index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shape', action='append', choices=[shape.name for shape in QUERY_SHAPES],
+            help='Only check this shape (repeatable)',
+        )
+        parser.add_argument('--show-plans', action='store_true', help='Print the full plan of every shape')
+
+    def handle(self, *args, **options):
+        shapes = [shape for shape in QUERY_SHAPES if not options['shape'] or shape.name in options['shape']]
+        try:
+            results = check_query_plans(shapes)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        flagged = []
+        for shape, plan, scans, index in results:
+            if scans:
+                flagged.append(shape.name)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {shape.name}: {shape.description}"))
+                for line in scans:
+                    self.stdout.write(f"    {line}")
+            elif index is None:
+                flagged.append(shape.name)
+                self.stdout.write(self.style.ERROR(
+                    f"NOT {' / '.join(shape.indexes)}  {shape.name}: {shape.description}"
+                ))
+            else:
+                self.stdout.write(f"indexed    {shape.name} ({index})")
+            if options['show_plans']:
+                self.stdout.write('\n'.join(f"    | {line}" for line in plan.splitlines()))
+
+        if flagged:
+            raise CommandError(f"{len(flagged)} query shape(s) without their index: {', '.join(flagged)}")
+        self.stdout.write(self.style.SUCCESS(f"All {len(results)} query shapes use their index"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from attachments.dashboard_stats import rebuild_dashboard_stats
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized dashboard statistics from the core tables (fixes counter drift)'
+
+    def handle(self, *args, **options):
+        snapshot, department_count = rebuild_dashboard_stats()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dashboard statistics rebuilt: {department_count} department(s) at {snapshot.refreshed_at:%Y-%m-%d %H:%M:%S}"
+        ))
+        self.stdout.write(f"Students: {snapshot.total_students}")
+        self.stdout.write(f"Assigned students: {snapshot.assigned_students}")
+        self.stdout.write(f"Pending placements: {snapshot.pending_placements}")
+        self.stdout.write(f"Reports: {snapshot.total_reports}")
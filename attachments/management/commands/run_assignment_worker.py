@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from attachments.assignment_jobs import DEFAULT_CHUNK_SIZE, claim_next_job, run_job, worker_name
+
+class Command(BaseCommand):
+    help = 'Process queued student assignment jobs (run under a process supervisor, or with --once from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait between polls of an empty queue')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Students (or pairs) per transaction')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        self.stdout.write(f"Assignment worker {worker} started")
+        try:
+            while True:
+                job = claim_next_job(worker)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f"Running job #{job.id} ({job.kind}) from cursor {job.cursor}")
+                job = run_job(job, chunk_size=options['chunk_size'])
+                style = self.style.SUCCESS if job.status == 'completed' else self.style.ERROR
+                self.stdout.write(style(
+                    f"Job #{job.id} {job.status}: {job.assigned} assigned, {job.failed} failed of {job.total}"
+                ))
+        except KeyboardInterrupt:
+            # The job in flight keeps its cursor and is picked up again once its heartbeat goes stale
+            self.stdout.write("Worker stopped")
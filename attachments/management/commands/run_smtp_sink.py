@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from attachments.smtp_sink import SMTPSink
+
+class Command(BaseCommand):
+    help = (
+        'Run a local SMTP server that prints every message instead of delivering it. '
+        'Point the app at it with EMAIL_HOST=127.0.0.1 EMAIL_PORT=<port> EMAIL_USE_TLS=False.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+
+    def print_message(self, message):
+        self.stdout.write(f"From: {message.mail_from}  To: {', '.join(message.recipients)}  Subject: {message.subject}")
+
+    def handle(self, *args, **options):
+        sink = SMTPSink(options['host'], options['port'], on_message=self.print_message)
+        self.stdout.write(f"SMTP sink listening on {sink.host}:{sink.port} (Ctrl+C to stop)")
+        try:
+            sink.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sink.stop()
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from attachments.notifications import DIGEST_FREQUENCIES, send_digests
+
+class Command(BaseCommand):
+    help = 'Queue hourly or daily logbook digest emails for supervisors who opted into digests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--frequency', choices=DIGEST_FREQUENCIES, required=True)
+
+    def handle(self, *args, **options):
+        count = send_digests(options['frequency'])
+        self.stdout.write(self.style.SUCCESS(f"Queued {count} {options['frequency']} digest(s)"))
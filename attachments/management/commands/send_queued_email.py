@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from attachments.outbox import DEFAULT_BATCH_SIZE, drain_outbox, worker_name
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails over a pooled SMTP connection (run under a process supervisor, or with --once from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when nothing is due instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to wait between polls of an empty outbox')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Emails sent per SMTP connection')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        try:
+            while True:
+                sent, failed = drain_outbox(worker, options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} email(s), {failed} failed")
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Outbox worker stopped")
@@ -0,0 +1,143 @@
+"""
+Capacity-aware student -> lecturer matching.
+
+Greedy balanced bin-packing: students are grouped per department by the town
+of their placement firm, largest groups first, and every group goes to the
+lecturer of that department with the most free slots. No lecturer takes more
+than an even share of the students being packed (rounded up), so a group is
+only split when it is larger than that share or than the free slots, and a
+department's students are spread over all its lecturers instead of filling
+them one after another. Students left over because their department has no
+lecturer or no room are packed the same way across all departments. Town
+grouping can be switched off, leaving one group ordered by course.
+
+The solver works on plain attributes only (no queries), so it can be
+benchmarked on synthetic data:
+
+    students:  objects with ``id``, ``department_id`` and ``course_id``
+    lecturers: objects with ``id``, ``department_id``, ``max_students`` and
+               ``assigned_count`` (current load)
+    towns:     optional ``{student_id: town_city}`` from the placement forms
+"""
+import heapq
+from collections import defaultdict
+from math import ceil
+
+
+def normalize_town(town):
+    return (town or '').strip().lower()
+
+
+class _CapacityPool:
+    """Max-heap of lecturers keyed by free slots, shared remaining capacity"""
+
+    def __init__(self, lecturers, remaining):
+        self.remaining = remaining
+        self.heap = [(-remaining[lecturer.id], lecturer.id, lecturer) for lecturer in lecturers if remaining[lecturer.id] > 0]
+        heapq.heapify(self.heap)
+
+    def pop(self):
+        """Lecturer with the most free slots, or None when the pool is full"""
+        while self.heap:
+            negative_free, lecturer_id, lecturer = heapq.heappop(self.heap)
+            free = self.remaining[lecturer_id]
+            if free <= 0:
+                continue
+            if free != -negative_free:
+                # Capacity was consumed through another pool, re-queue with the real value
+                heapq.heappush(self.heap, (-free, lecturer_id, lecturer))
+                continue
+            return lecturer
+        return None
+
+    def push(self, lecturer):
+        if self.remaining[lecturer.id] > 0:
+            heapq.heappush(self.heap, (-self.remaining[lecturer.id], lecturer.id, lecturer))
+
+    def open_count(self):
+        return sum(1 for _, lecturer_id, _ in self.heap if self.remaining[lecturer_id] > 0)
+
+
+def _by_course(members):
+    # Keep students of one course next to each other so splits fall on course boundaries
+    return sorted(members, key=lambda student: (student.course_id or 0, student.id))
+
+
+def _group_by_town(students, towns):
+    groups = defaultdict(list)
+    for student in students:
+        groups[normalize_town(towns.get(student.id))].append(student)
+    return [members for _, members in sorted(
+        ((town, _by_course(members)) for town, members in groups.items()), key=lambda item: (-len(item[1]), item[0])
+    )]
+
+
+def _pack(students, pool, towns, plan, group_by_town=True):
+    """
+    Pack the students into the pool in rounds; returns those that did not fit.
+    Each round caps every lecturer at an even share of the students still
+    waiting, lecturers that reached it sit out until the next round.
+    """
+    waiting = _group_by_town(students, towns) if group_by_town else [_by_course(students)]
+    while waiting and pool.open_count():
+        share = ceil(sum(len(members) for members in waiting) / pool.open_count())
+        quota = {}
+        resting = []
+        still_waiting = []
+        for members in waiting:
+            index = 0
+            while index < len(members):
+                lecturer = pool.pop()
+                if lecturer is None:
+                    break
+                quota.setdefault(lecturer.id, share)
+                take = members[index:index + min(pool.remaining[lecturer.id], quota[lecturer.id])]
+                plan.extend((student, lecturer) for student in take)
+                pool.remaining[lecturer.id] -= len(take)
+                quota[lecturer.id] -= len(take)
+                index += len(take)
+                if quota[lecturer.id] > 0:
+                    pool.push(lecturer)
+                else:
+                    resting.append(lecturer)
+            if index < len(members):
+                still_waiting.append(members[index:])
+        for lecturer in resting:
+            pool.push(lecturer)
+        waiting = still_waiting
+    return [student for members in waiting for student in members]
+
+
+def solve_assignment(students, lecturers, towns=None, allow_cross_department=True, group_by_town=True):
+    """
+    Match students to lecturers without exceeding ``max_students``.
+    Returns ``(plan, unmatched)``: a list of (student, lecturer) pairs and
+    the students that could not be placed. With ``group_by_town`` off the
+    placement towns are ignored.
+    """
+    towns = towns or {}
+    remaining = {lecturer.id: max(0, lecturer.max_students - lecturer.assigned_count) for lecturer in lecturers}
+
+    lecturers_by_department = defaultdict(list)
+    for lecturer in lecturers:
+        lecturers_by_department[lecturer.department_id].append(lecturer)
+
+    students_by_department = defaultdict(list)
+    for student in students:
+        students_by_department[student.department_id].append(student)
+
+    plan = []
+    leftovers = []
+    for department_id in sorted(students_by_department, key=lambda value: (value is None, value or 0)):
+        department_students = students_by_department[department_id]
+        department_lecturers = lecturers_by_department.get(department_id) if department_id is not None else None
+        if not department_lecturers:
+            leftovers.extend(department_students)
+            continue
+        pool = _CapacityPool(department_lecturers, remaining)
+        leftovers.extend(_pack(department_students, pool, towns, plan, group_by_town))
+
+    if leftovers and allow_cross_department:
+        leftovers = _pack(leftovers, _CapacityPool(lecturers, remaining), towns, plan, group_by_town)
+
+    return plan, leftovers
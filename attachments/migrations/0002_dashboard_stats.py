@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_students', models.PositiveIntegerField(default=0)),
+                ('students_last_month', models.PositiveIntegerField(default=0)),
+                ('total_lecturers', models.PositiveIntegerField(default=0)),
+                ('total_slots', models.PositiveIntegerField(default=0)),
+                ('used_slots', models.PositiveIntegerField(default=0)),
+                ('assigned_students', models.PositiveIntegerField(default=0)),
+                ('total_placements', models.PositiveIntegerField(default=0)),
+                ('pending_placements', models.PositiveIntegerField(default=0)),
+                ('pending_attachments', models.PositiveIntegerField(default=0)),
+                ('total_reports', models.PositiveIntegerField(default=0)),
+                ('reports_this_week', models.PositiveIntegerField(default=0)),
+                ('reports_this_month', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DepartmentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_students', models.PositiveIntegerField(default=0)),
+                ('assigned_students', models.PositiveIntegerField(default=0)),
+                ('recent_reports', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('department', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='attachments.department')),
+            ],
+            options={
+                'verbose_name_plural': 'Department stats',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachments', '0005_pending_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogbookSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_hours', models.DecimalField(decimal_places=1, default=0, max_digits=8)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('reviewed_count', models.PositiveIntegerField(default=0)),
+                ('last_entry_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attachment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='logbook_summary', to='attachments.attachment')),
+            ],
+            options={
+                'verbose_name_plural': 'Logbook summaries',
+            },
+        ),
+    ]
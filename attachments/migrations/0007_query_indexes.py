@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachments', '0006_logbook_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['supervisor_email'], name='attachment_supervisor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-created_at'], name='attachment_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='placementformsubmission',
+            index=models.Index(fields=['status', 'department'], name='placement_status_dept_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='placementformsubmission',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-submitted_at'], name='placement_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportupload',
+            index=models.Index(fields=['-uploaded_at'], name='report_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportupload',
+            index=models.Index(fields=['attachment', '-uploaded_at'], name='report_attachment_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentassignment',
+            index=models.Index(fields=['lecturer', 'academic_year'], name='assignment_lecturer_year_idx'),
+        ),
+    ]
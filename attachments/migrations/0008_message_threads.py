@@ -0,0 +1,109 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_message_threads(apps, schema_editor):
+    """Same bookkeeping as attachments.inbox.post_message(), for the messages sent before threads existed"""
+    Message = apps.get_model('attachments', 'Message')
+    MessageThread = apps.get_model('attachments', 'MessageThread')
+    ThreadParticipant = apps.get_model('attachments', 'ThreadParticipant')
+    InboxSummary = apps.get_model('attachments', 'InboxSummary')
+
+    pairs = {tuple(sorted(pair)) for pair in Message.objects.values_list('sender_id', 'recipient_id').distinct()}
+    for low, high in pairs:
+        messages = Message.objects.filter(Q(sender_id=low, recipient_id=high) | Q(sender_id=high, recipient_id=low))
+        last = messages.order_by('-timestamp', '-id').first()
+        thread = MessageThread.objects.create(
+            pair_key=f'{low}:{high}', last_message=last, last_message_at=last.timestamp, message_count=messages.count(),
+        )
+        messages.update(thread=thread)
+        ThreadParticipant.objects.bulk_create([
+            ThreadParticipant(
+                thread=thread, user_id=user_id, last_message_at=last.timestamp,
+                unread_count=messages.filter(recipient_id=user_id, is_read=False).count(),
+            )
+            for user_id in sorted({low, high})
+        ])
+
+    unread = Message.objects.filter(is_read=False).values('recipient_id').annotate(count=Count('id'))
+    InboxSummary.objects.bulk_create(
+        [InboxSummary(user_id=row['recipient_id'], unread_count=row['count']) for row in unread]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_login_identifier'),
+        ('attachments', '0007_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inbox_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Inbox summaries',
+            },
+        ),
+        migrations.CreateModel(
+            name='ThreadParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_message_at', models.DateTimeField(blank=True, help_text="Copy of the thread's, for the inbox index", null=True)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MessageThread',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pair_key', models.CharField(help_text="'<lower user id>:<higher user id>'", max_length=41, unique=True)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='attachments.message')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='thread',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='attachments.messagethread'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', 'is_read', 'timestamp'], name='message_recipient_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['thread', '-timestamp', '-id'], name='message_thread_recent_idx'),
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='thread',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='attachments.messagethread'),
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='message_threads', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='threadparticipant',
+            index=models.Index(fields=['user', '-last_message_at', '-id'], name='thread_participant_inbox_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='threadparticipant',
+            constraint=models.UniqueConstraint(fields=('thread', 'user'), name='unique_thread_participant'),
+        ),
+        migrations.RunPython(fill_message_threads, migrations.RunPython.noop),
+    ]
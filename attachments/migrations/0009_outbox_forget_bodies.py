@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def forget_delivered_bodies(apps, schema_editor):
+    """Blank the text of emails already sent or given up on (see attachments.outbox)"""
+    OutgoingEmail = apps.get_model('attachments', 'OutgoingEmail')
+    OutgoingEmail.objects.filter(status__in=['sent', 'failed']).update(body='', html_body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachments', '0008_message_threads'),
+    ]
+
+    operations = [
+        migrations.RunPython(forget_delivered_bodies, migrations.RunPython.noop),
+    ]
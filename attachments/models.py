@@ -4,7 +4,6 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import User
@@ -72,6 +71,12 @@ class Attachment(models.Model):
         constraints = [
             models.UniqueConstraint(fields=['student'], name='unique_student_attachment')
         ]
+        indexes = [
+            # Supervisor dashboard / logbook access checks
+            models.Index(fields=['supervisor_email'], name='attachment_supervisor_idx'),
+            # Approval queue: only the few pending rows are indexed
+            models.Index(fields=['-created_at'], name='attachment_pending_idx', condition=models.Q(status='pending')),
+        ]
     
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.organization}"
@@ -160,6 +165,21 @@ class LogbookEntry(models.Model):
     def can_edit(self):
         return self.edit_count < 2
 
+class LogbookSummary(models.Model):
+    """Running logbook totals of one attachment, kept in step with its entries (see logbook_summary.py)"""
+    attachment = models.OneToOneField(Attachment, on_delete=models.CASCADE, related_name='logbook_summary')
+    total_hours = models.DecimalField(max_digits=8, decimal_places=1, default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+    reviewed_count = models.PositiveIntegerField(default=0)
+    last_entry_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Logbook summaries'
+
+    def __str__(self):
+        return f"Logbook summary - attachment {self.attachment_id}"
+
 class PlacementFormSubmission(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='student_placement_forms')
     
@@ -209,6 +229,10 @@ class PlacementFormSubmission(models.Model):
     
     class Meta:
         unique_together = ['student', 'start_date']
+        indexes = [
+            models.Index(fields=['status', 'department'], name='placement_status_dept_idx'),
+            models.Index(fields=['-submitted_at'], name='placement_pending_idx', condition=models.Q(status='pending')),
+        ]
     
     def __str__(self):
         return f"Placement Form - {self.student.get_full_name()} - {self.start_date}"
@@ -228,20 +252,35 @@ class PlacementFormSubmission(models.Model):
 @receiver(post_save, sender=LogbookEntry)
 def send_supervisor_notification(sender, instance, created, **kwargs):
     if created and instance.attachment.supervisor_email:
-        subject = f'New Logbook Entry - {instance.attachment.student.get_full_name()}'
-        message = f"{instance.attachment.student.get_full_name()} submitted a logbook entry on {instance.entry_date}."
-        send_mail(
-            subject, message,
-            settings.DEFAULT_FROM_EMAIL,
-            [instance.attachment.supervisor_email],
-            fail_silently=True,
-        )
+        # Imported here: notifications.py imports this module
+        from .notifications import notify_supervisor
+        notify_supervisor(instance)
+
+class PendingNotification(models.Model):
+    """Logbook entry waiting to be included in a supervisor's digest email (see notifications.py)"""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pending_notifications')
+    logbook_entry = models.ForeignKey(LogbookEntry, on_delete=models.CASCADE, related_name='pending_notifications')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Pending digest item for {self.recipient.email} - entry {self.logbook_entry_id}"
 
 class ReportUpload(models.Model):
     attachment = models.ForeignKey("Attachment", on_delete=models.CASCADE, related_name="reports")
     file = models.FileField(upload_to="reports/")
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Admin report list and the recent-report counters
+            models.Index(fields=['-uploaded_at'], name='report_uploaded_idx'),
+            # Reports of one attachment, newest first
+            models.Index(fields=['attachment', '-uploaded_at'], name='report_attachment_recent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.attachment.organization} - {self.file.name}"
     
@@ -265,7 +304,50 @@ class Report(models.Model):
         return f"{self.title} (v{self.version}) - {self.student}"
     
 
+class MessageThread(models.Model):
+    """The conversation of two users (see inbox.py)"""
+    pair_key = models.CharField(max_length=41, unique=True, help_text="'<lower user id>:<higher user id>'")
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    message_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Thread {self.pair_key}"
+
+class ThreadParticipant(models.Model):
+    """One user's side of a MessageThread and its unread counter"""
+    thread = models.ForeignKey(MessageThread, on_delete=models.CASCADE, related_name='participants')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='message_threads')
+    unread_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True, help_text="Copy of the thread's, for the inbox index")
+    last_read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['thread', 'user'], name='unique_thread_participant'),
+        ]
+        indexes = [
+            # Inbox listing: a user's threads, newest first (keyset pagination)
+            models.Index(fields=['user', '-last_message_at', '-id'], name='thread_participant_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.thread}"
+
+class InboxSummary(models.Model):
+    """Unread messages of one user, read by primary key for the badge on every page (see inbox.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='inbox_summary')
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Inbox summaries'
+
+    def __str__(self):
+        return f"Inbox summary - user {self.user_id}"
+
 class Message(models.Model):
+    thread = models.ForeignKey(MessageThread, on_delete=models.CASCADE, null=True, blank=True, related_name='messages')
     sender = models.ForeignKey(User, related_name="sent_messages", on_delete=models.CASCADE)
     recipient = models.ForeignKey(User, related_name="received_messages", on_delete=models.CASCADE)
     subject = models.CharField(max_length=255, blank=True)
@@ -274,6 +356,12 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', 'timestamp'], name='message_recipient_unread_idx'),
+            models.Index(fields=['thread', '-timestamp', '-id'], name='message_thread_recent_idx'),
+        ]
+
 class Announcement(models.Model):
     title = models.CharField(max_length=255)
     body = models.TextField()
@@ -309,10 +397,127 @@ class StudentAssignment(models.Model):
     
     class Meta:
         unique_together = ['student', 'academic_year']
+        indexes = [
+            models.Index(fields=['lecturer', 'academic_year'], name='assignment_lecturer_year_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student.get_full_name()} -> {self.lecturer.user.get_full_name()}"
 
+class AssignmentJob(models.Model):
+    """Queued student assignment run, processed by the run_assignment_worker command"""
+    KIND_CHOICES = [
+        ('auto', 'Auto-assign all students'),
+        ('department', 'Auto-assign one department'),
+        ('bulk', 'Bulk assign selected pairs'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    payload = models.JSONField(default=dict, blank=True)
+    fingerprint = models.CharField(max_length=64, help_text="Hash of kind + payload, used to de-duplicate active jobs")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assignment_jobs')
+
+    # Progress, persisted together with each chunk of assignments
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    assigned = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    cursor = models.BigIntegerField(default=0, help_text="Last processed student id (auto) or pair index (bulk)")
+    errors = models.JSONField(default=list, blank=True)
+
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fingerprint'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_assignment_job',
+            )
+        ]
+
+    def __str__(self):
+        return f"Assignment job #{self.id} ({self.kind}) - {self.status}"
+
+    @property
+    def is_active(self):
+        return self.status in ('queued', 'running')
+
+class DashboardSnapshot(models.Model):
+    """Single-row table of the global admin dashboard counters (see dashboard_stats.py)"""
+    total_students = models.PositiveIntegerField(default=0)
+    students_last_month = models.PositiveIntegerField(default=0)
+    total_lecturers = models.PositiveIntegerField(default=0)
+    total_slots = models.PositiveIntegerField(default=0)
+    used_slots = models.PositiveIntegerField(default=0)
+    assigned_students = models.PositiveIntegerField(default=0)
+    total_placements = models.PositiveIntegerField(default=0)
+    pending_placements = models.PositiveIntegerField(default=0)
+    pending_attachments = models.PositiveIntegerField(default=0)
+    total_reports = models.PositiveIntegerField(default=0)
+    reports_this_week = models.PositiveIntegerField(default=0)
+    reports_this_month = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Dashboard snapshot - {self.refreshed_at:%Y-%m-%d %H:%M}"
+
+class DepartmentStats(models.Model):
+    """Per-department dashboard counters, one row per Department"""
+    department = models.OneToOneField(Department, on_delete=models.CASCADE, related_name='stats')
+    total_students = models.PositiveIntegerField(default=0)
+    assigned_students = models.PositiveIntegerField(default=0)
+    recent_reports = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'Department stats'
+
+    def __str__(self):
+        return f"Stats - {self.department.name}"
+
+class OutgoingEmail(models.Model):
+    """Outbox row for one email, delivered by the send_queued_email command (see outbox.py)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    claimed_by = models.CharField(max_length=100, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx')]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
 
 
 class IndustrialAttachment(models.Model):
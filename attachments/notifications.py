@@ -0,0 +1,110 @@
+"""
+Supervisor logbook notifications.
+
+A supervisor chooses in ``notification_preferences['logbook_digest']`` whether
+new logbook entries are emailed one by one ('immediate', the default) or
+collected in PendingNotification and sent as a single 'hourly' or 'daily'
+digest by the send_logbook_digests command, scheduled with cron:
+
+    0 * * * *   python manage.py send_logbook_digests --frequency hourly
+    0 18 * * *  python manage.py send_logbook_digests --frequency daily
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from accounts.login_identifiers import normalize_identifier
+from .models import PendingNotification
+from .outbox import enqueue_email
+
+User = get_user_model()
+
+DIGEST_PREFERENCE = 'logbook_digest'
+DIGEST_CHOICES = [
+    ('immediate', 'Email me for every entry'),
+    ('hourly', 'Hourly digest'),
+    ('daily', 'Daily digest'),
+]
+DIGEST_FREQUENCIES = ('hourly', 'daily')
+
+
+def digest_frequency(user):
+    """'immediate', 'hourly' or 'daily' for this user"""
+    value = (user.notification_preferences or {}).get(DIGEST_PREFERENCE)
+    return value if value in DIGEST_FREQUENCIES else 'immediate'
+
+
+def notify_supervisor(entry):
+    """Email the attachment supervisor about a new logbook entry, or queue it for their digest"""
+    attachment = entry.attachment
+    # Emails are stored normalized in LoginIdentifier: one unique-index lookup instead of an UPPER() scan
+    supervisor = User.objects.filter(
+        login_identifiers__identifier=normalize_identifier(attachment.supervisor_email),
+        login_identifiers__kind='email', user_type=2,
+    ).first()
+    if supervisor is not None and digest_frequency(supervisor) != 'immediate':
+        PendingNotification.objects.create(recipient=supervisor, logbook_entry=entry)
+        return
+
+    student_name = attachment.student.get_full_name()
+    enqueue_email(
+        f'New Logbook Entry - {student_name}',
+        f"{student_name} submitted a logbook entry on {entry.entry_date}.",
+        [attachment.supervisor_email],
+        from_email=settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def _enqueue_digest(recipient, entries):
+    by_student = defaultdict(list)
+    for entry in entries:
+        by_student[entry.attachment.student].append(entry)
+    students = [
+        {'name': student.get_full_name() or student.email, 'entries': sorted(items, key=lambda entry: entry.entry_date)}
+        for student, items in sorted(by_student.items(), key=lambda item: item[0].get_full_name())
+    ]
+    count = len(entries)
+    context = {
+        'first_name': recipient.first_name,
+        'students': students,
+        'entry_count': count,
+        'login_url': f"{getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000')}/accounts/login/",
+    }
+    html_message = render_to_string('attachments/emails/logbook_digest.html', context)
+    enqueue_email(
+        f"PractiCheck - {count} new logbook entr{'y' if count == 1 else 'ies'} from your students",
+        strip_tags(html_message),
+        [recipient.email],
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        html_message=html_message,
+    )
+
+
+def send_digests(frequency):
+    """
+    Queue one digest email per supervisor whose preference matches
+    ``frequency`` and clear their pending items. Hourly runs also flush
+    supervisors who switched back to immediate emails. Returns the number
+    of digests queued.
+    """
+    sent = 0
+    recipients = User.objects.filter(pending_notifications__isnull=False).distinct()
+    for recipient in recipients:
+        preference = digest_frequency(recipient)
+        if preference != frequency and not (frequency == 'hourly' and preference == 'immediate'):
+            continue
+        with transaction.atomic():
+            items = list(
+                PendingNotification.objects.filter(recipient=recipient)
+                .select_related('logbook_entry__attachment__student')
+            )
+            if not items:
+                continue
+            _enqueue_digest(recipient, [item.logbook_entry for item in items])
+            PendingNotification.objects.filter(id__in=[item.id for item in items]).delete()
+        sent += 1
+    return sent
@@ -0,0 +1,143 @@
+"""
+Transactional email outbox.
+
+Call sites use enqueue_email() instead of send_mail(): the message is stored
+as an OutgoingEmail row inside the caller's transaction, so the request never
+waits on an SMTP handshake and a rolled back request sends nothing. The
+send_queued_email management command drains due rows in batches, each batch
+over one SMTP connection, and retries failures with exponential backoff until
+EMAIL_OUTBOX_MAX_ATTEMPTS is reached.
+
+Delivery is at-least-once: a row claimed by a worker that dies before marking
+it sent is picked up again once the claim is STALE_CLAIM old.
+
+Some emails carry credentials (lecturer accounts, password resets), so a
+row's body and html_body are blanked once it is sent or given up on. Only
+pending rows hold message text; the rest keep their headers and status for
+the record.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+STALE_CLAIM = timedelta(minutes=10)
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None, html_message=None):
+    """Queue an email for the outbox worker; same arguments as send_mail()"""
+    recipients = [address for address in recipient_list if address]
+    if not recipients:
+        return None
+    return OutgoingEmail.objects.create(
+        subject=subject[:255],
+        body=message,
+        html_body=html_message or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or '',
+        to=recipients,
+    )
+
+
+def retry_delay(attempts):
+    """Backoff after the given number of failed attempts: base, 2x base, 4x base... capped"""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+    return min(timedelta(seconds=base * 2 ** max(0, attempts - 1)), MAX_RETRY_DELAY)
+
+
+def _claimable(now):
+    return OutgoingEmail.objects.filter(
+        Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', claimed_at__lt=now - STALE_CLAIM)
+    )
+
+
+def claim_batch(worker=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Mark up to ``batch_size`` due emails as being sent by ``worker`` and return them"""
+    now = timezone.now()
+    worker = worker or worker_name()
+    ids = list(_claimable(now).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size])
+    if not ids:
+        return []
+    # Conditional UPDATE: rows another worker claimed in the meantime no longer match
+    _claimable(now).filter(id__in=ids).update(status='sending', claimed_by=worker, claimed_at=now)
+    return list(OutgoingEmail.objects.filter(id__in=ids, status='sending', claimed_by=worker, claimed_at=now))
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email or None, email.to, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _mark_failed(email, error):
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    email.attempts += 1
+    email.last_error = str(error)[:1000]
+    email.claimed_by = ''
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+        email.body = email.html_body = ''
+        logger.error(f"Giving up on email {email.id} to {', '.join(email.to)} after {email.attempts} attempts: {error}")
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        logger.warning(f"Email {email.id} to {', '.join(email.to)} failed (attempt {email.attempts}), retrying: {error}")
+    email.save(update_fields=['attempts', 'last_error', 'claimed_by', 'status', 'next_attempt_at', 'body', 'html_body'])
+
+
+def send_batch(emails, connection=None):
+    """
+    Deliver claimed emails over a single SMTP connection. Returns
+    ``(sent, failed)``; failed rows are rescheduled or given up on.
+    """
+    sent = failed = 0
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        for email in emails:
+            try:
+                connection.open()  # no-op while the connection is still open
+                _build_message(email, connection).send()
+            except Exception as e:
+                _mark_failed(email, e)
+                failed += 1
+                # Start the next message on a fresh connection
+                connection.close()
+            else:
+                email.attempts += 1
+                email.status = 'sent'
+                email.sent_at = timezone.now()
+                email.body = email.html_body = ''
+                email.save(update_fields=['attempts', 'status', 'sent_at', 'body', 'html_body'])
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def drain_outbox(worker=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Send everything that is currently due; returns ``(sent, failed)``"""
+    total_sent = total_failed = 0
+    while True:
+        emails = claim_batch(worker, batch_size)
+        if not emails:
+            return total_sent, total_failed
+        sent, failed = send_batch(emails)
+        total_sent += sent
+        total_failed += failed
@@ -0,0 +1,39 @@
+"""
+On-disk cache of rendered logbook PDFs.
+
+A logbook PDF only changes when the attachment or one of its entries changes,
+so it is cached under LOGBOOK_PDF_CACHE_DIR keyed by the attachment id, its
+updated_at and the newest LogbookEntry.updated_at (plus the entry count, so
+deleting an entry also invalidates). Repeat downloads are served straight
+from the file; older versions for the attachment are removed when a new one
+is rendered.
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .pdf_render import render_pdf_file
+
+
+def _cache_dir():
+    path = Path(getattr(settings, 'LOGBOOK_PDF_CACHE_DIR', Path(settings.BASE_DIR) / 'cache' / 'logbook_pdfs'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def logbook_pdf_path(attachment):
+    """Cache path for the current state of the attachment's logbook"""
+    stats = attachment.logbook_entries.aggregate(last_updated=Max('updated_at'), entries=Count('id'))
+    last_updated = stats['last_updated'].timestamp() if stats['last_updated'] else 0
+    version = f"{attachment.updated_at.timestamp():.6f}-{last_updated:.6f}-{stats['entries']}"
+    return _cache_dir() / f"logbook-{attachment.id}-{version}.pdf"
+
+
+def render_logbook_pdf(attachment, path, html_string):
+    """Render the logbook into ``path`` (in the PDF process pool) and drop stale versions"""
+    render_pdf_file(html_string, path)
+    for stale in path.parent.glob(f"logbook-{attachment.id}-*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
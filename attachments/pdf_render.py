@@ -0,0 +1,99 @@
+"""
+PDF rendering with WeasyPrint in a separate process pool.
+
+WeasyPrint is CPU bound and never yields, so rendering inside a web worker
+blocks every other greenlet (or thread) of that worker for seconds. Documents
+are rendered by a small ProcessPoolExecutor instead (PDF_RENDER_WORKERS
+processes, started lazily with the 'spawn' method so no gevent/DB state is
+inherited); the request only waits on a future. WeasyPrint itself is only
+imported inside the pool processes (or on the first inline render), never
+at module import, so web workers do not load it (or Pango/cairo) at boot.
+PDF_RENDER_WORKERS = 0 renders inline.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+_executor = None
+_lock = threading.Lock()
+_in_flight = {}
+
+
+def _write_pdf(html_string, target, base_url=None):
+    from weasyprint import HTML
+    partial = f"{target}.{os.getpid()}.part"
+    HTML(string=html_string, base_url=base_url).write_pdf(partial)
+    # Readers never see a half written file
+    os.replace(partial, target)
+    return target
+
+
+def _pdf_bytes(html_string, base_url=None):
+    from weasyprint import HTML
+    return HTML(string=html_string, base_url=base_url).write_pdf()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'PDF_RENDER_WORKERS', 2),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _executor
+
+
+def _drop_executor(executor):
+    """Shut a broken pool down (with _lock held); the next call starts a fresh one"""
+    global _executor
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(fn, *args, key=None):
+    """
+    Run ``fn(*args)`` in the pool and wait for its result. Calls with the
+    same ``key`` while one is running share its future.
+    """
+    with _lock:
+        executor, future = _in_flight.get(key, (None, None))
+        if future is None:
+            executor = _get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                _drop_executor(executor)
+                raise
+            if key is not None:
+                _in_flight[key] = (executor, future)
+                future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    try:
+        return future.result(timeout=getattr(settings, 'PDF_RENDER_TIMEOUT', 120))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM killed)
+        with _lock:
+            _drop_executor(executor)
+        raise
+
+
+def render_pdf_file(html_string, target, base_url=None):
+    """
+    Render ``html_string`` to the file ``target`` and return its path.
+    Concurrent requests for the same target share one rendering.
+    """
+    target = str(target)
+    if getattr(settings, 'PDF_RENDER_WORKERS', 2) == 0:
+        return _write_pdf(html_string, target, base_url)
+    return _run(_write_pdf, html_string, target, base_url, key=target)
+
+
+def render_pdf(html_string, base_url=None):
+    """Render ``html_string`` and return the PDF bytes (for one-off documents that are not cached)"""
+    if getattr(settings, 'PDF_RENDER_WORKERS', 2) == 0:
+        return _pdf_bytes(html_string, base_url)
+    return _run(_pdf_bytes, html_string, base_url)
@@ -0,0 +1,136 @@
+"""
+Registry of the hot query shapes and the check_query_plans index advisor.
+
+Each QueryShape builds the same kind of queryset a view or job runs (literal
+values stand in for the request data) and names the table that must be
+reached through an index and the index meant to serve it. check_query_plans()
+runs EXPLAIN on every shape and reports the ones whose plan reads that table
+with a full scan or through another index, so a dropped index or a new filter
+without one shows up in CI instead of in production.
+
+On PostgreSQL sequential scans are disabled for the EXPLAIN (SET LOCAL
+enable_seqscan = off): a tiny CI database would otherwise make the planner
+prefer a scan even where an index exists. With scans disabled any index at
+all would do, which is why the plan must name the shape's own index.
+"""
+import re
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Attachment, LogbookEntry, PlacementFormSubmission, ReportUpload, StudentAssignment
+
+User = get_user_model()
+
+
+@dataclass
+class QueryShape:
+    name: str
+    description: str
+    model: type
+    build: callable
+    indexes: tuple  # the index meant to serve the query (or equally selective alternatives)
+
+    @property
+    def table(self):
+        return self.model._meta.db_table
+
+
+QUERY_SHAPES = [
+    QueryShape(
+        'logbook_page', 'One keyset page of an attachment logbook', LogbookEntry,
+        lambda: LogbookEntry.objects.filter(attachment_id=1).order_by('-entry_date', '-id')[:31],
+        # unique_together (attachment, entry_date), named by Django
+        ('attachments_logbookentry_attachment_id_entry_date_d767dd75_uniq',),
+    ),
+    QueryShape(
+        'supervisor_attachments', 'Attachments supervised by one email address', Attachment,
+        lambda: Attachment.objects.filter(supervisor_email='supervisor@example.com'),
+        ('attachment_supervisor_idx',),
+    ),
+    QueryShape(
+        'pending_attachments', 'Attachment approval queue', Attachment,
+        lambda: Attachment.objects.filter(status='pending').order_by('-created_at'),
+        ('attachment_pending_idx',),
+    ),
+    QueryShape(
+        'pending_placements', 'Placement form approval queue', PlacementFormSubmission,
+        lambda: PlacementFormSubmission.objects.filter(status='pending').order_by('-submitted_at'),
+        # SQLite has no statistics to tell the partial index is smaller
+        ('placement_pending_idx', 'placement_status_dept_idx'),
+    ),
+    QueryShape(
+        'department_placements', 'Placement forms of one department by status', PlacementFormSubmission,
+        lambda: PlacementFormSubmission.objects.filter(status='approved', department_id=1),
+        ('placement_status_dept_idx',),
+    ),
+    QueryShape(
+        'recent_reports', 'Reports uploaded in the last week', ReportUpload,
+        lambda: ReportUpload.objects.filter(uploaded_at__gte=timezone.now() - timedelta(days=7)),
+        ('report_uploaded_idx',),
+    ),
+    QueryShape(
+        'report_list', 'Admin report list, newest first', ReportUpload,
+        lambda: ReportUpload.objects.order_by('-uploaded_at')[:25],
+        ('report_uploaded_idx',),
+    ),
+    QueryShape(
+        'attachment_reports', 'Reports of one attachment, newest first', ReportUpload,
+        lambda: ReportUpload.objects.filter(attachment_id=1).order_by('-uploaded_at'),
+        ('report_attachment_recent_idx',),
+    ),
+    QueryShape(
+        'department_students', 'Students of one department', User,
+        lambda: User.objects.filter(user_type=1, department_id=1),
+        ('user_type_department_idx',),
+    ),
+    QueryShape(
+        'students_page', 'One keyset page of admin_students', User,
+        lambda: User.objects.filter(user_type=1).order_by('first_name', 'last_name', 'id')[:51],
+        ('user_type_name_idx',),
+    ),
+    QueryShape(
+        'lecturer_assignments', 'Students assigned to one lecturer in an academic year', StudentAssignment,
+        lambda: StudentAssignment.objects.filter(lecturer_id=1, academic_year='2025'),
+        ('assignment_lecturer_year_idx',),
+    ),
+]
+
+
+def full_scans(plan, table, vendor):
+    """Plan lines that read ``table`` without an index"""
+    if vendor == 'postgresql':
+        pattern = re.compile(rf'Seq Scan on {re.escape(table)}\b')
+        return [line.strip() for line in plan.splitlines() if pattern.search(line)]
+    if vendor == 'sqlite':
+        pattern = re.compile(rf'\bSCAN {re.escape(table)}\b')
+        return [line.strip() for line in plan.splitlines() if pattern.search(line) and ' INDEX ' not in line]
+    raise ValueError(f"Query plans are not checked on {vendor}")
+
+
+def index_used(plan, indexes):
+    """The first of ``indexes`` the plan reads through, or None"""
+    for index in indexes:
+        if re.search(rf'\b{re.escape(index)}\b', plan):
+            return index
+    return None
+
+
+def explain(queryset):
+    with transaction.atomic(using=queryset.db):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+def check_query_plans(shapes=None):
+    """``[(shape, plan, full scan lines, index used)]`` for every registered (or given) shape"""
+    results = []
+    for shape in shapes or QUERY_SHAPES:
+        plan = explain(shape.build())
+        results.append((shape, plan, full_scans(plan, shape.table, connection.vendor), index_used(plan, shape.indexes)))
+    return results
@@ -0,0 +1,162 @@
+"""
+Cached reference data: departments and courses.
+
+The department list behind get_departments and the registration form, and
+the course list behind get_courses, hardly ever change but were queried on
+every request (user_register alone ran the department query on each of its
+error paths). They are now read through the shared cache (CACHES in
+settings) under versioned keys:
+
+    refdata:departments:v<version>:<university>
+
+Saving or deleting a Department or Course (signals.py) bumps the version of
+its namespace once the transaction commits, so every worker moves on to new
+keys at the same moment and the old entries simply expire; nothing has to
+find and delete them. Versions are clock values rather than counters: if the
+cache evicts a version key, the next one set is still new, where a counter
+would restart at 1 and serve lists cached before the bump again.
+
+The department API only answers for universities that have departments
+(university_names()), so arbitrary ?university= values cannot fill the cache
+with empty lists.
+"""
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Course, Department
+
+DEPARTMENTS = 'departments'
+COURSES = 'courses'
+
+
+def _timeout():
+    return getattr(settings, 'REFERENCE_CACHE_TIMEOUT', 3600)
+
+
+def _version_key(namespace):
+    return f'refdata:{namespace}:version'
+
+
+def _new_version():
+    # Nanosecond clock: a version that was evicted and set again never equals
+    # an earlier one, so entries cached under it cannot come back
+    return time.time_ns()
+
+
+def cache_version(namespace):
+    """Current version of a namespace"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def cache_versions(*namespaces):
+    """Current versions of several namespaces, with one cache read once they are all set"""
+    versions = cache.get_many([_version_key(namespace) for namespace in namespaces])
+    return tuple(versions.get(_version_key(namespace)) or cache_version(namespace) for namespace in namespaces)
+
+
+def bump_version(namespace):
+    cache.set(_version_key(namespace), _new_version(), None)
+
+
+def invalidate_on_commit(*namespaces):
+    """Bump the namespaces once the current transaction has committed"""
+    def bump():
+        for namespace in namespaces:
+            bump_version(namespace)
+    transaction.on_commit(bump)
+
+
+async def acache_version(namespace):
+    key = _version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _new_version(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def _cache_key(namespace, version, suffix):
+    return f'refdata:{namespace}:v{version}:{quote(str(suffix))}'
+
+
+def _universities_key(version):
+    # quote() escapes '*', so no university's department key can look like this
+    return f'refdata:{DEPARTMENTS}:v{version}:*universities'
+
+
+def _cached(namespace, suffix, queryset):
+    key = _cache_key(namespace, cache_version(namespace), suffix)
+    value = cache.get(key)
+    if value is None:
+        value = list(queryset)
+        cache.set(key, value, _timeout())
+    return value
+
+
+async def _acached(namespace, suffix, queryset):
+    key = _cache_key(namespace, await acache_version(namespace), suffix)
+    value = await cache.aget(key)
+    if value is None:
+        value = [row async for row in queryset]
+        await cache.aset(key, value, _timeout())
+    return value
+
+
+def _departments(university):
+    return Department.objects.filter(university=university).values('id', 'name', 'code')
+
+
+def _universities():
+    return Department.objects.order_by().values_list('university', flat=True).distinct()
+
+
+def _courses(department_id):
+    return Course.objects.filter(department_id=department_id, is_active=True).values('id', 'name', 'code')
+
+
+def department_list(university='Machakos University'):
+    """``[{'id', 'name', 'code'}]`` of a university's departments"""
+    return _cached(DEPARTMENTS, university, _departments(university))
+
+
+def university_names():
+    """Set of the universities that have departments"""
+    key = _universities_key(cache_version(DEPARTMENTS))
+    names = cache.get(key)
+    if names is None:
+        names = set(_universities())
+        cache.set(key, names, _timeout())
+    return names
+
+
+def course_list(department_id):
+    """``[{'id', 'name', 'code'}]`` of a department's active courses"""
+    return _cached(COURSES, department_id, _courses(department_id))
+
+
+# Async variants for the async API views (same keys, so both share entries)
+
+async def adepartment_list(university='Machakos University'):
+    return await _acached(DEPARTMENTS, university, _departments(university))
+
+
+async def auniversity_names():
+    key = _universities_key(await acache_version(DEPARTMENTS))
+    names = await cache.aget(key)
+    if names is None:
+        names = {name async for name in _universities()}
+        await cache.aset(key, names, _timeout())
+    return names
+
+
+async def acourse_list(department_id):
+    return await _acached(COURSES, department_id, _courses(department_id))
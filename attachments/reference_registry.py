@@ -0,0 +1,68 @@
+"""
+In-process registry of the registration form's reference data.
+
+The register page needs every department of the university and, for the
+course dropdown, the active courses of each. reference_cache.py already
+keeps those lists in the shared cache, but the page still had to read them
+on every render and the dropdown fetched /api/courses/ on each department
+change.
+
+get_reference_data() keeps both lists in process memory, together with
+one pre-serialized JSON blob the page embeds, so the dropdowns need no
+further requests. Each call costs one cache read: it compares the
+departments and courses versions from reference_cache.py with the ones it
+was built at. The Department / Course signals bump those versions on
+commit, so every worker reloads (two queries) after a change.
+"""
+from dataclasses import dataclass
+import threading
+
+from django.utils.html import json_script
+
+from .models import Course
+from .reference_cache import COURSES, DEPARTMENTS, cache_versions, department_list
+
+DEFAULT_UNIVERSITY = 'Machakos University'
+
+_registry = {}  # university -> (versions, ReferenceData)
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    departments: list
+    courses: dict  # department id -> [{'id', 'name', 'code'}]
+    json: str  # <script type="application/json" id="reference-data"> element, safe to embed
+
+    def context(self):
+        """Template context for pages with the department / course dropdowns"""
+        return {'departments': self.departments, 'reference_json': self.json}
+
+
+def load_reference_data(university=DEFAULT_UNIVERSITY):
+    departments = department_list(university)
+    courses = {department['id']: [] for department in departments}
+    rows = Course.objects.filter(department_id__in=courses, is_active=True).values('id', 'name', 'code', 'department_id')
+    for row in rows:
+        department_id = row.pop('department_id')
+        courses[department_id].append(row)
+    return ReferenceData(
+        departments=departments,
+        courses=courses,
+        json=json_script({'departments': departments, 'courses': courses}, 'reference-data'),
+    )
+
+
+def get_reference_data(university=DEFAULT_UNIVERSITY):
+    versions = cache_versions(DEPARTMENTS, COURSES)
+    entry = _registry.get(university)
+    if entry is not None and entry[0] == versions:
+        return entry[1]
+    with _lock:
+        data = load_reference_data(university)
+        _registry[university] = (versions, data)
+    return data
+
+
+def clear_registry():
+    _registry.clear()
@@ -1,11 +1,247 @@
 # In attachments/signals.py
-from django.db.models.signals import pre_save
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import Attachment
+from .models import (
+    Attachment, Course, Department, Lecturer, LogbookEntry, Message, PlacementFormSubmission, ReportUpload,
+    StudentAssignment,
+)
+from .dashboard_stats import (
+    joined_before_growth_window, mark_stats_dirty, record_assignment_changes, record_report_change, record_stats_change,
+)
+from .logbook_summary import apply_entry_change, is_reviewed, rebuild_logbook_summary
+from .live_events import ADMIN_ROLE, attachment_staff, publish
+from .reference_cache import COURSES, DEPARTMENTS, invalidate_on_commit
+
+User = get_user_model()
+
+# CustomUser fields that feed the dashboard counters; saves touching only
+# other fields (e.g. last_login on every login) leave them alone.
+USER_STATS_FIELDS = {'user_type', 'department', 'date_joined'}
 
 @receiver(pre_save, sender=Attachment)
 def update_attachment_status(sender, instance, **kwargs):
     if instance.status == 'active' and timezone.now().date() > instance.end_date:
         instance.status = 'completed'
-        instance.completed_date = timezone.now()
\ No newline at end of file
+        instance.completed_date = timezone.now()
+
+
+# ---------------- Dashboard statistics (see dashboard_stats.py) ---------------- #
+
+def _remember_user_stats_fields(instance):
+    # Read from __dict__ so deferred fields never trigger a query
+    instance._stats_user_type = instance.__dict__.get('user_type')
+    instance._stats_department_id = instance.__dict__.get('department_id')
+    instance._stats_date_joined = instance.__dict__.get('date_joined')
+
+@receiver(post_init, sender=User)
+def remember_user_stats_fields(sender, instance, **kwargs):
+    _remember_user_stats_fields(instance)
+
+@receiver(post_save, sender=User)
+def user_stats_changed(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields and not USER_STATS_FIELDS.intersection(update_fields):
+        return
+    if not created and instance._stats_user_type is None:
+        # Loaded with deferred fields: the previous values are unknown
+        mark_stats_dirty(department_ids=[instance.department_id])
+        _remember_user_stats_fields(instance)
+        return
+    was_student = not created and instance._stats_user_type == 1
+    is_student = instance.user_type == 1
+    if was_student or is_student:
+        record_stats_change(
+            total_students=is_student - was_student,
+            students_last_month=(
+                (is_student and joined_before_growth_window(instance.date_joined))
+                - (was_student and joined_before_growth_window(instance._stats_date_joined))
+            ),
+        )
+        if created:
+            record_stats_change(department_id=instance.department_id, department={'total_students': 1})
+        elif was_student != is_student or instance._stats_department_id != instance.department_id:
+            # The student's assignments and reports move along: recount both departments
+            mark_stats_dirty(department_ids=[instance.department_id, instance._stats_department_id])
+    _remember_user_stats_fields(instance)
+
+@receiver(post_delete, sender=User)
+def user_stats_deleted(sender, instance, **kwargs):
+    # Assignments and uploads are deleted first and counted out by their own signals
+    if instance.user_type == 1:
+        record_stats_change(
+            department_id=instance.department_id, department={'total_students': -1},
+            total_students=-1, students_last_month=-joined_before_growth_window(instance.date_joined),
+        )
+
+@receiver(post_init, sender=StudentAssignment)
+def remember_assignment_stats_fields(sender, instance, **kwargs):
+    instance._stats_student_id = instance.__dict__.get('student_id')
+    instance._stats_lecturer_id = instance.__dict__.get('lecturer_id')
+
+@receiver(post_save, sender=StudentAssignment)
+def assignment_stats_saved(sender, instance, created, **kwargs):
+    if created:
+        record_assignment_changes([instance], 1)
+    elif (instance._stats_student_id, instance._stats_lecturer_id) != (instance.student_id, instance.lecturer_id):
+        mark_stats_dirty(student_ids=[instance.student_id, instance._stats_student_id])
+    remember_assignment_stats_fields(sender, instance)
+
+@receiver(post_delete, sender=StudentAssignment)
+def assignment_stats_deleted(sender, instance, **kwargs):
+    record_assignment_changes([instance], -1)
+
+@receiver(post_save, sender=ReportUpload)
+def report_stats_saved(sender, instance, created, **kwargs):
+    # uploaded_at never changes, so only new uploads move the counters
+    if created:
+        record_report_change(instance.attachment_id, instance.uploaded_at, 1)
+
+@receiver(post_delete, sender=ReportUpload)
+def report_stats_deleted(sender, instance, **kwargs):
+    record_report_change(instance.attachment_id, instance.uploaded_at, -1)
+
+@receiver(post_init, sender=PlacementFormSubmission)
+@receiver(post_init, sender=Attachment)
+def remember_stats_status(sender, instance, **kwargs):
+    instance._stats_status = instance.__dict__.get('status')
+
+@receiver(post_save, sender=PlacementFormSubmission)
+@receiver(post_delete, sender=PlacementFormSubmission)
+@receiver(post_save, sender=Attachment)
+@receiver(post_delete, sender=Attachment)
+def status_stats_changed(sender, instance, created=False, **kwargs):
+    deleted = kwargs['signal'] is post_delete
+    if not (created or deleted) and instance._stats_status is None:
+        mark_stats_dirty()
+    else:
+        was_pending = not created and instance._stats_status == 'pending'
+        is_pending = not deleted and instance.status == 'pending'
+        if sender is Attachment:
+            record_stats_change(pending_attachments=is_pending - was_pending)
+        else:
+            record_stats_change(total_placements=created - deleted, pending_placements=is_pending - was_pending)
+    instance._stats_status = instance.status
+
+@receiver(post_init, sender=Lecturer)
+def remember_lecturer_stats_fields(sender, instance, **kwargs):
+    instance._stats_active = instance.__dict__.get('is_active')
+    instance._stats_slots = instance.__dict__.get('max_students') if instance._stats_active else 0
+
+@receiver(post_save, sender=Lecturer)
+@receiver(post_delete, sender=Lecturer)
+def lecturer_stats_changed(sender, instance, created=False, **kwargs):
+    deleted = kwargs['signal'] is post_delete
+    if not created and (instance._stats_active is None or instance._stats_slots is None):
+        mark_stats_dirty()
+    else:
+        was_active = not created and instance._stats_active
+        is_active = not deleted and instance.is_active
+        changes = {
+            'total_lecturers': is_active - was_active,
+            'total_slots': (instance.max_students if is_active else 0) - (0 if created else instance._stats_slots),
+        }
+        # On delete its assignments are already gone, counted out by their own signal
+        if is_active != was_active and not (created or deleted):
+            changes['used_slots'] = (is_active - was_active) * instance.assigned_students.count()
+        record_stats_change(**changes)
+    remember_lecturer_stats_fields(sender, instance)
+
+@receiver(post_save, sender=Department)
+def department_stats_created(sender, instance, created, **kwargs):
+    if created:
+        mark_stats_dirty(department_ids=[instance.id])
+
+
+# ---------------- Logbook totals (see logbook_summary.py) ---------------- #
+
+def _remember_entry_totals(instance):
+    # Read from __dict__ so deferred fields never trigger a query
+    instance._summary_hours = instance.__dict__.get('hours_worked')
+    instance._summary_comments = instance.__dict__.get('supervisor_comments')
+
+@receiver(post_init, sender=LogbookEntry)
+def remember_logbook_entry_totals(sender, instance, **kwargs):
+    _remember_entry_totals(instance)
+
+@receiver(post_save, sender=LogbookEntry)
+def logbook_entry_saved(sender, instance, created, **kwargs):
+    if created:
+        apply_entry_change(
+            instance.attachment_id, hours=instance.hours_worked, entries=1,
+            reviewed=int(is_reviewed(instance.supervisor_comments)),
+        )
+    elif instance._summary_hours is None or instance._summary_comments is None:
+        # Loaded with deferred fields: the previous values are unknown
+        rebuild_logbook_summary(instance.attachment_id)
+    else:
+        apply_entry_change(
+            instance.attachment_id,
+            hours=Decimal(str(instance.hours_worked)) - Decimal(str(instance._summary_hours)),
+            reviewed=int(is_reviewed(instance.supervisor_comments)) - int(is_reviewed(instance._summary_comments)),
+        )
+    _remember_entry_totals(instance)
+
+@receiver(post_delete, sender=LogbookEntry)
+def logbook_entry_deleted(sender, instance, **kwargs):
+    # No recompute when the summary is gone: the attachment itself is being deleted
+    apply_entry_change(
+        instance.attachment_id, hours=-Decimal(str(instance.hours_worked)), entries=-1,
+        reviewed=-int(is_reviewed(instance.supervisor_comments)), create_missing=False,
+    )
+
+# ---------------- Cached reference data (see reference_cache.py) ---------------- #
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def departments_changed(sender, instance, **kwargs):
+    invalidate_on_commit(DEPARTMENTS)
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def courses_changed(sender, instance, **kwargs):
+    invalidate_on_commit(COURSES)
+
+# ---------------- Live notifications (see live_events.py) ---------------- #
+
+@receiver(post_save, sender=LogbookEntry)
+def logbook_entry_published(sender, instance, created, **kwargs):
+    if created:
+        publish(
+            'logbook_entry', {'id': instance.id, 'attachment_id': instance.attachment_id, 'entry_date': instance.entry_date},
+            users=attachment_staff(instance.attachment_id),
+        )
+
+@receiver(post_save, sender=ReportUpload)
+def report_upload_published(sender, instance, created, **kwargs):
+    if created:
+        publish(
+            'report_upload', {'id': instance.id, 'attachment_id': instance.attachment_id},
+            users=attachment_staff(instance.attachment_id), roles=[ADMIN_ROLE],
+        )
+
+@receiver(post_save, sender=PlacementFormSubmission)
+def placement_form_published(sender, instance, created, **kwargs):
+    if created:
+        publish('placement_form', {'id': instance.id, 'student_id': instance.student_id}, roles=[ADMIN_ROLE])
+
+@receiver(post_save, sender=Message)
+def message_published(sender, instance, created, **kwargs):
+    if created:
+        publish(
+            'message',
+            {'id': instance.id, 'thread_id': instance.thread_id, 'sender_id': instance.sender_id, 'subject': instance.subject},
+            users=[instance.recipient_id],
+        )
+
+@receiver(post_save, sender=StudentAssignment)
+@receiver(post_delete, sender=StudentAssignment)
+def assignment_published(sender, instance, created=False, **kwargs):
+    action = 'deleted' if kwargs['signal'] is post_delete else 'created' if created else 'updated'
+    publish(
+        'assignment',
+        {'id': instance.id, 'student_id': instance.student_id, 'lecturer_id': instance.lecturer_id, 'action': action},
+        users=Lecturer.objects.filter(pk=instance.lecturer_id).values_list('user_id', flat=True), roles=[ADMIN_ROLE],
+    )
@@ -0,0 +1,152 @@
+"""
+Minimal local SMTP server that accepts every message and keeps it in memory.
+
+Used as an SMTP stand-in by the tests (to check that the outbox worker really
+talks SMTP and reuses one connection per batch) and by the run_smtp_sink
+command for local development:
+
+    with SMTPSink() as sink:
+        ...  # EMAIL_HOST='127.0.0.1', EMAIL_PORT=sink.port, EMAIL_USE_TLS=False
+        sink.messages, sink.sessions
+
+It understands just enough SMTP for smtplib / Django's SMTP backend:
+HELO/EHLO, AUTH PLAIN/LOGIN (any credentials), MAIL, RCPT, DATA, RSET, NOOP
+and QUIT. No TLS.
+"""
+import email.message
+import socketserver
+import threading
+from dataclasses import dataclass, field
+
+
+@dataclass
+class SinkMessage:
+    mail_from: str
+    recipients: list
+    message: email.message.Message = field(repr=False)
+
+    @property
+    def subject(self):
+        return self.message['Subject']
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, *lines):
+        for line in lines:
+            self.wfile.write(f"{line}\r\n".encode())
+
+    def read_line(self):
+        """Next command line, or None once the client hung up"""
+        raw = self.rfile.readline()
+        return raw.decode('utf-8', 'replace').rstrip('\r\n') if raw else None
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        return b''.join(lines)
+
+    def handle(self):
+        sink = self.server.sink
+        sink._session_started()
+        mail_from, recipients = '', []
+        self.reply('220 localhost PractiCheck SMTP sink')
+        while True:
+            line = self.read_line()
+            if line is None:
+                break
+            command, _, argument = line.partition(' ')
+            command = command.upper()
+            if command == 'HELO':
+                self.reply('250 localhost')
+            elif command == 'EHLO':
+                self.reply('250-localhost', '250-8BITMIME', '250 AUTH PLAIN LOGIN')
+            elif command == 'AUTH':
+                mechanism, _, initial = argument.partition(' ')
+                if mechanism.upper() == 'LOGIN':
+                    self.reply('334 VXNlcm5hbWU6')
+                    self.read_line()
+                    self.reply('334 UGFzc3dvcmQ6')
+                    self.read_line()
+                elif not initial:
+                    self.reply('334 ')
+                    self.read_line()
+                self.reply('235 Authentication successful')
+            elif command == 'MAIL':
+                mail_from, recipients = argument.partition(':')[2].strip().strip('<>'), []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                recipients.append(argument.partition(':')[2].strip().strip('<>'))
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                sink._store(SinkMessage(mail_from, recipients, email.message_from_bytes(self.read_data())))
+                mail_from, recipients = '', []
+                self.reply('250 OK: queued')
+            elif command == 'RSET':
+                mail_from, recipients = '', []
+                self.reply('250 OK')
+            elif command == 'NOOP':
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('502 Command not implemented')
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SMTPSink:
+    def __init__(self, host='127.0.0.1', port=0, on_message=None):
+        self.messages = []
+        self.sessions = 0
+        self.on_message = on_message
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def _session_started(self):
+        with self._lock:
+            self.sessions += 1
+
+    def _store(self, message):
+        with self._lock:
+            self.messages.append(message)
+        if self.on_message:
+            self.on_message(message)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
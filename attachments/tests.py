@@ -0,0 +1,1092 @@
+import asyncio
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+from decimal import Decimal
+import json
+import os
+import tempfile
+from io import StringIO
+from types import SimpleNamespace
+from unittest import skipUnless
+
+from asgiref.sync import sync_to_async
+from gevent import socket as gevent_socket
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Q
+from django.contrib.auth.models import AnonymousUser
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts import views as account_views
+from accounts.principal import get_principal
+
+from . import pdf_render, views
+from .assignment_engine import assign_pairs, auto_assign, write_plan
+from .assignment_jobs import claim_next_job, enqueue_job, job_progress, run_job
+from .matching import solve_assignment
+from .notifications import send_digests
+from .email_utils import send_lecturer_credentials, send_lecturer_password_reset
+from .outbox import drain_outbox, enqueue_email
+from .csv_export import STUDENT_HEADER, streaming_csv_response, student_rows
+from .file_serving import serve_file
+from .inbox import mark_threads_read, post_message, thread_page, unread_count
+from .keyset import encode_cursor, keyset_page
+from .live_events import RETRY_MS, broker, publish, send_event, serve_stream, stream
+from .logbook_summary import compute_logbook_summary, get_logbook_summary
+from .reference_cache import DEPARTMENTS, cache_version, course_list, department_list
+from .reference_registry import clear_registry, get_reference_data
+from .pdf_exports import logbook_pdf_path
+from .query_shapes import full_scans, index_used
+from .smtp_sink import SMTPSink
+from .dashboard_stats import (
+    compute_department_counters, compute_global_counters, get_dashboard_stats, get_department_stats, get_snapshot_stats,
+    rebuild_dashboard_stats,
+)
+from .models import (
+    AssignmentJob, Attachment, Course, DashboardSnapshot, Department, DepartmentStats, InboxSummary, Lecturer,
+    LogbookEntry, LogbookSummary, Message, MessageThread, OutgoingEmail, PendingNotification, PlacementFormSubmission, ReportUpload,
+    StudentAssignment, ThreadParticipant,
+)
+
+User = get_user_model()
+
+
+def make_department(index):
+    return Department.objects.create(name=f'Department {index}', code=f'D{index}')
+
+
+def make_student(department, index):
+    return User.objects.create_user(
+        email=f'student{department.id}_{index}@example.com',
+        password='testpass123',
+        user_type=1,
+        student_id=f'S{department.id}-{index}',
+        department=department,
+    )
+
+
+def make_lecturer(department, index, max_students=10):
+    user = User.objects.create_user(
+        email=f'lecturer{department.id}_{index}@example.com',
+        password='testpass123',
+        user_type=3,
+    )
+    return Lecturer.objects.create(
+        user=user, staff_id=f'L{department.id}-{index}', department=department, max_students=max_students
+    )
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.department = make_department(1)
+        self.lecturer = make_lecturer(self.department, 1, max_students=5)
+        self.students = [make_student(self.department, i) for i in range(3)]
+        StudentAssignment.objects.create(
+            student=self.students[0], lecturer=self.lecturer, academic_year='2025'
+        )
+        attachment = Attachment.objects.create(
+            student=self.students[0], organization='Acme', supervisor_name='Jane',
+            start_date=date(2025, 1, 1), end_date=date(2025, 3, 1),
+        )
+        ReportUpload.objects.create(attachment=attachment, file='reports/r.pdf')
+
+    def test_department_row_shape(self):
+        row = get_department_stats()[0]
+        self.assertEqual(row['id'], self.department.id)
+        self.assertEqual(row['total_placements'], 3)
+        self.assertEqual(row['assigned_placements'], 1)
+        self.assertEqual(row['unassigned_placements'], 2)
+        self.assertEqual(row['recent_reports'], 1)
+        self.assertEqual(row['assignment_rate'], 33.3)
+
+    def test_global_kpis(self):
+        stats = get_dashboard_stats()
+        self.assertEqual(stats['total_students'], 3)
+        self.assertEqual(stats['total_lecturers'], 1)
+        self.assertEqual(stats['assigned_students_count'], 1)
+        self.assertEqual(stats['available_slots'], 4)
+        self.assertEqual(stats['pending_approvals_count'], 1)
+        self.assertEqual(stats['new_reports_count'], 1)
+
+    def test_query_count_is_independent_of_department_count(self):
+        with self.assertNumQueries(7):
+            get_dashboard_stats()
+
+        for i in range(2, 12):
+            department = make_department(i)
+            make_student(department, 1)
+
+        with self.assertNumQueries(7):
+            stats = get_dashboard_stats()
+        self.assertEqual(len(stats['department_stats']), 11)
+
+
+class DashboardSnapshotTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.department = make_department(1)
+            self.lecturer = make_lecturer(self.department, 1, max_students=5)
+
+    def test_rebuild_writes_one_row_per_department(self):
+        make_department(2)
+        snapshot, department_count = rebuild_dashboard_stats()
+        self.assertEqual(department_count, 2)
+        self.assertEqual(DepartmentStats.objects.count(), 2)
+        self.assertEqual(snapshot.total_slots, 5)
+
+    def test_signals_refresh_counters_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            student = make_student(self.department, 1)
+        self.assertEqual(DepartmentStats.objects.get(department=self.department).total_students, 1)
+        self.assertEqual(DashboardSnapshot.objects.get().total_students, 1)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            StudentAssignment.objects.create(student=student, lecturer=self.lecturer, academic_year='2025')
+            PlacementFormSubmission.objects.create(
+                student=student, registration_number='R1', phone_number='0700', course_name='CS',
+                year_of_study='Year 3', department=self.department, firm_name='Acme', firm_email='a@acme.com',
+                town_city='Nairobi', land_mark='CBD', supervisor_name='Jane', supervisor_phone='0711',
+                supervisor_email='jane@acme.com', start_date=date(2025, 1, 1), end_date=date(2025, 3, 1),
+            )
+        # One coalesced stats refresh (live events are off outside the ASGI profile)
+        self.assertEqual(len(callbacks), 1)
+
+        stats = get_snapshot_stats()
+        self.assertEqual(stats['assigned_students_count'], 1)
+        self.assertEqual(stats['pending_placements'], 1)
+        self.assertEqual(stats['department_stats'][0]['assigned_placements'], 1)
+
+    def test_deltas_match_a_full_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            other = make_department(2)
+            students = [make_student(self.department, i) for i in range(3)] + [make_student(other, 1)]
+        refreshed_at = DashboardSnapshot.objects.get().refreshed_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for student in students[:3]:
+                StudentAssignment.objects.create(student=student, lecturer=self.lecturer, academic_year='2025')
+            StudentAssignment.objects.create(student=students[0], lecturer=self.lecturer, academic_year='2026')
+            attachment = Attachment.objects.create(
+                student=students[3], organization='Acme', supervisor_name='Jane',
+                start_date=date(2025, 1, 1), end_date=date(2025, 3, 1),
+            )
+            ReportUpload.objects.create(attachment=attachment, file='reports/r.pdf')
+        with self.captureOnCommitCallbacks(execute=True):
+            attachment.status = 'active'
+            attachment.save()
+            self.lecturer.max_students = 8
+            self.lecturer.save()
+            make_lecturer(other, 1, max_students=4)
+            students[0].delete()
+            StudentAssignment.objects.filter(student=students[1]).delete()
+
+        snapshot = DashboardSnapshot.objects.get()
+        # Moved by deltas only: a recount would have set refreshed_at
+        self.assertEqual(snapshot.refreshed_at, refreshed_at)
+        rebuilt = compute_global_counters()
+        self.assertEqual({field: getattr(snapshot, field) for field in rebuilt}, rebuilt)
+        self.assertEqual(snapshot.used_slots, 1)
+        self.assertEqual(snapshot.total_slots, 12)
+        departments = {
+            row.department_id: [row.total_students, row.assigned_students, row.recent_reports]
+            for row in DepartmentStats.objects.all()
+        }
+        self.assertEqual(departments, {
+            department_id: [counters['total_students'], counters['assigned_students'], counters['recent_reports']]
+            for department_id, counters in compute_department_counters().items()
+        })
+
+    def test_last_login_update_does_not_refresh(self):
+        student = make_student(self.department, 1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            student.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+
+    def test_snapshot_read_uses_two_queries(self):
+        with self.assertNumQueries(2):
+            get_snapshot_stats()
+
+
+class AssignmentEngineTests(TestCase):
+    def setUp(self):
+        self.department = make_department(1)
+        self.lecturers = [make_lecturer(self.department, i, max_students=2) for i in range(2)]
+
+    def test_auto_assign_writes_in_bulk(self):
+        for i in range(3):
+            make_student(self.department, i)
+        # students, lecturers, savepoint, already-assigned check, placement forms, insert, read-back,
+        # three for the dashboard deltas (active lecturers, other assignments, departments), release
+        with self.assertNumQueries(11):
+            result = auto_assign(allow_cross_department=False)
+        self.assertEqual(result.assigned_count, 3)
+        self.assertEqual(StudentAssignment.objects.count(), 3)
+
+    def test_capacity_is_respected(self):
+        for i in range(6):
+            make_student(self.department, i)
+        result = auto_assign()
+        self.assertEqual(result.assigned_count, 4)
+        self.assertEqual(len(result.skipped), 2)
+        loads = StudentAssignment.objects.values('lecturer').annotate(total=Count('pk'))
+        self.assertTrue(all(row['total'] <= 2 for row in loads))
+
+    def test_assign_pairs_skips_already_assigned(self):
+        student = make_student(self.department, 1)
+        lecturer = self.lecturers[0]
+        first = assign_pairs([(student.id, lecturer.id)])
+        second = assign_pairs([(student.id, lecturer.id), (999, lecturer.id)])
+        self.assertEqual(first.assigned_count, 1)
+        self.assertEqual(second.assigned_count, 0)
+        self.assertEqual(len(second.skipped), 1)
+        self.assertEqual(second.errors, ["Invalid assignment data"])
+
+
+    def test_assignment_made_after_the_check_is_skipped(self):
+        students = [make_student(self.department, i) for i in range(2)]
+        manual = self.lecturers[1]
+
+        class AssignedMeanwhile(dict):
+            """Runs between write_plan()'s check and its insert, like a concurrent manual assignment"""
+            def get(self, student_id, default=None):
+                if student_id == students[1].id and not StudentAssignment.objects.filter(student_id=student_id).exists():
+                    StudentAssignment.objects.create(student_id=student_id, lecturer=manual, academic_year='2025')
+                return default
+
+        plan = [(student, self.lecturers[0]) for student in students]
+        with self.captureOnCommitCallbacks(execute=True):
+            result = write_plan(plan, '2025', forms=AssignedMeanwhile())
+        self.assertEqual([row.student_id for row in result.assigned], [students[0].id])
+        self.assertIsNotNone(result.assigned[0].pk)
+        self.assertEqual([student for student, _ in result.skipped], [students[1]])
+        self.assertEqual(StudentAssignment.objects.get(student=students[1]).lecturer, manual)
+        self.assertEqual(get_snapshot_stats()['assigned_students_count'], 2)
+
+
+class AssignmentJobTests(TestCase):
+    def setUp(self):
+        self.department = make_department(1)
+        make_lecturer(self.department, 1, max_students=10)
+        self.students = [make_student(self.department, i) for i in range(5)]
+
+    def test_identical_active_job_is_reused(self):
+        job, created = enqueue_job('auto')
+        again, created_again = enqueue_job('auto')
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(job.pk, again.pk)
+
+        job.status = 'completed'
+        job.save()
+        _, created_after_finish = enqueue_job('auto')
+        self.assertTrue(created_after_finish)
+
+    def test_worker_runs_job_in_chunks(self):
+        job, _ = enqueue_job('department', {'department_id': self.department.id})
+        job = run_job(claim_next_job('test-worker'), chunk_size=2)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.total, job.processed, job.assigned), (5, 5, 5))
+        self.assertEqual(job.cursor, self.students[-1].id)
+        self.assertEqual(job_progress(job)['percent'], 100)
+        self.assertIsNone(claim_next_job('test-worker'))
+
+    def test_abandoned_job_resumes_from_cursor(self):
+        job, _ = enqueue_job('auto')
+        # A previous worker finished the first two students, then died
+        assign_pairs([(student.id, Lecturer.objects.get().id) for student in self.students[:2]])
+        AssignmentJob.objects.filter(pk=job.pk).update(
+            status='running', processed=2, assigned=2, cursor=self.students[1].id,
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+        job = run_job(claim_next_job('test-worker'), chunk_size=2)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed, job.assigned, job.failed), (5, 5, 0))
+        self.assertEqual(StudentAssignment.objects.count(), 5)
+
+    def test_auto_job_spills_across_departments_after_all_chunks(self):
+        # Department 1 has one slot for five students; department 2 one slot for its own student
+        other = make_department(2)
+        lecturer = make_lecturer(other, 1, max_students=1)
+        Lecturer.objects.filter(department=self.department).update(max_students=1)
+        own_student = make_student(other, 1)
+        enqueue_job('auto')
+        job = run_job(claim_next_job('test-worker'), chunk_size=2)
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(StudentAssignment.objects.get(lecturer=lecturer).student, own_student)
+        self.assertEqual((job.total, job.processed, job.assigned), (6, 6, 2))
+        self.assertEqual(job.errors, ['No lecturers with available slots.'])
+
+    def test_running_job_is_not_claimed_twice(self):
+        enqueue_job('auto')
+        self.assertIsNotNone(claim_next_job('worker-a'))
+        self.assertIsNone(claim_next_job('worker-b'))
+
+
+def smtp_settings(port):
+    return override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_HOST='127.0.0.1', EMAIL_PORT=port, EMAIL_USE_TLS=False,
+        EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+    )
+
+
+class OutboxTests(TestCase):
+    def test_logbook_entry_queues_supervisor_notification(self):
+        student = make_student(make_department(1), 1)
+        attachment = Attachment.objects.create(
+            student=student, organization='Acme', supervisor_name='Jane', supervisor_email='jane@acme.test',
+            start_date=date(2025, 1, 6), end_date=date(2025, 4, 4),
+        )
+        LogbookEntry.objects.create(
+            attachment=attachment, entry_date=date(2025, 1, 6), department_section='IT',
+            tasks='Setup', skills_learned='Git', hours_worked=8,
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutgoingEmail.objects.get()
+        self.assertEqual((queued.status, queued.to), ('pending', ['jane@acme.test']))
+
+    def test_worker_sends_batch_over_one_connection(self):
+        for i in range(3):
+            enqueue_email(f'Subject {i}', 'Body', [f'user{i}@example.com'], html_message='<p>Body</p>')
+        with SMTPSink() as sink, smtp_settings(sink.port):
+            self.assertEqual(drain_outbox(), (3, 0))
+        self.assertEqual(sink.sessions, 1)
+        self.assertEqual(sorted(message.subject for message in sink.messages), ['Subject 0', 'Subject 1', 'Subject 2'])
+        self.assertFalse(OutgoingEmail.objects.exclude(status='sent').exists())
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_DELAY=60)
+    def test_failed_send_backs_off_then_gives_up(self):
+        email = enqueue_email('Hello', 'Body', ['user@example.com'])
+        sink = SMTPSink()
+        port = sink.port
+        sink.stop()  # nothing listens on the port any more
+
+        with smtp_settings(port), self.assertLogs('attachments.outbox', 'WARNING'):
+            self.assertEqual(drain_outbox(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertGreater(email.next_attempt_at, timezone.now())
+            # Not due yet
+            self.assertEqual(drain_outbox(), (0, 0))
+
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(drain_outbox(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+        self.assertEqual((email.body, email.html_body), ('', ''))
+
+    def test_credentials_are_not_kept_after_delivery(self):
+        send_lecturer_credentials('lecturer@example.com', 'Ann', 'L-1', 'S3cret-Pass!')
+        send_lecturer_password_reset('lecturer@example.com', 'Ann', 'L-1', 'N3w-Pass!')
+        self.assertEqual(OutgoingEmail.objects.filter(body__contains='S3cret-Pass!').count(), 1)
+        with SMTPSink() as sink, smtp_settings(sink.port):
+            self.assertEqual(drain_outbox(), (2, 0))
+        delivered = b''.join(part.get_payload(decode=True) or b'' for part in sink.messages[0].message.walk())
+        self.assertIn(b'S3cret-Pass!', delivered)
+        for password in ('S3cret-Pass!', 'N3w-Pass!'):
+            self.assertFalse(
+                OutgoingEmail.objects.filter(Q(body__contains=password) | Q(html_body__contains=password)).exists()
+            )
+
+
+class LogbookDigestTests(TestCase):
+    def setUp(self):
+        self.supervisor = User.objects.create_user(
+            email='jane@acme.test', password='testpass123', user_type=2, first_name='Jane',
+        )
+        department = make_department(1)
+        self.attachments = []
+        for i in range(2):
+            self.attachments.append(Attachment.objects.create(
+                student=make_student(department, i), organization='Acme', supervisor_name='Jane',
+                supervisor_email='jane@acme.test', start_date=date(2025, 1, 6), end_date=date(2025, 4, 4),
+            ))
+
+    def add_entries(self, days=2):
+        for attachment in self.attachments:
+            for day in range(days):
+                LogbookEntry.objects.create(
+                    attachment=attachment, entry_date=date(2025, 1, 6 + day), department_section='IT',
+                    tasks='Setup', skills_learned='Git', hours_worked=8,
+                )
+
+    def set_preference(self, value):
+        self.supervisor.notification_preferences['logbook_digest'] = value
+        self.supervisor.save()
+
+    def test_daily_digest_collects_entries_into_one_email(self):
+        self.set_preference('daily')
+        self.add_entries()
+        self.assertEqual(PendingNotification.objects.count(), 4)
+        self.assertFalse(OutgoingEmail.objects.exists())
+
+        self.assertEqual(send_digests('hourly'), 0)
+        self.assertEqual(send_digests('daily'), 1)
+        digest = OutgoingEmail.objects.get()
+        self.assertEqual(digest.to, ['jane@acme.test'])
+        self.assertIn('4 new logbook entries', digest.subject)
+        self.assertFalse(PendingNotification.objects.exists())
+
+    def test_supervisor_is_found_through_the_login_identifier(self):
+        self.set_preference('daily')
+        self.attachments[0].supervisor_email = ' Jane@ACME.test'
+        self.attachments[0].save()
+        with CaptureQueriesContext(connection) as queries:
+            self.add_entries(days=1)
+        self.assertEqual(PendingNotification.objects.count(), 2)
+        self.assertFalse([query['sql'] for query in queries if 'UPPER(' in query['sql']])
+
+    def test_immediate_preference_sends_per_entry(self):
+        self.add_entries(days=1)
+        self.assertEqual(OutgoingEmail.objects.count(), 2)
+        self.assertFalse(PendingNotification.objects.exists())
+
+    def test_hourly_run_flushes_supervisors_back_on_immediate(self):
+        self.set_preference('hourly')
+        self.add_entries(days=1)
+        self.set_preference('immediate')
+        self.assertEqual(send_digests('hourly'), 1)
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+
+
+class LogbookPdfCacheTests(TestCase):
+    def setUp(self):
+        self.attachment = Attachment.objects.create(
+            student=make_student(make_department(1), 1), organization='Acme', supervisor_name='Jane',
+            start_date=date(2025, 1, 6), end_date=date(2025, 4, 4),
+        )
+        self.entry = LogbookEntry.objects.create(
+            attachment=self.attachment, entry_date=date(2025, 1, 6), department_section='IT',
+            tasks='Setup', skills_learned='Git', hours_worked=8,
+        )
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        override = override_settings(LOGBOOK_PDF_CACHE_DIR=cache_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_cache_key_changes_only_with_the_logbook(self):
+        path = logbook_pdf_path(self.attachment)
+        self.assertEqual(logbook_pdf_path(self.attachment), path)
+        self.assertTrue(path.name.startswith(f'logbook-{self.attachment.id}-'))
+
+        self.entry.tasks = 'Setup and deploy'
+        self.entry.save()
+        edited = logbook_pdf_path(self.attachment)
+        self.assertNotEqual(edited, path)
+
+        self.entry.delete()
+        self.assertNotEqual(logbook_pdf_path(self.attachment), edited)
+
+
+class LogbookSummaryTests(TestCase):
+    def setUp(self):
+        self.attachment = Attachment.objects.create(
+            student=make_student(make_department(1), 1), organization='Acme', supervisor_name='Jane',
+            start_date=date(2025, 1, 6), end_date=date(2025, 4, 4),
+        )
+
+    def add_entry(self, day, hours):
+        return LogbookEntry.objects.create(
+            attachment=self.attachment, entry_date=date(2025, 1, day), department_section='IT',
+            tasks='Work', skills_learned='Skills', hours_worked=hours,
+        )
+
+    def assertSummaryMatchesEntries(self):
+        summary = LogbookSummary.objects.get(attachment=self.attachment)
+        expected = compute_logbook_summary(self.attachment.id)
+        self.assertEqual(
+            (summary.total_hours, summary.entry_count, summary.reviewed_count, summary.last_entry_date),
+            (expected['total_hours'], expected['entry_count'], expected['reviewed_count'], expected['last_entry_date']),
+        )
+        return summary
+
+    def test_totals_follow_creates_edits_comments_and_deletes(self):
+        first = self.add_entry(6, 8)
+        second = self.add_entry(7, '6.5')
+        summary = self.assertSummaryMatchesEntries()
+        self.assertEqual((summary.total_hours, summary.entry_count, summary.last_entry_date), (Decimal('14.5'), 2, date(2025, 1, 7)))
+
+        entry = LogbookEntry.objects.get(pk=first.pk)
+        entry.hours_worked = Decimal('4')
+        entry.supervisor_comments = 'Good work'
+        entry.save()
+        entry.supervisor_comments = 'Good work, keep it up'
+        entry.save()
+        summary = self.assertSummaryMatchesEntries()
+        self.assertEqual((summary.total_hours, summary.reviewed_count), (Decimal('10.5'), 1))
+
+        second.entry_date = date(2025, 1, 3)
+        second.save()
+        self.assertEqual(self.assertSummaryMatchesEntries().last_entry_date, date(2025, 1, 6))
+
+        entry.delete()
+        summary = self.assertSummaryMatchesEntries()
+        self.assertEqual((summary.entry_count, summary.reviewed_count), (1, 0))
+
+    def test_missing_summary_is_built_on_read_then_read_in_one_query(self):
+        self.add_entry(6, 8)
+        LogbookSummary.objects.all().delete()
+        self.assertEqual(get_logbook_summary(self.attachment).entry_count, 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_logbook_summary(self.attachment).total_hours, 8)
+
+    def test_deleting_the_attachment_drops_the_summary(self):
+        self.add_entry(6, 8)
+        self.attachment.delete()
+        self.assertFalse(LogbookSummary.objects.exists())
+
+
+class QueryPlanTests(TestCase):
+    def test_registered_shapes_use_an_index(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertIn('query shapes use their index', out.getvalue())
+
+    def test_full_scans_are_detected(self):
+        sqlite_plan = '3 0 0 SCAN attachments_reportupload\n5 0 0 SCAN accounts_customuser USING INDEX user_type_name_idx'
+        self.assertEqual(full_scans(sqlite_plan, 'attachments_reportupload', 'sqlite'), ['3 0 0 SCAN attachments_reportupload'])
+        self.assertEqual(full_scans(sqlite_plan, 'accounts_customuser', 'sqlite'), [])
+        postgres_plan = 'Limit  (cost=0.00..1.25 rows=25 width=40)\n  ->  Seq Scan on attachments_attachment  (cost=0.00..18.10 rows=810 width=40)'
+        self.assertEqual(len(full_scans(postgres_plan, 'attachments_attachment', 'postgresql')), 1)
+        self.assertEqual(full_scans(postgres_plan, 'attachments_attachment_other', 'postgresql'), [])
+
+    def test_plans_must_use_the_shapes_own_index(self):
+        # With enable_seqscan off PostgreSQL picks any index, e.g. the primary key for a filter it cannot serve
+        postgres_plan = (
+            'Index Scan using attachments_attachment_pkey on attachments_attachment  (cost=0.15..60.40 rows=4 width=40)\n'
+            "  Filter: ((supervisor_email)::text = 'supervisor@example.com'::text)"
+        )
+        self.assertEqual(full_scans(postgres_plan, 'attachments_attachment', 'postgresql'), [])
+        self.assertIsNone(index_used(postgres_plan, ('attachment_supervisor_idx',)))
+        self.assertEqual(
+            index_used('Bitmap Index Scan on attachment_supervisor_idx', ('attachment_supervisor_idx',)),
+            'attachment_supervisor_idx',
+        )
+
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_registry()
+        self.department = make_department(1)
+
+    def test_lists_are_cached_until_a_change_commits(self):
+        course = Course.objects.create(name='Networks', code='NET1', department=self.department)
+        with self.assertNumQueries(1):
+            self.assertEqual(department_list(), [{'id': self.department.id, 'name': 'Department 1', 'code': 'D1'}])
+        with self.assertNumQueries(0):
+            department_list()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = make_department(2)
+        self.assertEqual([row['id'] for row in department_list()], [self.department.id, other.id])
+
+        self.assertEqual(course_list(self.department.id), [{'id': course.id, 'name': 'Networks', 'code': 'NET1'}])
+        with self.captureOnCommitCallbacks(execute=True):
+            course.is_active = False
+            course.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(course_list(self.department.id), [])
+
+
+    def test_registry_is_loaded_once_per_version(self):
+        course = Course.objects.create(name='Networks', code='NET1', department=self.department)
+        with self.assertNumQueries(2):
+            data = get_reference_data()
+        self.assertEqual(data.courses, {self.department.id: [{'id': course.id, 'name': 'Networks', 'code': 'NET1'}]})
+        self.assertIn('id="reference-data"', data.json)
+        self.assertIn('"NET1"', data.json)
+        with self.assertNumQueries(0):
+            self.assertIs(get_reference_data(), data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(name='Data <Science>', code='DS1', department=self.department)
+        fresh = get_reference_data()
+        self.assertEqual([row['code'] for row in fresh.courses[self.department.id]], ['DS1', 'NET1'])
+        self.assertNotIn('<Science>', fresh.json)
+
+    def test_evicted_version_does_not_bring_stale_lists_back(self):
+        self.assertEqual(len(department_list()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_department(2)
+        cache.delete('refdata:departments:version')  # evicted; the list cached before the bump is still there
+        self.assertEqual(len(department_list()), 2)
+
+    def test_department_api_only_answers_for_known_universities(self):
+        response = views.get_departments(RequestFactory().get('/api/departments/', {'university': 'Nowhere'}))
+        self.assertEqual(json.loads(response.content), [])
+        self.assertIsNone(cache.get(f'refdata:departments:v{cache_version(DEPARTMENTS)}:Nowhere'))
+        response = views.get_departments(RequestFactory().get('/api/departments/'))
+        self.assertEqual([row['id'] for row in json.loads(response.content)], [self.department.id])
+
+class FileServingTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.path = f'{self.root}/report.pdf'
+        with open(self.path, 'wb') as f:
+            f.write(bytes(range(100)))
+        self.factory = RequestFactory()
+
+    def get(self, **headers):
+        response = serve_file(self.factory.get('/download/', headers=headers), self.path)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_whole_file_and_conditional_get(self):
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, bytes(range(100))))
+        self.assertEqual(response['Content-Length'], '100')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="report.pdf"')
+
+        self.assertEqual(self.get(If_None_Match=response['ETag'])[0].status_code, 304)
+        self.assertEqual(self.get(If_Modified_Since=response['Last-Modified'])[0].status_code, 304)
+
+    def test_byte_ranges(self):
+        response, body = self.get(Range='bytes=10-19')
+        self.assertEqual((response.status_code, body), (206, bytes(range(10, 20))))
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+
+        self.assertEqual(self.get(Range='bytes=-5')[1], bytes(range(95, 100)))
+        self.assertEqual(self.get(Range='bytes=90-500')[1], bytes(range(90, 100)))
+        response, _ = self.get(Range='bytes=100-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */100'))
+
+        # A stale If-Range gets the whole (changed) file
+        self.assertEqual(self.get(Range='bytes=10-19', If_Range='"stale"')[0].status_code, 200)
+        etag = self.get()[0]['ETag']
+        self.assertEqual(self.get(Range='bytes=10-19', If_Range=etag)[0].status_code, 206)
+
+    def test_ranges_through_gevent_sendfile(self):
+        # What gunicorn's gevent worker does with a FileResponse that has a fileno()
+        for header, expected in (('bytes=90-', range(90, 100)), ('bytes=10-19', range(10, 20))):
+            response = serve_file(self.factory.get('/download/', headers={'Range': header}), self.path)
+            filelike = response.file_to_stream
+            offset = os.lseek(filelike.fileno(), 0, os.SEEK_CUR)
+            sender, receiver = gevent_socket.socketpair()
+            with sender, receiver:
+                sent = sender.sendfile(filelike, offset=offset, count=int(response['Content-Length']))
+                sender.shutdown(gevent_socket.SHUT_WR)
+                received = b''.join(iter(lambda: receiver.recv(4096), b''))
+            self.assertEqual((sent, received), (len(expected), bytes(expected)), header)
+            self.assertEqual((filelike.tell(), filelike.read()), (expected[-1] + 1, b''))
+            response.close()
+
+    def test_proxy_modes_send_no_body(self):
+        with self.settings(FILE_SERVING_MODE='x-accel-redirect', FILE_SERVING_ACCEL_LOCATIONS={self.root: '/protected/'}):
+            response, body = self.get()
+        self.assertEqual((response['X-Accel-Redirect'], body), ('/protected/report.pdf', b''))
+        self.assertIn('ETag', response)
+
+        with self.settings(FILE_SERVING_MODE='x-sendfile'):
+            response, body = self.get()
+        self.assertEqual(response['X-Sendfile'], os.path.realpath(self.path))
+        self.assertEqual(body, b'')
+
+
+class PdfRenderTests(SimpleTestCase):
+    def test_a_broken_pool_is_shut_down_and_replaced(self):
+        with self.settings(PDF_RENDER_WORKERS=1):
+            broken = pdf_render._get_executor()
+            with self.assertRaises(BrokenProcessPool):
+                pdf_render._run(os._exit, 1)  # the worker dies mid-task
+            self.assertIsNone(pdf_render._executor)
+            self.assertTrue(broken._shutdown_thread)  # shut down, not just forgotten
+            self.assertEqual(pdf_render._run(abs, -1), 1)
+            pdf_render._executor.shutdown()
+            pdf_render._executor = None
+
+
+@skipUnless(connection.vendor == 'postgresql', 'the pool load test needs PostgreSQL')
+class DatabasePoolTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_concurrent_requests_share_a_bounded_pool(self):
+        out = StringIO()
+        call_command('benchmark_db_pool', concurrency=40, requests=2, hold=0.01, stdout=out)
+        self.assertIn('Peak connections', out.getvalue())
+
+
+class AsyncApiViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = make_department(1)
+        self.student = make_student(self.department, 1)
+        attachment = Attachment.objects.create(
+            student=self.student, organization='Acme', supervisor_name='Jane', supervisor_email='jane@acme.test',
+            start_date=date(2025, 1, 6), end_date=date(2025, 4, 4),
+        )
+        self.entry = LogbookEntry.objects.create(
+            attachment=attachment, entry_date=date(2025, 1, 6), department_section='IT',
+            tasks='Setup', skills_learned='Git', hours_worked=8,
+        )
+        self.supervisor = User.objects.create_user(email='jane@acme.test', password='testpass123', user_type=2)
+        self.factory = AsyncRequestFactory()
+
+    def request(self, path, user=None, method='get', **kwargs):
+        request = getattr(self.factory, method)(path, **kwargs)
+
+        async def auser():
+            return user or AnonymousUser()
+        request.auser = auser
+        return request
+
+    def sync_request(self, path):
+        return RequestFactory().get(path)
+
+    async def test_async_views_answer_like_the_sync_ones(self):
+        for sync_view, async_view, path in (
+            (views.get_departments, views.get_departments_async, '/api/departments/'),
+            (views.get_courses, views.get_courses_async, f'/api/courses/?department_id={self.department.id}'),
+            (account_views.check_username, account_views.check_username_async, '/check-username/?username=S1-1'),
+            (account_views.check_student_id, account_views.check_student_id_async, '/check-student-id/?student_id=s1-1'),
+            (account_views.check_student_id, account_views.check_student_id_async, '/check-student-id/?student_id=nobody'),
+        ):
+            expected = await sync_to_async(sync_view)(self.sync_request(path))
+            response = await async_view(self.request(path))
+            self.assertEqual(response.content, expected.content, path)
+
+    async def test_entry_detail_and_comment(self):
+        path = f'/api/entry/{self.entry.id}/'
+        response = await views.api_entry_detail_async(self.request(path, self.student), self.entry.id)
+        self.assertEqual(json.loads(response.content)['tasks'], 'Setup')
+        response = await views.api_entry_detail_async(self.request(path, self.supervisor), self.entry.id)
+        self.assertEqual(response.status_code, 403)
+
+        request = self.request(
+            f'{path}comment/', self.supervisor, method='post',
+            data=json.dumps({'comment': ' Good work '}), content_type='application/json',
+        )
+        response = await views.api_add_supervisor_comment_async(request, self.entry.id)
+        self.assertEqual(response.status_code, 200)
+        await self.entry.arefresh_from_db()
+        self.assertEqual(self.entry.supervisor_comments, 'Good work')
+        summary = await LogbookSummary.objects.aget(attachment_id=self.entry.attachment_id)
+        self.assertEqual(summary.reviewed_count, 1)
+
+
+class LiveEventsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        department = make_department(1)
+        self.student = make_student(department, 1)
+        self.attachment = Attachment.objects.create(
+            student=self.student, organization='Acme', supervisor_name='Jane', supervisor_email='jane@acme.test',
+            start_date=date(2025, 1, 6), end_date=date(2025, 4, 4),
+        )
+        self.supervisor = User.objects.create_user(email='jane@acme.test', password='testpass123', user_type=2)
+        self.other_supervisor = User.objects.create_user(email='joe@acme.test', password='testpass123', user_type=2)
+        self.lecturer = make_lecturer(department, 1)
+        StudentAssignment.objects.create(student=self.student, lecturer=self.lecturer, academic_year='2024-2025')
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass123', user_type=4)
+
+    def add_entry_and_message(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = LogbookEntry.objects.create(
+                attachment=self.attachment, entry_date=date(2025, 1, 6), department_section='IT',
+                tasks='Setup', skills_learned='Git', hours_worked=8,
+            )
+            Message.objects.create(sender=self.student, recipient=self.other_supervisor, subject='Hello', body='Hi')
+        return entry
+
+    @override_settings(LIVE_EVENTS_ENABLED=True)
+    async def test_events_reach_their_audience_after_commit(self):
+        users = {
+            'supervisor': self.supervisor, 'other_supervisor': self.other_supervisor,
+            'lecturer': self.lecturer.user, 'admin': self.admin,
+        }
+        streams = {}
+        for name, user in users.items():
+            streams[name] = stream(await sync_to_async(get_principal)(user), heartbeat=0.05)
+            self.assertEqual(await anext(streams[name]), f'retry: {RETRY_MS}\n\n')
+        self.assertEqual(len(broker), 4)
+
+        entry = await sync_to_async(self.add_entry_and_message)()
+        logbook_event = (
+            f'event: logbook_entry\ndata: {{"id":{entry.id},"attachment_id":{self.attachment.id},'
+            f'"entry_date":"2025-01-06"}}\n\n'
+        )
+        self.assertEqual(await anext(streams['supervisor']), logbook_event)
+        self.assertEqual(await anext(streams['lecturer']), logbook_event)
+        self.assertTrue((await anext(streams['other_supervisor'])).startswith('event: message\n'))
+        self.assertEqual(await anext(streams['admin']), ': keep-alive\n\n')
+
+        for events in streams.values():
+            await events.aclose()
+        self.assertEqual(len(broker), 0)
+
+    async def test_nothing_is_published_when_disabled(self):
+        events = stream(await sync_to_async(get_principal)(self.supervisor), heartbeat=0.05)
+        await anext(events)
+        def publish_entry():
+            with self.captureOnCommitCallbacks() as callbacks:
+                publish('logbook_entry', {'id': 1}, users=[self.supervisor.id])
+            return callbacks
+        self.assertEqual(await sync_to_async(publish_entry)(), [])
+        await sync_to_async(send_event)('logbook_entry', {'id': 1}, users=[self.supervisor.id])
+        self.assertEqual(await anext(events), ': keep-alive\n\n')
+        await events.aclose()
+
+    def test_wsgi_profile_tells_clients_not_to_reconnect(self):
+        self.client.force_login(self.supervisor)
+        self.assertEqual(self.client.get('/attachments/events/').status_code, 204)
+
+
+class LiveEventStreamAppTests(TransactionTestCase):
+    """serve_stream looks the session up in a pool thread, which only sees committed rows"""
+
+    async def test_stream_app_only_serves_staff(self):
+        async def call(cookie):
+            sent = []
+
+            async def receive():
+                # Disconnect once the stream has started
+                while len(sent) < 2:
+                    await asyncio.sleep(0.01)
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+
+            headers = [(b'cookie', f'sessionid={cookie}'.encode())] if cookie else []
+            await serve_stream({'type': 'http', 'method': 'GET', 'path': '/attachments/events/', 'headers': headers},
+                               receive, send)
+            return sent
+
+        async def session_of(user):
+            await sync_to_async(self.client.force_login)(user)
+            return self.client.cookies['sessionid'].value
+
+        department = await Department.objects.acreate(name='Department 1', code='D1')
+        student = await sync_to_async(make_student)(department, 1)
+        supervisor = await sync_to_async(User.objects.create_user)(
+            email='jane@acme.test', password='testpass123', user_type=2,
+        )
+        self.assertEqual((await call(None))[0]['status'], 403)
+        self.assertEqual((await call(await session_of(student)))[0]['status'], 403)
+        sent = await call(await session_of(supervisor))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        self.assertEqual(sent[1]['body'], f'retry: {RETRY_MS}\n\n'.encode())
+        self.assertEqual(len(broker), 0)
+
+
+class InboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        department = make_department(1)
+        self.student = make_student(department, 1)
+        self.other_student = make_student(department, 2)
+        self.lecturer = make_lecturer(department, 1).user
+
+    def test_messages_share_one_thread_per_pair_and_count_unread(self):
+        post_message(self.student, self.lecturer, 'Hello')
+        post_message(self.lecturer, self.student, 'Hi')
+        post_message(self.student, self.lecturer, 'Question', subject='Logbook')
+        post_message(self.other_student, self.lecturer, 'Hello too')
+
+        self.assertEqual(MessageThread.objects.count(), 2)
+        thread = MessageThread.objects.get(participants__user=self.student)
+        self.assertEqual(thread.message_count, 3)
+        self.assertEqual(thread.last_message.body, 'Question')
+        sides = dict(thread.participants.values_list('user_id', 'unread_count'))
+        self.assertEqual(sides, {self.student.id: 1, self.lecturer.id: 2})
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(self.lecturer.id), 3)
+        self.assertEqual(unread_count(self.other_student.id), 0)
+
+    def test_bulk_mark_read_clears_counters_in_fixed_queries(self):
+        for sender in (self.student, self.other_student):
+            post_message(sender, self.lecturer, 'One')
+            post_message(sender, self.lecturer, 'Two')
+        first = MessageThread.objects.get(participants__user=self.student)
+
+        self.assertEqual(mark_threads_read(self.lecturer, [first.id]), 2)
+        self.assertEqual(unread_count(self.lecturer.id), 2)
+        with self.assertNumQueries(6):  # savepoint pair + lock/read, participants, messages, summary
+            self.assertEqual(mark_threads_read(self.lecturer), 2)
+        self.assertEqual(InboxSummary.objects.get(pk=self.lecturer.pk).unread_count, 0)
+        self.assertFalse(Message.objects.filter(recipient=self.lecturer, is_read=False).exists())
+        self.assertEqual(mark_threads_read(self.lecturer), 0)
+
+    def test_thread_listing_pages_newest_first(self):
+        senders = [make_student(self.student.department, index) for index in range(3, 8)]
+        for sender in senders:
+            post_message(sender, self.lecturer, f'From {sender.student_id}')
+        with self.assertNumQueries(2):
+            page = thread_page(self.lecturer, page_size=3)
+            names = [item.other_user.student_id for item in page.items]
+        self.assertEqual(names, [sender.student_id for sender in senders[::-1][:3]])
+        rest = thread_page(self.lecturer, page.next_cursor, page_size=3)
+        self.assertEqual([item.other_user.id for item in rest.items], [senders[1].id, senders[0].id])
+        self.assertFalse(rest.has_next)
+
+    def test_views_send_list_and_read(self):
+        self.client.force_login(self.student)
+        response = self.client.post('/attachments/messages/send/', {'recipient': self.lecturer.id, 'body': 'Hello'})
+        thread = MessageThread.objects.get()
+        self.assertRedirects(response, f'/attachments/messages/{thread.id}/', fetch_redirect_response=False)
+
+        self.client.force_login(self.lecturer)
+        response = self.client.get('/attachments/messages/')
+        self.assertContains(response, 'Hello')
+        self.assertEqual(response.context['unread_messages'], 1)
+        self.client.get(f'/attachments/messages/{thread.id}/')
+        self.assertEqual(unread_count(self.lecturer.id), 0)
+
+        self.client.force_login(self.other_student)
+        self.assertEqual(self.client.get(f'/attachments/messages/{thread.id}/').status_code, 404)
+
+    def test_mark_read_view_needs_all_or_a_selection(self):
+        for sender in (self.student, self.other_student):
+            post_message(sender, self.lecturer, 'Hello')
+        first = MessageThread.objects.get(participants__user=self.student)
+        self.client.force_login(self.lecturer)
+
+        for data in ({}, {'thread': ['', 'x']}):
+            response = self.client.post('/attachments/messages/mark-read/', data, follow=True)
+            self.assertContains(response, 'No conversations selected.')
+            self.assertEqual(unread_count(self.lecturer.id), 2)
+
+        self.client.post('/attachments/messages/mark-read/', {'thread': [first.id]})
+        self.assertEqual(unread_count(self.lecturer.id), 1)
+        self.client.post('/attachments/messages/mark-read/', {'all': '1'})
+        self.assertEqual(unread_count(self.lecturer.id), 0)
+
+
+class StreamingExportTests(TestCase):
+    def test_students_csv_streams_projected_rows(self):
+        department = make_department(1)
+        students = [make_student(department, i) for i in range(3)]
+        response = streaming_csv_response('students.csv', STUDENT_HEADER, student_rows())
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(STUDENT_HEADER))
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith(f'{students[0].student_id},'))
+        self.assertIn(',Department 1,', lines[1])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_csv_export', rows=50, stdout=out)
+        self.assertIn('streaming', out.getvalue())
+        self.assertFalse(User.objects.filter(email__startswith='csv-bench-').exists())
+
+
+class KeysetPaginationTests(TestCase):
+    def test_pages_follow_the_ordering_without_gaps_or_repeats(self):
+        department = make_department(1)
+        students = [make_student(department, i) for i in range(5)]
+        User.objects.filter(user_type=1).update(first_name='Student')
+        User.objects.filter(pk=students[3].pk).update(first_name='Aaron')
+        queryset = User.objects.filter(user_type=1)
+        ordering = ['first_name', 'last_name', 'id']
+        expected = list(queryset.order_by(*ordering).values_list('id', flat=True))
+
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                page = keyset_page(queryset, ordering, cursor, page_size=2)
+            seen += [student.id for student in page.items]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(seen[0], students[3].id)
+
+    def test_descending_ordering_and_bad_cursor(self):
+        department = make_department(1)
+        students = [make_student(department, i) for i in range(3)]
+        queryset = User.objects.filter(user_type=1)
+        first = keyset_page(queryset, ['-id'], page_size=2)
+        self.assertEqual([s.id for s in first.items], [students[2].id, students[1].id])
+        second = keyset_page(queryset, ['-id'], first.next_cursor, page_size=2)
+        self.assertEqual([s.id for s in second.items], [students[0].id])
+        self.assertFalse(second.has_next)
+        self.assertEqual(keyset_page(queryset, ['-id'], 'not-a-cursor', page_size=2).items, first.items)
+
+    def test_tampered_cursor_gives_the_first_page(self):
+        student = make_student(make_department(1), 1)
+        queryset = User.objects.filter(user_type=1)
+        ordering = ['-date_joined', '-id']
+        for values in (['yesterday', student.id], [student.date_joined, [1, 2]], [student.date_joined, None]):
+            with self.assertNumQueries(1):
+                page = keyset_page(queryset, ordering, encode_cursor(values))
+            self.assertEqual(page.items, [student], values)
+        thread = post_message(student, make_student(student.department, 2), 'Hello').thread
+        participants = ThreadParticipant.objects.filter(thread=thread)
+        page = keyset_page(participants, ['-thread__last_message_at', 'id'], encode_cursor(['x', 'y']))
+        self.assertEqual(len(page.items), 2)
+
+
+class MatchingSolverTests(SimpleTestCase):
+    def lecturer(self, id, department_id, max_students, assigned_count=0):
+        return SimpleNamespace(id=id, department_id=department_id, max_students=max_students, assigned_count=assigned_count)
+
+    def student(self, id, department_id, course_id=1):
+        return SimpleNamespace(id=id, department_id=department_id, course_id=course_id)
+
+    def test_capacity_counts_existing_load_on_every_pass(self):
+        lecturers = [self.lecturer(1, 1, 3, assigned_count=2), self.lecturer(2, 1, 3)]
+        students = [self.student(i, 1) for i in range(6)]
+        plan, unmatched = solve_assignment(students, lecturers)
+        loads = Counter(lecturer.id for _, lecturer in plan)
+        self.assertEqual(loads, {1: 1, 2: 3})
+        self.assertEqual(len(unmatched), 2)
+
+    def test_same_town_students_share_a_lecturer(self):
+        lecturers = [self.lecturer(1, 1, 5), self.lecturer(2, 1, 5)]
+        students = [self.student(i, 1) for i in range(6)]
+        towns = {0: 'Mombasa', 1: 'Mombasa', 2: 'Mombasa', 3: 'Kisumu', 4: 'Kisumu', 5: 'Kisumu '}
+        plan, _ = solve_assignment(students, lecturers, towns=towns)
+        lecturer_by_town = {}
+        for student, lecturer in plan:
+            lecturer_by_town.setdefault(towns[student.id].strip(), set()).add(lecturer.id)
+        self.assertEqual(len(lecturer_by_town['Mombasa']), 1)
+        self.assertEqual(len(lecturer_by_town['Kisumu']), 1)
+        self.assertNotEqual(lecturer_by_town['Mombasa'], lecturer_by_town['Kisumu'])
+
+    def test_department_affinity_before_spill_over(self):
+        lecturers = [self.lecturer(1, 1, 1), self.lecturer(2, 2, 5)]
+        students = [self.student(1, 1), self.student(2, 1), self.student(3, None)]
+        plan, unmatched = solve_assignment(students, lecturers, allow_cross_department=False)
+        self.assertEqual([(s.id, l.id) for s, l in plan], [(1, 1)])
+        self.assertEqual(len(unmatched), 2)
+
+        plan, unmatched = solve_assignment(students, lecturers)
+        self.assertEqual(len(plan), 3)
+        self.assertEqual(unmatched, [])
+
+    def test_students_are_spread_evenly_over_lecturers(self):
+        lecturers = [self.lecturer(i, 1, 30) for i in range(5)]
+        students = [self.student(i, 1, course_id=i % 3) for i in range(100)]
+        for group_by_town in (True, False):
+            plan, unmatched = solve_assignment(students, lecturers, group_by_town=group_by_town)
+            self.assertEqual(sorted(Counter(lecturer.id for _, lecturer in plan).values()), [20] * 5)
+            self.assertEqual(unmatched, [])
+
+    def test_town_grouping_can_be_switched_off(self):
+        lecturers = [self.lecturer(1, 1, 5), self.lecturer(2, 1, 5)]
+        students = [self.student(i, 1, course_id=i % 2) for i in range(4)]
+        towns = {0: 'Mombasa', 1: 'Kisumu', 2: 'Mombasa', 3: 'Kisumu'}
+        plan, _ = solve_assignment(students, lecturers, towns=towns, group_by_town=False)
+        courses = {}
+        for student, lecturer in plan:
+            courses.setdefault(lecturer.id, set()).add(student.course_id)
+        # One course per lecturer, whatever the towns
+        self.assertEqual(sorted(map(sorted, courses.values())), [[0], [1]])
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -14,8 +15,8 @@ urlpatterns = [
     path('logbook/entry/<int:attachment_id>/', views.logbook_entry, name='logbook_entry'),
     path('logbook/edit-entry/<int:entry_id>/', views.edit_previous_entry, name='edit_logbook_entry'),
     path('export/logbook/<int:attachment_id>/<str:format_type>/', views.export_logbook, name='export_logbook'),
-    path('api/entry/<int:entry_id>/', views.api_entry_detail, name='api_entry_detail'),
-    path('api/entry/<int:entry_id>/comment/', views.api_add_supervisor_comment, name='api_add_supervisor_comment'),
+    path('api/entry/<int:entry_id>/', views.api_entry_detail_async if settings.ASYNC_VIEWS else views.api_entry_detail, name='api_entry_detail'),
+    path('api/entry/<int:entry_id>/comment/', views.api_add_supervisor_comment_async if settings.ASYNC_VIEWS else views.api_add_supervisor_comment, name='api_add_supervisor_comment'),
     path("<int:attachment_id>/logbook/upload/", views.upload_report, name="upload_report"),
     path('approve/<int:attachment_id>/', views.approve_attachment, name='approve_attachment'),
     path('reject/<int:attachment_id>/', views.reject_attachment, name='reject_attachment'),
@@ -23,6 +24,10 @@ urlpatterns = [
     path('report/<int:attachment_id>/', views.report_upload, name='report_upload'),
     path('report/delete/<int:report_id>/', views.delete_report, name='delete_report'),
     path("communication/", views.communication, name="communication"),
+    path('messages/', views.inbox, name='inbox'),
+    path('messages/<int:thread_id>/', views.message_thread, name='message_thread'),
+    path('messages/send/', views.send_message, name='send_message'),
+    path('messages/mark-read/', views.mark_messages_read, name='mark_messages_read'),
     path('evaluations/', views.evaluations, name='evaluations'),
     path('assessment/', views.assessment, name='assessment'),
     path('supervisor/logbook/<int:attachment_id>/', views.supervisor_logbook, name='supervisor_logbook'),
@@ -39,6 +44,7 @@ urlpatterns = [
     
     # Students Management URLs
     path('admin/students/', views.admin_students, name='admin_students'),
+    path('admin/students/<int:student_id>/details/', views.admin_student_detail, name='admin_student_detail'),
     path('admin/assign-student/<int:placement_id>/', views.assign_student_to_lecturer, name='assign_student_to_lecturer'),
     path('admin/unassign-student/<int:assignment_id>/', views.unassign_student, name='unassign_student'),
     path('admin/lecturers/<int:lecturer_id>/delete/', views.delete_lecturer, name='delete_lecturer'),
@@ -46,10 +52,12 @@ urlpatterns = [
     # Assignment URLs
     path('admin/assignments/', views.assignment_dashboard, name='assignment_dashboard'),
     path('admin/assignments/bulk-assign/', views.bulk_assign_students, name='bulk_assign_students'),
+    path('admin/assignments/jobs/<int:job_id>/', views.assignment_job_status, name='assignment_job_status'),
     
     # API endpoints
-    path('api/departments/', views.get_departments, name='api_departments'),
-    path('api/courses/', views.get_courses, name='api_courses'),
+    path('api/departments/', views.get_departments_async if settings.ASYNC_VIEWS else views.get_departments, name='api_departments'),
+    path('api/courses/', views.get_courses_async if settings.ASYNC_VIEWS else views.get_courses, name='api_courses'),
+    path('events/', views.live_events, name='live_events'),
     
     # NEW: Enhanced Admin URLs
     path('admin/pending-approvals/', views.pending_approvals, name='pending_approvals'),
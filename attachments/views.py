@@ -2,7 +2,9 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404
+from asgiref.sync import sync_to_async
+from django.urls import reverse
 from django.utils import timezone
 from django.db.models import Sum
 from .models import Attachment, LogbookEntry, Industry, ReportUpload, PlacementFormSubmission, Department, Lecturer, StudentAssignment
@@ -10,23 +12,39 @@ from .forms import AttachmentForm, LogbookEntryForm
 import os
 from django.core.exceptions import ValidationError
 from django.contrib.auth.decorators import login_required, user_passes_test
-from .models import Message, Announcement, User
+from .models import Message, Announcement, ThreadParticipant, User
 from .models import Report, Course
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Exists, OuterRef, Prefetch, Subquery
 from datetime import timedelta
 from django.views.decorators.http import require_POST
 import json
-from django.db import models
+from django.db import models, transaction
 import secrets
 import string
 from django.core.mail import send_mail
 from django.conf import settings
 from .email_utils import send_lecturer_credentials, send_lecturer_password_reset
+from .dashboard_stats import get_snapshot_stats
+from .assignment_engine import available_lecturers, unassigned_students
+from .assignment_jobs import enqueue_job, job_progress
+from .inbox import mark_threads_read, message_page, post_message, thread_page
+from .keyset import keyset_page
+from .logbook_summary import get_logbook_summary
+from .reference_cache import (
+    acourse_list, adepartment_list, auniversity_names, course_list, department_list, university_names,
+)
+from .file_serving import serve_field_file, serve_file
+from .pdf_exports import logbook_pdf_path, render_logbook_pdf
+from .pdf_render import render_pdf
+from .csv_export import (
+    LOGBOOK_HEADER, PLACEMENT_HEADER, REPORT_HEADER, STUDENT_HEADER,
+    logbook_rows, placement_rows, report_rows, streaming_csv_response, student_rows,
+)
+from .models import AssignmentJob
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 
 import csv
 from django.template.loader import render_to_string
-from weasyprint import HTML
 import io
 from django.core.mail import send_mass_mail
 from django.db.models import Count, Q, Avg, Sum
@@ -113,9 +131,10 @@ def attachment_detail(request, attachment_id):
     # Get logbook entries for this attachment
     entries = LogbookEntry.objects.filter(attachment=attachment).order_by('-entry_date')[:10]
     
-    # Calculate statistics
-    total_hours = entries.aggregate(Sum('hours_worked'))['hours_worked__sum'] or 0
-    total_entries = entries.count()
+    # Statistics from the running totals
+    summary = get_logbook_summary(attachment)
+    total_hours = summary.total_hours
+    total_entries = summary.entry_count
     
     context = {
         'attachment': attachment,
@@ -148,7 +167,8 @@ def logbook_entry(request, attachment_id):
             entry = form.save(commit=False)
             entry.attachment = attachment
             entry.entry_date = today  # force today's date
-            entry.save()
+            with transaction.atomic():
+                entry.save()
             messages.success(request, 'Logbook entry saved successfully!')
             return redirect('attachments:logbook', attachment_id=attachment.id)
     else:
@@ -160,6 +180,10 @@ def logbook_entry(request, attachment_id):
         'today': today
     })
 
+# Newest first; id breaks ties for the keyset cursor
+LOGBOOK_ORDERING = ['-entry_date', '-id']
+LOGBOOK_PAGE_SIZE = 30
+
 @login_required
 def logbook(request, attachment_id):
     """View logbook for a specific attachment (newest first)"""
@@ -172,19 +196,18 @@ def logbook(request, attachment_id):
         messages.error(request, "You don't have permission to view this logbook.")
         return redirect('attachments:dashboard')
 
-    # Logbook entries
-    entries = LogbookEntry.objects.filter(
-        attachment=attachment
-    ).order_by('-entry_date', '-id')
+    # Logbook entries, one page at a time
+    page = keyset_page(
+        LogbookEntry.objects.filter(attachment=attachment),
+        LOGBOOK_ORDERING, request.GET.get('after'), LOGBOOK_PAGE_SIZE,
+    )
 
     # Reports uploaded
     reports = attachment.reports.all()
     reports_count = reports.count()
 
-    # Stats
-    total_hours = entries.aggregate(Sum('hours_worked'))['hours_worked__sum'] or 0
-    total_entries = entries.count()
-    supervisor_reviews = entries.filter(supervisor_comments__isnull=False).count()
+    # Stats from the running totals
+    summary = get_logbook_summary(attachment)
 
     # Calculate progress based on actual dates
     today = timezone.now().date()
@@ -215,10 +238,12 @@ def logbook(request, attachment_id):
 
     context = {
         'attachment': attachment,
-        'entries': entries,
-        'total_hours': total_hours,
-        'total_entries': total_entries,
-        'supervisor_reviews': supervisor_reviews,
+        'entries': page.items,
+        'page': page,
+        'total_hours': summary.total_hours,
+        'total_entries': summary.entry_count,
+        'supervisor_reviews': summary.reviewed_count,
+        'last_entry_date': summary.last_entry_date,
         'progress_percentage': progress_percentage,
         'days_remaining': days_remaining,
         'days_completed': days_completed,
@@ -242,7 +267,8 @@ def edit_previous_entry(request, entry_id):
         if form.is_valid():
             updated_entry = form.save(commit=False)
             updated_entry.edit_count += 1
-            updated_entry.save()
+            with transaction.atomic():
+                updated_entry.save()
             
             messages.success(request, 'Logbook entry updated successfully!')
             return redirect('attachments:logbook', attachment_id=entry.attachment.id)
@@ -257,10 +283,24 @@ def edit_previous_entry(request, entry_id):
     })
 
 
+def _logbook_pdf_response(request, attachment, pdf_path):
+    university_name = "Machakos University"
+    if request.user.department:
+        university_name = request.user.department.university or university_name
+    filename = f'{university_name.replace(" ", "_")}_Logbook_{attachment.organization}_{timezone.now().date()}.pdf'
+    return serve_file(request, pdf_path, filename=filename, content_type='application/pdf')
+
 @login_required
 def export_logbook(request, attachment_id, format_type):
     """Export logbook in various formats"""
     attachment = get_object_or_404(Attachment, id=attachment_id, student=request.user)
+    
+    if format_type == 'pdf':
+        # Rendered PDFs are cached on disk until the logbook changes
+        pdf_path = logbook_pdf_path(attachment)
+        if pdf_path.exists():
+            return _logbook_pdf_response(request, attachment, pdf_path)
+    
     entries = LogbookEntry.objects.filter(attachment=attachment).order_by('-entry_date')
     
     # Calculate statistics
@@ -323,42 +363,17 @@ def export_logbook(request, attachment_id, format_type):
             'academic_year': academic_year,
         })
         
-        html = HTML(string=html_string)
-        pdf_file = html.write_pdf()
-        
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{university_name.replace(" ", "_")}_Logbook_{attachment.organization}_{timezone.now().date()}.pdf"'
-        return response
+        # Rendered in the PDF process pool so this worker keeps serving other requests
+        render_logbook_pdf(attachment, pdf_path, html_string)
+        return _logbook_pdf_response(request, attachment, pdf_path)
         
     elif format_type == 'csv':
         # CSV export - UPDATED to include university info
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{university_name.replace(" ", "_")}_Logbook_{attachment.organization}_{timezone.now().date()}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['University', 'Department', 'Student Name', 'Registration Number', 'Entry #', 'Date', 
-                        'Department/Section', 'Tasks', 'Skills Learned', 'Achievements', 'Challenges', 
-                        'Hours Worked', 'Supervisor Comments', 'Has Comments'])
-        
-        for i, entry in enumerate(entries, 1):
-            writer.writerow([
-                university_name,
-                department_name or '',
-                request.user.get_full_name(),
-                request.user.student_id or '',
-                i,
-                entry.entry_date,
-                entry.department_section,
-                entry.tasks,
-                entry.skills_learned,
-                entry.achievements,
-                entry.challenges,
-                entry.hours_worked,
-                entry.supervisor_comments,
-                'Yes' if entry.supervisor_comments else 'No'
-            ])
-        
-        return response
+        return streaming_csv_response(
+            f'{university_name.replace(" ", "_")}_Logbook_{attachment.organization}_{timezone.now().date()}.csv',
+            LOGBOOK_HEADER,
+            logbook_rows(attachment, university_name, department_name, request.user),
+        )
         
     elif format_type == 'json':
         # JSON export - UPDATED to include university info
@@ -417,16 +432,8 @@ def export_logbook(request, attachment_id, format_type):
     
     return HttpResponse("Unsupported export format", status=400)
 
-@login_required
-def api_entry_detail(request, entry_id):
-    """API endpoint to get entry details for modal"""
-    entry = get_object_or_404(LogbookEntry, id=entry_id)
-    
-    # Check permission
-    if request.user != entry.attachment.student and not request.user.is_staff:
-        return JsonResponse({'error': 'Permission denied'}, status=403)
-    
-    data = {
+def _entry_detail_data(entry):
+    return {
         'entry_date': str(entry.entry_date),
         'department_section': entry.department_section,
         'tasks': entry.tasks,
@@ -439,8 +446,31 @@ def api_entry_detail(request, entry_id):
         'created_at': entry.created_at.isoformat(),
         'updated_at': entry.updated_at.isoformat(),
     }
+
+@login_required
+def api_entry_detail(request, entry_id):
+    """API endpoint to get entry details for modal"""
+    entry = get_object_or_404(LogbookEntry.objects.select_related('attachment'), id=entry_id)
+    
+    # Check permission
+    if request.user.id != entry.attachment.student_id and not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    
+    return JsonResponse(_entry_detail_data(entry))
+
+@login_required
+async def api_entry_detail_async(request, entry_id):
+    """api_entry_detail for the ASGI profile (see practicheck/urls.py)"""
+    user = await request.auser()
+    try:
+        entry = await LogbookEntry.objects.select_related('attachment').aget(id=entry_id)
+    except LogbookEntry.DoesNotExist:
+        raise Http404('No LogbookEntry matches the given query.')
+    
+    if user.id != entry.attachment.student_id and not user.is_staff:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    return JsonResponse(data)
+    return JsonResponse(_entry_detail_data(entry))
 
 @login_required
 def upload_report(request, attachment_id):
@@ -618,26 +648,63 @@ def communication(request):
     
     return render(request, 'attachments/communication.html', context)
 
+INBOX_PAGE_SIZE = 20
+THREAD_PAGE_SIZE = 50
+
+@login_required
+def inbox(request):
+    """The user's conversations, newest first"""
+    page = thread_page(request.user, request.GET.get('after'), INBOX_PAGE_SIZE)
+    return render(request, 'attachments/inbox.html', {'threads': page.items, 'page': page})
+
+@login_required
+def message_thread(request, thread_id):
+    """One conversation; opening it marks its messages read"""
+    participant = get_object_or_404(
+        ThreadParticipant.objects.select_related('thread'), thread_id=thread_id, user=request.user
+    )
+    other = participant.thread.participants.exclude(user=request.user).select_related('user').first()
+    page = message_page(participant.thread, request.GET.get('after'), THREAD_PAGE_SIZE)
+    if participant.unread_count:
+        mark_threads_read(request.user, [thread_id])
+    return render(request, 'attachments/message_thread.html', {
+        'thread': participant.thread,
+        'other_user': other.user if other else request.user,
+        'thread_messages': page.items[::-1],  # oldest first on screen
+        'page': page,
+    })
+
+@login_required
+@require_POST
 def send_message(request):
-    if request.method == 'POST':
-        user = request.user
-        recipient_id = request.POST.get('recipient')
-        subject = request.POST.get('subject', '')
-        body = request.POST.get('body')
-        attachment_file = request.FILES.get('attachment')
-
-        if recipient_id and body:
-            recipient = get_object_or_404(User, id=recipient_id)
-            Message.objects.create(
-                sender=user,
-                recipient=recipient,
-                subject=subject,
-                body=body,
-                attachment=attachment_file if attachment_file else None
-            )
-            return redirect(f'/attachments/student_communication/?contact_id={recipient.id}')
+    recipient_id = request.POST.get('recipient')
+    body = request.POST.get('body', '').strip()
+    if not (recipient_id and recipient_id.isdigit() and body):
+        messages.error(request, 'Please choose a recipient and write a message.')
+        return redirect('attachments:inbox')
+
+    recipient = get_object_or_404(User, id=recipient_id)
+    message = post_message(
+        request.user, recipient, body,
+        subject=request.POST.get('subject', ''), attachment=request.FILES.get('attachment'),
+    )
+    return redirect('attachments:message_thread', thread_id=message.thread_id)
 
-    return redirect('/attachments/student_communication/')
+@login_required
+@require_POST
+def mark_messages_read(request):
+    """Bulk mark-read: all threads (``all=1``) or the selected ones (``thread`` values)"""
+    if request.POST.get('all') == '1':
+        thread_ids = None
+    else:
+        thread_ids = [int(value) for value in request.POST.getlist('thread') if value.isdigit()]
+        if not thread_ids:
+            messages.info(request, 'No conversations selected.')
+            return redirect('attachments:inbox')
+    cleared = mark_threads_read(request.user, thread_ids)
+    if cleared:
+        messages.success(request, f'{cleared} message{"s" if cleared != 1 else ""} marked as read.')
+    return redirect('attachments:inbox')
 
 def evaluations(request):
     return render(request, 'attachments/assessment.html')
@@ -657,23 +724,26 @@ def supervisor_logbook(request, attachment_id):
         if not request.user.is_authenticated or request.user.email != attachment.supervisor_email:
             return render(request, '403.html', status=403)
         
-        # Get logbook entries for this attachment
-        entries = LogbookEntry.objects.filter(attachment=attachment).order_by('-entry_date')
+        # Get logbook entries for this attachment, one page at a time
+        page = keyset_page(
+            LogbookEntry.objects.filter(attachment=attachment),
+            LOGBOOK_ORDERING, request.GET.get('after'), LOGBOOK_PAGE_SIZE,
+        )
         reports = ReportUpload.objects.filter(attachment=attachment).order_by('-uploaded_at')
         
-        # Calculate stats
-        total_entries = entries.count()
-        total_hours = sum(entry.hours_worked for entry in entries)
-        supervisor_reviews = entries.filter(supervisor_comments__isnull=False).count()
+        # Stats from the running totals
+        summary = get_logbook_summary(attachment)
         
         context = {
             'attachment': attachment,
-            'entries': entries,
+            'entries': page.items,
+            'page': page,
             'reports': reports,
             'reports_count': reports.count(),
-            'total_entries': total_entries,
-            'total_hours': total_hours,
-            'supervisor_reviews': supervisor_reviews,
+            'total_entries': summary.entry_count,
+            'total_hours': summary.total_hours,
+            'supervisor_reviews': summary.reviewed_count,
+            'last_entry_date': summary.last_entry_date,
             'total_days': attachment.total_days,
         }
         
@@ -682,26 +752,50 @@ def supervisor_logbook(request, attachment_id):
     except Exception as e:
         return render(request, 'error.html', {'error': str(e)})
     
+def _save_supervisor_comment(entry, comment):
+    entry.supervisor_comments = comment
+    # The logbook summary signals update inside the same transaction
+    with transaction.atomic():
+        entry.save()
+
+def _check_supervisor_comment(user, entry, body):
+    """``(error response, comment)`` for a comment request; no error means save it"""
+    # Verify the current user is the supervisor
+    if getattr(user, 'email', None) != entry.attachment.supervisor_email:
+        return JsonResponse({'error': 'Not authorized'}, status=403), None
+    comment = json.loads(body).get('comment', '').strip()
+    if not comment:
+        return JsonResponse({'error': 'Comment cannot be empty'}, status=400), None
+    return None, comment
+
 @require_POST
 def api_add_supervisor_comment(request, entry_id):
     """API endpoint for supervisors to add comments to logbook entries"""
     try:
-        entry = get_object_or_404(LogbookEntry, id=entry_id)
-        
-        # Verify the current user is the supervisor
-        if request.user.email != entry.attachment.supervisor_email:
-            return JsonResponse({'error': 'Not authorized'}, status=403)
-        
-        data = json.loads(request.body)
-        comment = data.get('comment', '').strip()
-        
-        if comment:
-            entry.supervisor_comments = comment
-            entry.save()
+        entry = get_object_or_404(LogbookEntry.objects.select_related('attachment'), id=entry_id)
+        error, comment = _check_supervisor_comment(request.user, entry, request.body)
+        if error:
+            return error
+        _save_supervisor_comment(entry, comment)
+        return JsonResponse({'success': True, 'message': 'Comment added successfully'})
             
-            return JsonResponse({'success': True, 'message': 'Comment added successfully'})
-        else:
-            return JsonResponse({'error': 'Comment cannot be empty'}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@require_POST
+async def api_add_supervisor_comment_async(request, entry_id):
+    """api_add_supervisor_comment for the ASGI profile (see practicheck/urls.py)"""
+    try:
+        user = await request.auser()
+        try:
+            entry = await LogbookEntry.objects.select_related('attachment').aget(id=entry_id)
+        except LogbookEntry.DoesNotExist:
+            raise Http404('No LogbookEntry matches the given query.')
+        error, comment = _check_supervisor_comment(user, entry, request.body)
+        if error:
+            return error
+        await sync_to_async(_save_supervisor_comment)(entry, comment)
+        return JsonResponse({'success': True, 'message': 'Comment added successfully'})
             
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -877,79 +971,8 @@ def reset_lecturer_password(request, lecturer_id):
 
 @user_passes_test(is_admin)
 def admin_dashboard(request):
-    # Statistics - Count ALL students (registered users with user_type=1)
-    total_students = User.objects.filter(user_type=1).count()
-    total_lecturers = Lecturer.objects.filter(is_active=True).count()
-    total_placements = PlacementFormSubmission.objects.count()
-    
-    # Assignment statistics - Count students with assignments
-    assigned_students_count = StudentAssignment.objects.values('student').distinct().count()
-    unassigned_students_count = total_students - assigned_students_count
-    
-    # Pending approvals
-    pending_approvals_count = PlacementFormSubmission.objects.filter(status='pending').count() + \
-                            Attachment.objects.filter(status='pending').count()
-    
-    # Recent reports (last 7 days)
-    new_reports_count = ReportUpload.objects.filter(
-        uploaded_at__gte=timezone.now() - timedelta(days=7)
-    ).count()
-    
-    # Student growth (compared to last month)
-    last_month = timezone.now() - timedelta(days=30)
-    students_last_month = User.objects.filter(
-        user_type=1, date_joined__lt=last_month
-    ).count()
-    student_growth = round(((total_students - students_last_month) / students_last_month * 100), 1) if students_last_month > 0 else 0
-    
-    # Available slots
-    available_slots = Lecturer.objects.filter(is_active=True).aggregate(
-        total_slots=Sum('max_students'),
-        used_slots=Count('assigned_students')
-    )
-    available_slots_count = (available_slots['total_slots'] or 0) - (available_slots['used_slots'] or 0)
-    
-    # Assignment rate
-    assignment_rate = round((assigned_students_count / total_students * 100), 1) if total_students > 0 else 0
-    
-    # Department-wise statistics
-    departments = Department.objects.all()
-    department_stats = []
-    
-    for dept in departments:
-        # Count all students in this department
-        total_dept_students = User.objects.filter(
-            user_type=1, 
-            department=dept
-        ).count()
-        
-        # Count assigned students in this department
-        assigned_dept_students = StudentAssignment.objects.filter(
-            student__department=dept
-        ).values('student').distinct().count()
-        
-        # Calculate unassigned
-        unassigned_dept_students = total_dept_students - assigned_dept_students
-        
-        # Recent reports in this department
-        recent_reports = ReportUpload.objects.filter(
-            attachment__student__department=dept,
-            uploaded_at__gte=timezone.now() - timedelta(days=7)
-        ).count()
-        
-        # Assignment rate
-        dept_assignment_rate = round((assigned_dept_students / total_dept_students * 100), 1) if total_dept_students > 0 else 0
-        
-        department_stats.append({
-            'id': dept.id,
-            'name': dept.name,
-            'code': dept.code,
-            'total_placements': total_dept_students,
-            'assigned_placements': assigned_dept_students,
-            'unassigned_placements': unassigned_dept_students,
-            'recent_reports': recent_reports,
-            'assignment_rate': dept_assignment_rate,
-        })
+    # Global KPIs and department-wise statistics (materialized, kept current by signals)
+    stats = get_snapshot_stats()
     
     # Recent placements (actual placement submissions)
     recent_placements = PlacementFormSubmission.objects.select_related(
@@ -988,17 +1011,7 @@ def admin_dashboard(request):
     ]
     
     context = {
-        'total_students': total_students,
-        'total_lecturers': total_lecturers,
-        'total_placements': total_placements,
-        'assigned_students_count': assigned_students_count,
-        'unassigned_students_count': unassigned_students_count,
-        'pending_approvals_count': pending_approvals_count,
-        'new_reports_count': new_reports_count,
-        'student_growth': student_growth,
-        'available_slots': available_slots_count,
-        'assignment_rate': assignment_rate,
-        'department_stats': department_stats,
+        **stats,
         'recent_placements': recent_placements,
         'lecturer_workload': lecturer_workload,
         'unassigned_students': unassigned_students,
@@ -1013,102 +1026,90 @@ def admin_dashboard(request):
     
     return render(request, 'attachments/admin_dashboard.html', context)
 
+STUDENTS_PAGE_SIZE = 50
+
 @user_passes_test(is_admin)
 def admin_students(request):
-    """Admin view for managing all students and their assignments"""
+    """Admin view for managing all students and their assignments (keyset paginated)"""
     # Get filter parameters
     assignment_filter = request.GET.get('filter', 'all')
     department_filter = request.GET.get('department', '')
     year_filter = request.GET.get('year', '')
+    course_filter = request.GET.get('course', '')
     
-    # Get ALL registered students (users with user_type=1)
-    students = User.objects.filter(user_type=1).select_related(
-        'department', 'course'
-    ).prefetch_related(
-        'student_assignments',
-        'student_assignments__lecturer',
-        'student_assignments__lecturer__user',
-    ).order_by('first_name', 'last_name')
+    # Registered students (users with user_type=1); EXISTS instead of a join so nobody is listed twice
+    students = User.objects.filter(user_type=1).annotate(
+        is_assigned=Exists(StudentAssignment.objects.filter(student=OuterRef('pk'))),
+    )
     
     # Apply filters
     if assignment_filter == 'assigned':
-        students = students.filter(student_assignments__isnull=False)
+        students = students.filter(is_assigned=True)
     elif assignment_filter == 'unassigned':
-        students = students.filter(student_assignments__isnull=True)
+        students = students.filter(is_assigned=False)
     
-    if department_filter:
+    if department_filter.isdigit():
         students = students.filter(department_id=department_filter)
     
-    if year_filter:
+    if year_filter.isdigit():
         students = students.filter(year_of_study=year_filter)
     
+    if course_filter.isdigit():
+        students = students.filter(course_id=course_filter)
+    
     # Get departments for filter dropdown
     departments = Department.objects.all()
     
-    # Statistics - Calculate based on ALL students
-    total_students = students.count()
-    assigned_count = students.filter(student_assignments__isnull=False).count()
-    unassigned_count = students.filter(student_assignments__isnull=True).count()
+    # Statistics - one aggregate over the filtered students
+    stats = students.aggregate(
+        total=Count('id'),
+        assigned=Count('id', filter=Q(is_assigned=True)),
+    )
+    total_students = stats['total']
+    assigned_count = stats['assigned']
+    unassigned_count = total_students - assigned_count
     
     # Calculate assignment rate
     assignment_rate = (assigned_count / total_students * 100) if total_students > 0 else 0
     
-    # Get placement forms separately to avoid the prefetch error
-    student_ids = students.values_list('id', flat=True)
-    placement_forms = PlacementFormSubmission.objects.filter(
-        student_id__in=student_ids
-    ).select_related('student')
-    
-    # Get student reports for the modal
-    student_reports = ReportUpload.objects.filter(
-        attachment__student_id__in=student_ids
-    ).select_related('attachment')
-    
-    # Create dictionaries for quick lookup
-    placement_forms_by_student = {}
-    for placement in placement_forms:
-        if placement.student_id not in placement_forms_by_student:
-            placement_forms_by_student[placement.student_id] = []
-        placement_forms_by_student[placement.student_id].append(placement)
-    
-    student_reports_by_student = {}
-    for report in student_reports:
-        if report.attachment.student_id not in student_reports_by_student:
-            student_reports_by_student[report.attachment.student_id] = []
-        student_reports_by_student[report.attachment.student_id].append(report)
-    
-    # Group students by year and course for grouped view
-    grouped_students = []
-    years = students.values_list('year_of_study', flat=True).distinct().order_by('year_of_study')
+    # Current page only; placement/report details are loaded on demand (admin_student_detail)
+    page_queryset = students.select_related('department', 'course').annotate(
+        placement_firm=Subquery(
+            PlacementFormSubmission.objects.filter(student=OuterRef('pk')).order_by('id').values('firm_name')[:1]
+        ),
+    ).prefetch_related(
+        Prefetch(
+            'student_assignments',
+            queryset=StudentAssignment.objects.select_related('lecturer__user', 'lecturer__department'),
+            to_attr='assignment_list',
+        ),
+    )
+    page = keyset_page(
+        page_queryset, ['first_name', 'last_name', 'id'], request.GET.get('after'), STUDENTS_PAGE_SIZE
+    )
     
-    for year in years:
-        year_students = students.filter(year_of_study=year)
-        year_courses = []
-        
-        # Get distinct courses for this year
-        courses = Course.objects.filter(
-            id__in=year_students.values_list('course_id', flat=True).distinct()
-        )
-        
-        for course in courses:
-            course_students = year_students.filter(course=course)
-            year_courses.append({
-                'course': course,
-                'students': course_students,
-                'students_count': course_students.count()
-            })
-        
-        grouped_students.append({
-            'year': year,
-            'courses': year_courses,
-            'students_count': year_students.count()
+    # Group students by year and course in a single GROUP BY query
+    grouped_students = []
+    for row in students.order_by('year_of_study', 'course__name').values(
+        'year_of_study', 'course_id', 'course__name'
+    ).annotate(students_count=Count('id')):
+        if not grouped_students or grouped_students[-1]['year'] != row['year_of_study']:
+            grouped_students.append({'year': row['year_of_study'], 'courses': [], 'students_count': 0})
+        year_data = grouped_students[-1]
+        year_data['students_count'] += row['students_count']
+        year_data['courses'].append({
+            'course': {'id': row['course_id'], 'name': row['course__name'] or 'No Course'},
+            'students_count': row['students_count'],
         })
     
+    filter_params = request.GET.copy()
+    filter_params.pop('after', None)
+    
     context = {
-        'students': students,
+        'students': page.items,
+        'page': page,
+        'filter_query': filter_params.urlencode(),
         'departments': departments,
-        'placement_forms_by_student': placement_forms_by_student,
-        'student_reports_by_student': student_reports_by_student,
         'grouped_students': grouped_students,
         'total_students': total_students,
         'assigned_count': assigned_count,
@@ -1117,10 +1118,31 @@ def admin_students(request):
         'current_filter': assignment_filter,
         'selected_department': department_filter,
         'selected_year': year_filter,
+        'selected_course': course_filter,
     }
     
     return render(request, 'attachments/admin_students.html', context)
 
+@user_passes_test(is_admin)
+def admin_student_detail(request, student_id):
+    """Placement/assignment details or uploaded reports of one student, loaded into the admin_students modal by htmx"""
+    student = get_object_or_404(User.objects.select_related('department', 'course'), id=student_id, user_type=1)
+    
+    if request.GET.get('tab') == 'reports':
+        student_reports = ReportUpload.objects.filter(
+            attachment__student=student
+        ).select_related('attachment').order_by('-uploaded_at')
+        return render(request, 'attachments/partials/student_reports.html', {
+            'student': student,
+            'student_reports': student_reports,
+        })
+    
+    return render(request, 'attachments/partials/student_details.html', {
+        'student': student,
+        'placement_forms': PlacementFormSubmission.objects.filter(student=student).order_by('id'),
+        'assignment': student.student_assignments.select_related('lecturer__user', 'lecturer__department').first(),
+    })
+
 @user_passes_test(is_admin)
 def department_placements(request, department_id):
     department = get_object_or_404(Department, id=department_id)
@@ -1149,6 +1171,7 @@ def department_placements(request, department_id):
         'department': department,
         'students': students,
         'available_lecturers': available_lecturers,
+        'assignment_job': _tracked_assignment_job(request),
     }
     
     return render(request, 'attachments/department_placements.html', context)
@@ -1311,6 +1334,7 @@ def assignment_dashboard(request):
         'lecturers_by_department': lecturers_by_department,
         'total_unassigned': unassigned_students.count(),
         'total_lecturers': sum(len(lecturers) for lecturers in lecturers_by_department.values()),
+        'assignment_job': _tracked_assignment_job(request),
     }
     
     return render(request, 'attachments/assignment_dashboard.html', context)
@@ -1319,74 +1343,59 @@ def assignment_dashboard(request):
 @require_POST
 def bulk_assign_students(request):
     """Bulk assign students to lecturers"""
-    assignments = request.POST.getlist('assignments')
-    assigned_count = 0
-    errors = []
-    
-    current_year = timezone.now().year
+    pairs = []
+    invalid = 0
     
-    for assignment_str in assignments:
+    for assignment_str in request.POST.getlist('assignments'):
         if not assignment_str:
             continue
-            
         try:
             student_id, lecturer_id = assignment_str.split('_')
-            student = User.objects.get(id=student_id, user_type=1)
-            lecturer = Lecturer.objects.get(id=lecturer_id)
-            
-            # Check if student already assigned for this academic year
-            existing_assignment = StudentAssignment.objects.filter(
-                student=student,
-                academic_year=current_year
-            ).exists()
-            
-            if existing_assignment:
-                errors.append(f"{student.get_full_name()} is already assigned")
-                continue
-            
-            # Check if lecturer has available slots
-            assigned_count_current = StudentAssignment.objects.filter(lecturer=lecturer).count()
-            if assigned_count_current >= lecturer.max_students:
-                errors.append(f"{lecturer.user.get_full_name()} has no available slots for {student.get_full_name()}")
-                continue
-            
-            # Find placement form by direct query (most reliable)
-            placement_form = PlacementFormSubmission.objects.filter(student=student).first()
-            
-            # Create assignment
-            StudentAssignment.objects.create(
-                student=student,
-                lecturer=lecturer,
-                placement_form=placement_form,
-                academic_year=current_year
-            )
-            assigned_count += 1
-            
-        except (ValueError, User.DoesNotExist, Lecturer.DoesNotExist):
-            errors.append("Invalid assignment data")
-            continue
+            pairs.append((int(student_id), int(lecturer_id)))
+        except ValueError:
+            invalid += 1
     
-    if assigned_count > 0:
-        messages.success(request, f'Successfully assigned {assigned_count} student(s).')
-    if errors:
-        messages.error(request, f'Could not assign {len(errors)} student(s): {", ".join(errors[:5])}')
+    if not pairs and not invalid:
+        messages.info(request, 'No students selected for assignment.')
+        return redirect('attachments:assignment_dashboard')
     
-    return redirect('attachments:assignment_dashboard')
+    job, created = enqueue_job('bulk', {'pairs': pairs, 'invalid': invalid}, request.user)
+    return _assignment_job_response(request, job, created, reverse('attachments:assignment_dashboard'))
 
 def get_departments(request):
     """API endpoint to get departments for a university"""
     university = request.GET.get('university', 'Machakos University')
-    departments = Department.objects.filter(university=university).values('id', 'name', 'code')
-    return JsonResponse(list(departments), safe=False)
+    if university not in university_names():
+        return JsonResponse([], safe=False)
+    return JsonResponse(department_list(university), safe=False)
+
+async def get_departments_async(request):
+    university = request.GET.get('university', 'Machakos University')
+    if university not in await auniversity_names():
+        return JsonResponse([], safe=False)
+    return JsonResponse(await adepartment_list(university), safe=False)
 
 def get_courses(request):
     """API endpoint to get courses for a department"""
     department_id = request.GET.get('department_id')
-    if department_id:
-        courses = Course.objects.filter(department_id=department_id, is_active=True).values('id', 'name', 'code')
-        return JsonResponse(list(courses), safe=False)
+    if department_id and department_id.isdigit():
+        return JsonResponse(course_list(int(department_id)), safe=False)
+    return JsonResponse([], safe=False)
+
+async def get_courses_async(request):
+    department_id = request.GET.get('department_id')
+    if department_id and department_id.isdigit():
+        return JsonResponse(await acourse_list(int(department_id)), safe=False)
     return JsonResponse([], safe=False)
 
+def live_events(request):
+    """
+    Live event stream URL. In the ASGI profile practicheck/asgi.py answers it
+    before Django (see live_events.py); under WSGI there is no stream and 204
+    tells EventSource not to reconnect, so pages simply get no live updates.
+    """
+    return HttpResponse(status=204)
+
 @login_required
 @user_passes_test(is_admin)
 def toggle_lecturer(request, lecturer_id):
@@ -1414,9 +1423,7 @@ def download_report(request, report_id):
         messages.error(request, "You don't have permission to download this report.")
         return redirect('attachments:dashboard')
     
-    response = HttpResponse(report.file, content_type='application/octet-stream')
-    response['Content-Disposition'] = f'attachment; filename="{report.file.name}"'
-    return response
+    return serve_field_file(request, report.file)
 
 @user_passes_test(is_admin)
 def student_reports(request, student_id):
@@ -1478,21 +1485,15 @@ def reports_dashboard(request):
         reports_page = paginator.page(paginator.num_pages)
     
     # Statistics
-    total_reports = ReportUpload.objects.count()
-    reports_this_week = ReportUpload.objects.filter(
-        uploaded_at__gte=timezone.now() - timedelta(days=7)
-    ).count()
-    reports_this_month = ReportUpload.objects.filter(
-        uploaded_at__gte=timezone.now() - timedelta(days=30)
-    ).count()
+    stats = get_snapshot_stats()
     
     departments = Department.objects.all()
     
     context = {
         'reports': reports_page,
-        'total_reports': total_reports,
-        'reports_this_week': reports_this_week,
-        'reports_this_month': reports_this_month,
+        'total_reports': stats['total_reports'],
+        'reports_this_week': stats['reports_this_week'],
+        'reports_this_month': stats['reports_this_month'],
         'departments': departments,
         'selected_department': department_filter,
         'selected_date_range': date_filter,
@@ -1508,11 +1509,12 @@ def workload_overview(request):
         workload_percentage=(Count('assigned_students') * 100.0 / models.F('max_students'))
     ).order_by('-workload_percentage')
     
-    # Statistics
-    total_lecturers = lecturers.count()
-    overloaded_lecturers = lecturers.filter(workload_percentage__gt=100).count()
-    optimal_lecturers = lecturers.filter(workload_percentage__gte=70, workload_percentage__lte=100).count()
-    underutilized_lecturers = lecturers.filter(workload_percentage__lt=70).count()
+    # Statistics - derived from the evaluated queryset instead of one COUNT per bucket
+    workloads = [lecturer.workload_percentage for lecturer in lecturers if lecturer.workload_percentage is not None]
+    total_lecturers = len(lecturers)
+    overloaded_lecturers = sum(1 for workload in workloads if workload > 100)
+    optimal_lecturers = sum(1 for workload in workloads if 70 <= workload <= 100)
+    underutilized_lecturers = sum(1 for workload in workloads if workload < 70)
     
     context = {
         'lecturers': lecturers,
@@ -1544,25 +1546,10 @@ def export_students_data(request, format_type):
     students = User.objects.filter(user_type=1).select_related('department', 'course')
     
     if format_type == 'excel':
-        response = HttpResponse(content_type='application/vnd.ms-excel')
-        response['Content-Disposition'] = 'attachment; filename="students_export.xlsx"'
-        
-        # Simple CSV export for now
-        writer = csv.writer(response)
-        writer.writerow(['Student ID', 'Full Name', 'Email', 'Department', 'Course', 'Year of Study', 'Registration Date'])
-        
-        for student in students:
-            writer.writerow([
-                student.student_id,
-                student.get_full_name(),
-                student.email,
-                student.department.name if student.department else '',
-                student.course.name if student.course else '',
-                student.year_of_study,
-                student.date_joined.strftime('%Y-%m-%d')
-            ])
-        
-        return response
+        # Simple CSV export for now, streamed row by row
+        return streaming_csv_response(
+            'students_export.xlsx', STUDENT_HEADER, student_rows(), content_type='application/vnd.ms-excel'
+        )
     
     elif format_type == 'pdf':
         # PDF export
@@ -1571,8 +1558,7 @@ def export_students_data(request, format_type):
             'export_date': timezone.now()
         })
         
-        html = HTML(string=html_string)
-        pdf_file = html.write_pdf()
+        pdf_file = render_pdf(html_string)
         
         response = HttpResponse(pdf_file, content_type='application/pdf')
         response['Content-Disposition'] = 'attachment; filename="students_export.pdf"'
@@ -1584,46 +1570,11 @@ def export_students_data(request, format_type):
 
 def export_placements_data(request, format_type):
     """Export placements data"""
-    placements = PlacementFormSubmission.objects.select_related('student', 'department')
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="placements_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Student', 'Department', 'Firm', 'Supervisor', 'Start Date', 'End Date', 'Status'])
-    
-    for placement in placements:
-        writer.writerow([
-            placement.student.get_full_name(),
-            placement.department.name,
-            placement.firm_name,
-            placement.supervisor_name,
-            placement.start_date,
-            placement.end_date,
-            placement.status
-        ])
-    
-    return response
+    return streaming_csv_response('placements_export.csv', PLACEMENT_HEADER, placement_rows())
 
 def export_reports_data(request, format_type):
     """Export reports data"""
-    reports = ReportUpload.objects.select_related('attachment', 'attachment__student')
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="reports_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Student', 'Attachment', 'File Name', 'Uploaded At'])
-    
-    for report in reports:
-        writer.writerow([
-            report.attachment.student.get_full_name(),
-            report.attachment.organization,
-            report.file.name,
-            report.uploaded_at
-        ])
-    
-    return response
+    return streaming_csv_response('reports_export.csv', REPORT_HEADER, report_rows())
 
 def communication(request):
     """Industrial Attachment Placement Form with enhanced view"""
@@ -1763,193 +1714,57 @@ def student_registration(request):
     
     return render(request, 'attachments/student_registration.html', context)
 
+def _wants_json(request):
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
+    )
+
+def _assignment_job_response(request, job, created, redirect_url):
+    """Answer an assignment submission: JSON for AJAX callers, otherwise redirect to the progress widget"""
+    if _wants_json(request):
+        status_url = reverse('attachments:assignment_job_status', args=[job.id])
+        return JsonResponse({'created': created, 'status_url': status_url, **job_progress(job)}, status=202)
+    
+    if created:
+        messages.success(request, f'Assignment job #{job.id} queued. Progress is shown below.')
+    else:
+        messages.info(request, f'An identical assignment job (#{job.id}) is already {job.status}.')
+    return redirect(f'{redirect_url}?job={job.id}')
+
 @user_passes_test(is_admin)
 def auto_assign_students(request):
-    """Automatically assign unassigned students to available lecturers"""
-    try:
-        # Get all unassigned students for current academic year
-        current_year = timezone.now().year
-        unassigned_students = User.objects.filter(
-            user_type=1,
-            student_assignments__isnull=True
-        ).select_related('department', 'course')
-        
-        # Get all active lecturers with available slots, ordered by current workload
-        available_lecturers = Lecturer.objects.filter(
-            is_active=True
-        ).annotate(
-            assigned_count=Count('assigned_students'),
-            available_slots=models.F('max_students') - Count('assigned_students')
-        ).filter(available_slots__gt=0).select_related('user', 'department')
-        
-        assignments_made = 0
-        errors = []
-        
-        # Group students by department for efficient assignment
-        students_by_department = {}
-        for student in unassigned_students:
-            dept_id = student.department.id if student.department else 0
-            if dept_id not in students_by_department:
-                students_by_department[dept_id] = []
-            students_by_department[dept_id].append(student)
-        
-        # Group lecturers by department
-        lecturers_by_department = {}
-        for lecturer in available_lecturers:
-            dept_id = lecturer.department.id
-            if dept_id not in lecturers_by_department:
-                lecturers_by_department[dept_id] = []
-            lecturers_by_department[dept_id].append(lecturer)
-        
-        # Assign students department-wise
-        for dept_id, students in students_by_department.items():
-            if dept_id in lecturers_by_department and lecturers_by_department[dept_id]:
-                lecturers = lecturers_by_department[dept_id]
-                
-                # Sort lecturers by current workload (least assigned first)
-                lecturers_sorted = sorted(lecturers, key=lambda x: x.assigned_count)
-                
-                # Round-robin assignment to distribute students evenly
-                for i, student in enumerate(students):
-                    lecturer = lecturers_sorted[i % len(lecturers_sorted)]
-                    
-                    # Check if lecturer still has available slots
-                    if lecturer.assigned_count < lecturer.max_students:
-                        try:
-                            # Get student's placement form if exists
-                            placement_form = PlacementFormSubmission.objects.filter(
-                                student=student
-                            ).first()
-                            
-                            # Create assignment
-                            assignment = StudentAssignment(
-                                student=student,
-                                lecturer=lecturer,
-                                placement_form=placement_form,
-                                academic_year=current_year
-                            )
-                            assignment.save()
-                            
-                            # Update lecturer's assigned count
-                            lecturer.assigned_count += 1
-                            assignments_made += 1
-                            
-                        except Exception as e:
-                            errors.append(f"Failed to assign {student.get_full_name()}: {str(e)}")
-                    else:
-                        errors.append(f"Lecturer {lecturer.user.get_full_name()} has no available slots for {student.get_full_name()}")
-            else:
-                # No lecturers in this department, try to find any available lecturer
-                if available_lecturers:
-                    lecturers_sorted = sorted(available_lecturers, key=lambda x: x.assigned_count)
-                    for student in students:
-                        assigned = False
-                        for lecturer in lecturers_sorted:
-                            if lecturer.assigned_count < lecturer.max_students:
-                                try:
-                                    placement_form = PlacementFormSubmission.objects.filter(
-                                        student=student
-                                    ).first()
-                                    
-                                    assignment = StudentAssignment(
-                                        student=student,
-                                        lecturer=lecturer,
-                                        placement_form=placement_form,
-                                        academic_year=current_year
-                                    )
-                                    assignment.save()
-                                    
-                                    lecturer.assigned_count += 1
-                                    assignments_made += 1
-                                    assigned = True
-                                    break
-                                    
-                                except Exception as e:
-                                    errors.append(f"Failed to assign {student.get_full_name()}: {str(e)}")
-                        
-                        if not assigned:
-                            errors.append(f"No available lecturer for {student.get_full_name()} (Department: {student.department.name if student.department else 'None'})")
-        
-        if assignments_made > 0:
-            messages.success(request, f'Successfully auto-assigned {assignments_made} students to lecturers!')
-        
-        if errors:
-            messages.warning(request, f'Some assignments failed: {", ".join(errors[:5])}' + ("..." if len(errors) > 5 else ""))
-        
-        if assignments_made == 0 and not errors:
-            messages.info(request, 'No students available for auto-assignment or no lecturers with available slots.')
-            
-    except Exception as e:
-        messages.error(request, f'Error during auto-assignment: {str(e)}')
-    
-    return redirect('attachments:assignment_dashboard')
+    """Queue automatic assignment of unassigned students to available lecturers"""
+    job, created = enqueue_job('auto', user=request.user)
+    return _assignment_job_response(request, job, created, reverse('attachments:assignment_dashboard'))
 
 @user_passes_test(is_admin)
 def smart_assign_department(request, department_id):
-    """Smart assignment for a specific department"""
-    try:
-        department = get_object_or_404(Department, id=department_id)
-        current_year = timezone.now().year
-        
-        # Get unassigned students in this department
-        unassigned_students = User.objects.filter(
-            user_type=1,
-            department=department,
-            student_assignments__isnull=True
-        ).select_related('course')
-        
-        # Get available lecturers in this department
-        available_lecturers = Lecturer.objects.filter(
-            department=department,
-            is_active=True
-        ).annotate(
-            assigned_count=Count('assigned_students'),
-            available_slots=models.F('max_students') - Count('assigned_students')
-        ).filter(available_slots__gt=0).select_related('user')
-        
-        if not available_lecturers:
-            messages.error(request, f'No available lecturers in {department.name} department.')
-            return redirect('attachments:department_placements', department_id=department_id)
-        
-        if not unassigned_students:
-            messages.info(request, f'No unassigned students in {department.name} department.')
-            return redirect('attachments:department_placements', department_id=department_id)
-        
-        assignments_made = 0
-        
-        # Sort lecturers by workload (least assigned first)
-        lecturers_sorted = sorted(available_lecturers, key=lambda x: x.assigned_count)
-        
-        # Round-robin assignment
-        for i, student in enumerate(unassigned_students):
-            lecturer = lecturers_sorted[i % len(lecturers_sorted)]
-            
-            if lecturer.assigned_count < lecturer.max_students:
-                try:
-                    placement_form = PlacementFormSubmission.objects.filter(
-                        student=student
-                    ).first()
-                    
-                    assignment = StudentAssignment(
-                        student=student,
-                        lecturer=lecturer,
-                        placement_form=placement_form,
-                        academic_year=current_year
-                    )
-                    assignment.save()
-                    
-                    lecturer.assigned_count += 1
-                    assignments_made += 1
-                    
-                except Exception as e:
-                    messages.error(request, f"Failed to assign {student.get_full_name()}: {str(e)}")
-        
-        if assignments_made > 0:
-            messages.success(request, f'Successfully assigned {assignments_made} students in {department.name} department!')
-        else:
-            messages.info(request, f'No assignments made in {department.name} department.')
-            
-    except Exception as e:
-        messages.error(request, f'Error during department assignment: {str(e)}')
+    """Queue smart assignment for a specific department"""
+    department = get_object_or_404(Department, id=department_id)
     
-    return redirect('attachments:department_placements', department_id=department_id)
\ No newline at end of file
+    if not available_lecturers(department).filter(available_slots__gt=0).exists():
+        messages.error(request, f'No available lecturers in {department.name} department.')
+        return redirect('attachments:department_placements', department_id=department_id)
+    
+    if not unassigned_students(department).exists():
+        messages.info(request, f'No unassigned students in {department.name} department.')
+        return redirect('attachments:department_placements', department_id=department_id)
+    
+    job, created = enqueue_job('department', {'department_id': department.id}, request.user)
+    return _assignment_job_response(
+        request, job, created, reverse('attachments:department_placements', args=[department_id])
+    )
+
+def _tracked_assignment_job(request):
+    """Job named by ?job=, else the newest job that is still queued or running"""
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        return AssignmentJob.objects.filter(id=job_id).first()
+    return AssignmentJob.objects.filter(status__in=('queued', 'running')).first()
+
+@user_passes_test(is_admin)
+def assignment_job_status(request, job_id):
+    """JSON progress of an assignment job, polled by the assignment pages"""
+    job = get_object_or_404(AssignmentJob, id=job_id)
+    return JsonResponse(job_progress(job))
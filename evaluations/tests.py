@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from attachments.models import Attachment, LogbookEntry
+from .views import supervisor_dashboard_data
+
+User = get_user_model()
+
+
+class SupervisorDashboardTests(TestCase):
+    def setUp(self):
+        self.supervisor = User.objects.create_user(
+            email='supervisor@example.com', password='testpass123', user_type=2,
+        )
+        self.today = date(2025, 3, 1)
+
+    def add_attachments(self, count, entries_per_attachment=3):
+        for index in range(Attachment.objects.count(), Attachment.objects.count() + count):
+            student = User.objects.create_user(
+                email=f'intern{index}@example.com', password='testpass123', user_type=1,
+                student_id=f'INT-{index}', first_name='Intern', last_name=str(index),
+            )
+            attachment = Attachment.objects.create(
+                student=student, organization='Acme', supervisor_name='Sue',
+                supervisor_email=self.supervisor.email,
+                start_date=date(2025, 1, 6), end_date=self.today + timedelta(days=index % 2 * 60 - 30),
+            )
+            for day in range(entries_per_attachment):
+                LogbookEntry.objects.create(
+                    attachment=attachment, entry_date=date(2025, 1, 6 + day), department_section='IT',
+                    tasks='Work', skills_learned='Skills', hours_worked=8,
+                    supervisor_comments='Looks good' if day == 0 else '',
+                )
+
+    def render_data(self):
+        """Build the context and touch everything the template reads"""
+        data = supervisor_dashboard_data(self.supervisor, today=self.today)
+        for attachment in data['supervised_attachments']:
+            attachment.student.get_full_name()
+            attachment.review_percentage
+        for entry in data['recent_reviewed_entries']:
+            entry.attachment.student.get_full_name()
+        return data
+
+    def test_query_count_does_not_grow_with_attachments(self):
+        self.add_attachments(2)
+        with self.assertNumQueries(2):
+            self.render_data()
+        self.add_attachments(20)
+        with self.assertNumQueries(2):
+            data = self.render_data()
+
+        self.assertEqual(len(data['supervised_attachments']), 22)
+        self.assertEqual(data['ongoing_attachments_count'] + data['completed_attachments_count'], 22)
+        self.assertEqual(data['reviewed_entries_count'], 22)
+        first = data['supervised_attachments'][0]
+        self.assertEqual((first.reviewed_entries_count, first.total_entries_count, first.review_percentage), (1, 3, 33.3))
+        self.assertEqual(len(data['recent_reviewed_entries']), 10)
+
+    def test_dashboard_view_query_count_does_not_grow_with_attachments(self):
+        cache.clear()
+        self.client.force_login(self.supervisor)
+        url = reverse('evaluations:supervisor_dashboard')
+        self.client.get(url)  # fills the principal cache
+        self.add_attachments(2)
+        # session, user, attachments with their counts, unread badge, recent reviewed entries
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.add_attachments(20)
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertContains(response, 'Intern 21')
+
+    def test_other_supervisors_attachments_are_excluded(self):
+        self.add_attachments(1)
+        Attachment.objects.update(supervisor_email='someone-else@example.com')
+        data = supervisor_dashboard_data(self.supervisor, today=self.today)
+        self.assertEqual(data['supervised_attachments'], [])
+        self.assertEqual(data['reviewed_entries_count'], 0)
+        self.assertFalse(data['recent_reviewed_entries'])
@@ -2,6 +2,7 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpResponse
+from attachments.logbook_summary import reviewed_q
 from attachments.models import Attachment, LogbookEntry
 from .models import (
     EvaluationCriteria,
@@ -13,7 +14,7 @@ from .models import (
 )
 from .forms import SupervisorEvaluationForm, LecturerEvaluationForm
 from accounts.decorators import role_required, supervisor_required,lecturer_required
-from django.db.models import Avg
+from django.db.models import Avg, Count
 from django.utils import timezone
 
 
@@ -22,54 +23,48 @@ from django.utils import timezone
 
 
 # ---------------- Supervisor Views ---------------- #
-@login_required
-@role_required([2])  # Supervisors only
-def supervisor_dashboard(request):
-    """Show supervisor dashboard with students under supervision."""
-    supervised_attachments = Attachment.objects.filter(supervisor_email=request.user.email)
-    
-    # Calculate statistics
-    today = timezone.now().date()
-    
-    # Count ongoing and completed attachments
-    ongoing_attachments_count = supervised_attachments.filter(end_date__gte=today).count()
-    completed_attachments_count = supervised_attachments.filter(end_date__lt=today).count()
-    
-    # Calculate total reviewed entries across all attachments
-    total_reviewed_entries = 0
-    for attachment in supervised_attachments:
-        reviewed_count = LogbookEntry.objects.filter(
-            attachment=attachment, 
-            supervisor_comments__isnull=False
-        ).count()
-        total_reviewed_entries += reviewed_count
-    
-    # Add reviewed entries count and percentage to each attachment
+def supervisor_dashboard_data(user, today=None):
+    """
+    Dashboard context for one supervisor from two queries: the supervised
+    attachments with their entry counts annotated, and the recent reviews.
+    """
+    today = today or timezone.now().date()
+    supervised_attachments = list(
+        Attachment.objects.filter(supervisor_email=user.email)
+        .select_related('student')
+        .annotate(
+            total_entries_count=Count('logbook_entries'),
+            reviewed_entries_count=Count('logbook_entries', filter=reviewed_q('logbook_entries__')),
+        )
+        .order_by('id')
+    )
+
     for attachment in supervised_attachments:
-        total_entries = LogbookEntry.objects.filter(attachment=attachment).count()
-        reviewed_entries = LogbookEntry.objects.filter(
-            attachment=attachment, 
-            supervisor_comments__isnull=False
-        ).count()
-        
-        attachment.total_entries_count = total_entries
-        attachment.reviewed_entries_count = reviewed_entries
-        attachment.review_percentage = round((reviewed_entries / total_entries * 100) if total_entries > 0 else 0, 1)
-    
+        total_entries = attachment.total_entries_count
+        attachment.review_percentage = round(
+            (attachment.reviewed_entries_count / total_entries * 100) if total_entries > 0 else 0, 1
+        )
+
     # Get recent reviewed entries for the activity section
     recent_reviewed_entries = LogbookEntry.objects.filter(
-        attachment__in=supervised_attachments,
-        supervisor_comments__isnull=False
+        reviewed_q(), attachment__supervisor_email=user.email,
     ).select_related('attachment', 'attachment__student').order_by('-updated_at')[:10]
 
-    return render(request, "evaluations/supervisor_dashboard.html", {
+    return {
         "supervised_attachments": supervised_attachments,
-        "ongoing_attachments_count": ongoing_attachments_count,
-        "completed_attachments_count": completed_attachments_count,
-        "reviewed_entries_count": total_reviewed_entries,
+        "ongoing_attachments_count": sum(1 for attachment in supervised_attachments if attachment.end_date >= today),
+        "completed_attachments_count": sum(1 for attachment in supervised_attachments if attachment.end_date < today),
+        "reviewed_entries_count": sum(attachment.reviewed_entries_count for attachment in supervised_attachments),
         "recent_reviewed_entries": recent_reviewed_entries,
         "today": today,
-    })
+    }
+
+
+@login_required
+@role_required([2])  # Supervisors only
+def supervisor_dashboard(request):
+    """Show supervisor dashboard with students under supervision."""
+    return render(request, "evaluations/supervisor_dashboard.html", supervisor_dashboard_data(request.user))
 
 
 @login_required
@@ -214,7 +209,7 @@ def evaluation_form(request, attachment_id):
 def lecturer_dashboard(request):
     # Get all attachments assigned to this lecturer's students
     lecturer_attachments = IndustrialAttachment.objects.filter(
-        student__student_assignments__lecturer__user=request.user
+        student__student_assignments__lecturer_id=request.principal.lecturer_id
     ).distinct()
     
     # Get evaluations done by this lecturer
@@ -235,7 +230,7 @@ def grading_panel(request, attachment_id):
     attachment = get_object_or_404(IndustrialAttachment, id=attachment_id)
     
     # Verify the lecturer is assigned to this student
-    if not attachment.student.student_assignments.filter(lecturer__user=request.user).exists():
+    if not attachment.student.student_assignments.filter(lecturer_id=request.principal.lecturer_id).exists():
         messages.error(request, "You are not assigned to evaluate this student.")
         return redirect('evaluations:lecturer_dashboard')
     
@@ -319,7 +314,7 @@ def evaluation_results(request, attachment_id):
     attachment = get_object_or_404(IndustrialAttachment, id=attachment_id)
     
     # Verify the lecturer is assigned to this student
-    if not attachment.student.student_assignments.filter(lecturer__user=request.user).exists():
+    if not attachment.student.student_assignments.filter(lecturer_id=request.principal.lecturer_id).exists():
         messages.error(request, "You are not assigned to evaluate this student.")
         return redirect('evaluations:lecturer_dashboard')
     
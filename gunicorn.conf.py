@@ -0,0 +1,62 @@
+"""
+gunicorn settings (picked up automatically from the working directory, or
+with ``gunicorn -c gunicorn.conf.py``). SERVER_PROFILE picks how the app is
+served:
+
+- ``wsgi`` (default): practicheck.wsgi with gevent workers.
+- ``asgi``: practicheck.asgi with uvicorn workers. The JSON endpoints
+  (health, departments/courses, username/student ID checks, logbook entry
+  detail/comment) are routed to async views there (ASYNC_VIEWS in
+  settings), which wait on the database without holding a worker slot.
+  Compare both with ``manage.py benchmark_servers``. Only this profile
+  serves the live event streams (attachments/live_events.py); check how
+  many idle ones a worker holds with ``manage.py benchmark_sse``.
+
+In the wsgi profile the gevent worker monkey-patches the standard library when it starts,
+before it imports the application, so the app must not be preloaded in the
+(unpatched) master: sockets, threading.local and the database pool's locks
+have to be the green versions. Database access is green through psycopg 3,
+which waits on its socket via the patched selectors; psycopg2 would block
+the whole worker, so the worker refuses to start on it.
+
+Postgres connections per instance are bounded by
+workers x DB_POOL_MAX_SIZE (see DATABASES in settings), however many of the
+worker_connections greenlets are busy.
+"""
+import os
+
+PROFILE = os.environ.get('SERVER_PROFILE', 'wsgi')
+if PROFILE not in ('wsgi', 'asgi'):
+    raise RuntimeError(f"SERVER_PROFILE must be 'wsgi' or 'asgi', not {PROFILE!r}")
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 3))
+if PROFILE == 'asgi':
+    wsgi_app = 'practicheck.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'practicheck.wsgi:application'
+    worker_class = 'gevent'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 300))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+preload_app = False
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+accesslog = '-'
+
+
+def post_worker_init(worker):
+    from django.db import connection
+
+    if PROFILE == 'asgi':
+        worker.log.info('uvicorn worker ready, DB pool %s', connection.settings_dict.get('OPTIONS', {}).get('pool', 'off'))
+        return
+
+    from gevent import monkey
+    if not monkey.is_module_patched('socket'):
+        raise RuntimeError('gevent has not patched this worker; is preload_app enabled?')
+    if connection.vendor == 'postgresql' and connection.Database.__name__ == 'psycopg2':
+        raise RuntimeError('psycopg2 blocks the gevent hub; install psycopg 3 (requirements.txt)')
+    worker.log.info('gevent worker ready: %s, DB pool %s', connection.Database.__name__,
+                    connection.settings_dict.get('OPTIONS', {}).get('pool', 'off'))
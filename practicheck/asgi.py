@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'practicheck.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Live event streams are answered before Django's request handler (needs the app registry, so imported here)
+from attachments.live_events import with_live_events  # noqa: E402
+
+application = with_live_events(django_application)
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'crispy_forms',
     'crispy_bootstrap5',
     'django_extensions',
+    'django_htmx',
 
 
      # Local apps
@@ -64,6 +65,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.PrincipalMiddleware',
     # 'accounts.middleware.RoleAccessMiddleware', 
     'django.contrib.messages.middleware.MessageMiddleware', 
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -72,6 +74,13 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'practicheck.urls'
 
+# How the app is served (see gunicorn.conf.py). The gevent WSGI worker cannot
+# run async views concurrently (asgiref refuses AsyncToSync while another
+# greenlet's event loop runs on the same OS thread), so the async variants of
+# the JSON endpoints are only routed to under ASGI.
+SERVER_PROFILE = config('SERVER_PROFILE', default='wsgi')
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=SERVER_PROFILE == 'asgi', cast=bool)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -84,6 +93,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'accounts.context_processors.user_type',
+                'attachments.context_processors.inbox',
             ],
         },
     },
@@ -102,10 +112,25 @@ DATABASES = {
     "default": dj_database_url.parse(
         config("DATABASE_URL"),
         conn_max_age=600,
-        ssl_require=True
+        ssl_require=config('DATABASE_SSL_REQUIRE', default=True, cast=bool)
     )
 }
 
+# Connection pool (Django's psycopg 3 pool, needs psycopg[pool]). Under the
+# gevent worker every greenlet used to keep its own persistent connection;
+# now requests check one out of a per-worker pool and give it back at the
+# end, so Postgres sees at most workers x DB_POOL_MAX_SIZE connections and
+# a burst waits up to DB_POOL_TIMEOUT seconds for a free one.
+DB_POOL = config('DB_POOL', default=True, cast=bool)
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_MAX_AGE'] = 0  # pooling replaces persistent connections
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+        'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+    }
+
 
 # DATABASES = {
 #     'default': {
@@ -145,6 +170,61 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# ---------------- Cache (see attachments/reference_cache.py) ---------------- #
+# Shared by all workers: Redis when CACHE_URL is set (needs the redis package),
+# otherwise files on local disk, which every worker on the host can see.
+CACHE_URL = config('CACHE_URL', default='')
+CACHE_DIR = config('CACHE_DIR', default=os.path.join(BASE_DIR, 'cache', 'django'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    } if CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)},
+    },
+}
+CACHES['default']['KEY_PREFIX'] = 'practicheck'
+CACHES['default']['VERSION'] = config('CACHE_VERSION', default=1, cast=int)  # bump to drop everything
+REFERENCE_CACHE_TIMEOUT = config('REFERENCE_CACHE_TIMEOUT', default=3600, cast=int)  # departments, courses
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=3600, cast=int)  # static page fragments
+PRINCIPAL_CACHE_TIMEOUT = config('PRINCIPAL_CACHE_TIMEOUT', default=300, cast=int)  # see accounts/principal.py
+
+# ---------------- Password hashing (see accounts/hashers.py) ---------------- #
+# New and rehashed passwords use PASSWORD_HASHER; the others stay listed so
+# existing hashes keep verifying and are upgraded on the next login.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='argon2')  # argon2 | pbkdf2
+PASSWORD_ARGON2_TIME_COST = config('PASSWORD_ARGON2_TIME_COST', default=2, cast=int)
+PASSWORD_ARGON2_MEMORY_COST = config('PASSWORD_ARGON2_MEMORY_COST', default=65536, cast=int)  # KiB
+PASSWORD_ARGON2_PARALLELISM = config('PASSWORD_ARGON2_PARALLELISM', default=2, cast=int)
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=1_000_000, cast=int)
+
+_PASSWORD_HASHERS = {
+    'argon2': 'accounts.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'accounts.hashers.TunedPBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# ---------------- Login rate limiting (see accounts/login_throttle.py) ---------------- #
+LOGIN_RATE_WINDOW = config('LOGIN_RATE_WINDOW', default=900, cast=int)  # seconds
+LOGIN_RATE_LIMIT_IDENTIFIER = config('LOGIN_RATE_LIMIT_IDENTIFIER', default=5, cast=int)  # one name from one IP
+LOGIN_RATE_LIMIT_IDENTIFIER_ANY_IP = config('LOGIN_RATE_LIMIT_IDENTIFIER_ANY_IP', default=100, cast=int)
+LOGIN_RATE_LIMIT_IP = config('LOGIN_RATE_LIMIT_IP', default=20, cast=int)  # unknown login names from one IP
+LOGIN_LOCKOUT_BASE = config('LOGIN_LOCKOUT_BASE', default=60, cast=int)  # seconds, doubled per lockout
+LOGIN_LOCKOUT_MAX = config('LOGIN_LOCKOUT_MAX', default=3600, cast=int)
+LOGIN_LOCKOUT_RESET = config('LOGIN_LOCKOUT_RESET', default=86400, cast=int)  # lockouts forgotten after this
+# Behind a reverse proxy (nginx, a load balancer) REMOTE_ADDR is the proxy's
+# address for every client. Turn this on there so the client IP is taken from
+# X-Forwarded-For. Only do that when the proxy overwrites the header, since
+# clients can set it themselves.
+LOGIN_RATE_TRUST_FORWARDED_FOR = config('LOGIN_RATE_TRUST_FORWARDED_FOR', default=False, cast=bool)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -171,6 +251,33 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Rendered logbook PDFs (not under MEDIA_ROOT: they must not be publicly served)
+LOGBOOK_PDF_CACHE_DIR = config('LOGBOOK_PDF_CACHE_DIR', default=os.path.join(BASE_DIR, 'cache', 'logbook_pdfs'))
+
+# ---------------- File downloads (see attachments/file_serving.py) ---------------- #
+# 'django' streams with sendfile where the server supports it; 'x-accel-redirect'
+# (nginx) or 'x-sendfile' (Apache/lighttpd) leave the bytes to the front proxy.
+FILE_SERVING_MODE = config('FILE_SERVING_MODE', default='django')
+# X-Accel-Redirect: directory -> nginx `internal` location serving it
+FILE_SERVING_ACCEL_LOCATIONS = {
+    MEDIA_ROOT: config('FILE_SERVING_MEDIA_LOCATION', default='/protected/media/'),
+    LOGBOOK_PDF_CACHE_DIR: config('FILE_SERVING_LOGBOOK_LOCATION', default='/protected/logbooks/'),
+}
+
+# WeasyPrint runs in this many background processes (0 = render inside the request)
+PDF_RENDER_WORKERS = config('PDF_RENDER_WORKERS', default=2, cast=int)
+PDF_RENDER_TIMEOUT = config('PDF_RENDER_TIMEOUT', default=120, cast=int)  # seconds
+
+# ---------------- Live notifications (see attachments/live_events.py) ---------------- #
+# Server-Sent Events for supervisors, lecturers and admins; the stream is
+# only served in the ASGI profile. With PostgreSQL events reach every worker
+# through LISTEN/NOTIFY on this channel. Without streams to reach, events are
+# not published at all (no pg_notify per save).
+LIVE_EVENTS_ENABLED = config('LIVE_EVENTS_ENABLED', default=SERVER_PROFILE == 'asgi', cast=bool)
+LIVE_EVENTS_CHANNEL = config('LIVE_EVENTS_CHANNEL', default='practicheck_events')
+LIVE_EVENTS_HEARTBEAT = config('LIVE_EVENTS_HEARTBEAT', default=15, cast=float)  # seconds between keep-alive comments
+LIVE_EVENTS_QUEUE_SIZE = config('LIVE_EVENTS_QUEUE_SIZE', default=100, cast=int)  # undelivered events per stream
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -196,6 +303,15 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default=EMAIL_HOST_USER)
 
+# Outgoing mail is queued in attachments.OutgoingEmail and delivered by
+# `python manage.py send_queued_email` (failed sends back off exponentially)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_RETRY_DELAY = config('EMAIL_OUTBOX_RETRY_DELAY', default=60, cast=int)  # seconds, doubled per attempt
+
+# accounts.email_utils.send_bulk_welcome_emails: messages per chunk and max messages per second (0 = unlimited)
+BULK_EMAIL_BATCH_SIZE = config('BULK_EMAIL_BATCH_SIZE', default=100, cast=int)
+BULK_EMAIL_RATE_LIMIT = config('BULK_EMAIL_RATE_LIMIT', default=0, cast=float)
+
 
 # # Admin notifications
 # ADMIN_EMAILS = [
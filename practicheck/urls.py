@@ -12,8 +12,11 @@ def home(request):
 def health_check(request):
     return JsonResponse({"status": "ok"})
 
+async def health_check_async(request):
+    return JsonResponse({"status": "ok"})
+
 urlpatterns = [
-    path("health/", health_check),          # Health endpoint
+    path("health/", health_check_async if settings.ASYNC_VIEWS else health_check),  # Health endpoint
     path("", home, name="home"),            # Root landing page
     path("admin/", admin.site.urls),
 
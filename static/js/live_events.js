@@ -0,0 +1,91 @@
+// Live notifications for supervisors, lecturers and admins (Server-Sent Events,
+// see attachments/live_events.py). Every event is re-dispatched on document as
+// "practicheck:<type>" so pages can update themselves, counters marked with
+// data-live-count="<type>" are bumped, and a short notice is shown. Events sent
+// while the stream was reconnecting are lost, so on "practicheck:reconnected"
+// the counters are reloaded from a fresh copy of the page.
+
+(function() {
+    var script = document.currentScript;
+    if (!script || !window.EventSource) {
+        return;
+    }
+
+    var LABELS = {
+        logbook_entry: 'New logbook entry submitted',
+        report_upload: 'New report uploaded',
+        placement_form: 'New placement form submitted',
+        message: 'New message received',
+        assignment: 'Student assignments updated'
+    };
+
+    function notify(text) {
+        var container = document.getElementById('live-events');
+        if (!container) {
+            container = document.createElement('div');
+            container.id = 'live-events';
+            container.className = 'position-fixed end-0 bottom-0 p-3';
+            container.style.zIndex = 1080;
+            document.body.appendChild(container);
+        }
+        var alert = document.createElement('div');
+        alert.className = 'alert alert-info alert-dismissible fade show shadow-lg';
+        alert.setAttribute('role', 'status');
+        alert.style.minWidth = '300px';
+        alert.innerHTML = '<i class="fas fa-bell me-2"></i><span></span>' +
+            '<button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>';
+        alert.querySelector('span').textContent = text;
+        container.appendChild(alert);
+        setTimeout(function() {
+            if (alert.isConnected) {
+                bootstrap.Alert.getOrCreateInstance(alert).close();
+            }
+        }, 8000);
+    }
+
+    var source = new EventSource(script.dataset.url);
+    var connected = false;
+    source.addEventListener('open', function() {
+        // A reconnect may have missed events: tell pages to refresh what they show
+        if (connected) {
+            document.dispatchEvent(new CustomEvent('practicheck:reconnected'));
+        }
+        connected = true;
+    });
+
+    document.addEventListener('practicheck:reconnected', function() {
+        var counters = document.querySelectorAll('[data-live-count]');
+        if (!counters.length) {
+            return;
+        }
+        fetch(window.location.href, {credentials: 'same-origin'}).then(function(response) {
+            return response.ok ? response.text() : null;
+        }).then(function(html) {
+            if (!html) {
+                return;
+            }
+            var fresh = new DOMParser().parseFromString(html, 'text/html');
+            counters.forEach(function(counter) {
+                var type = counter.dataset.liveCount;
+                var index = Array.prototype.indexOf.call(document.querySelectorAll('[data-live-count="' + type + '"]'), counter);
+                var current = fresh.querySelectorAll('[data-live-count="' + type + '"]')[index];
+                if (current) {
+                    counter.textContent = current.textContent;
+                    counter.className = current.className;
+                }
+            });
+        }).catch(function() {});
+    });
+
+    Object.keys(LABELS).forEach(function(type) {
+        source.addEventListener(type, function(event) {
+            var data = JSON.parse(event.data);
+            document.querySelectorAll('[data-live-count="' + type + '"]').forEach(function(counter) {
+                counter.textContent = (parseInt(counter.textContent, 10) || 0) + 1;
+                counter.classList.remove('d-none');
+            });
+            document.dispatchEvent(new CustomEvent('practicheck:' + type, {detail: data}));
+            notify(LABELS[type]);
+        });
+    });
+})();